@@ -11,27 +11,3175 @@ HyperCoreDataViewer.py: An application to use the Scale Computing
                         exporting to a spreadsheet.
 """
 
-import customtkinter as ctk
-from tkinter import Toplevel, ttk, filedialog, VERTICAL, HORIZONTAL, font
-from PIL import Image, ImageTk 
+import time
+STARTED = time.perf_counter()  # Start of the startup time shown in the Metrics panel
+
 import base64
 import http.client as http
 import json
 import ssl
-import pandas as pd
-import xml.etree.ElementTree as ET
+import threading
+import queue
+import socket
+import codecs
+import re
+import itertools
+import array
+import zlib
+import hashlib
+import contextlib
+from collections import deque, Counter
+from concurrent.futures import ThreadPoolExecutor
+import csv
 import os
 import sys
 import platform
 import ctypes
 
-# Global dark mode settings (fixes Windows issues)
-ctk.set_appearance_mode("dark")
-def apply_dark_title_bar(window):
-            if platform.system() == "Windows": 
-                    hwnd = ctypes.windll.user32.GetParent(window.winfo_id())  
-                    DWMWA_USE_IMMERSIVE_DARK_MODE = 20  # Dark mode flag
-                    ctypes.windll.dwmapi.DwmSetWindowAttribute(hwnd, DWMWA_USE_IMMERSIVE_DARK_MODE, ctypes.byref(ctypes.c_int(1)), ctypes.sizeof(ctypes.c_int(1)))
+# The GUI toolkit is imported when the window opens, so the export command and library use
+# run without customtkinter, Pillow or a display
+ctk = ttk = filedialog = font = Image = ImageTk = None
+
+def import_gui():
+    global ctk, ttk, filedialog, font, Image, ImageTk
+    import customtkinter as ctk
+    from tkinter import ttk, filedialog, font
+    from PIL import Image, ImageTk
+
+    # Global dark mode settings (fixes Windows issues)
+    ctk.set_appearance_mode("dark")
+
+# Module proxy that imports on first attribute access, then replaces itself in the module globals
+# so later lookups go straight to the real module
+class LazyModule:
+    def __init__(self, name, load):
+        self._name = name
+        self._load = load
+
+    def __getattr__(self, attr):
+        module = self._load()
+        globals()[self._name] = module
+        return getattr(module, attr)
+
+def import_numpy():
+    import numpy
+    return numpy
+
+np = LazyModule("np", import_numpy)  # Not needed until data arrives, so kept off the startup path
+
+def apply_dark_title_bar(window):
+            if platform.system() == "Windows": 
+                    hwnd = ctypes.windll.user32.GetParent(window.winfo_id())  
+                    DWMWA_USE_IMMERSIVE_DARK_MODE = 20  # Dark mode flag
+                    ctypes.windll.dwmapi.DwmSetWindowAttribute(hwnd, DWMWA_USE_IMMERSIVE_DARK_MODE, ctypes.byref(ctypes.c_int(1)), ctypes.sizeof(ctypes.c_int(1)))
+
+# TLS connection that resumes a cached session ticket instead of doing a full handshake
+class ResumableHTTPSConnection(http.HTTPSConnection):
+    def __init__(self, host, tls_sessions, **kwargs):
+        super().__init__(host, **kwargs)
+        self.tls_sessions = tls_sessions
+
+    def connect(self):
+        http.HTTPConnection.connect(self)
+        key = (self.host, self.port)
+        session = self.tls_sessions.get(key)
+        try:
+            self.sock = self._context.wrap_socket(self.sock, server_hostname=self.host, session=session)
+        except ValueError:  # Ticket no longer usable, reconnect with a full handshake
+            self.tls_sessions.pop(key, None)
+            http.HTTPConnection.connect(self)
+            self.sock = self._context.wrap_socket(self.sock, server_hostname=self.host)
+
+# Streaming decoder for a gzip or deflate Content-Encoding. "deflate" should be zlib-wrapped but
+# some servers send it raw, so the first two bytes decide which (held back until both arrive).
+class Inflater:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if encoding == "gzip" else None
+        self.head = b""  # Start of a deflate body too short to tell which it is
+        self.size = 0  # Decompressed bytes so far
+
+    # Inflater for the response's encoding, or None when the body isn't compressed
+    @classmethod
+    def for_response(cls, response):
+        encoding = (response.getheader("Content-Encoding") or "identity").strip().lower()
+        if encoding == "identity":
+            return None
+        if encoding in ("gzip", "x-gzip", "deflate"):
+            return cls("deflate" if encoding == "deflate" else "gzip")
+        raise Exception(f"Unsupported Content-Encoding: {encoding}")
+
+    def feed(self, data):
+        if self.decompressor is None:
+            data = self.head + data
+            if len(data) < 2:
+                self.head = data
+                return b""
+            self.head = b""
+            wrapped = data[0] & 0x0F == 8 and ((data[0] << 8) | data[1]) % 31 == 0
+            self.decompressor = zlib.decompressobj(zlib.MAX_WBITS if wrapped else -zlib.MAX_WBITS)
+        data = self.decompressor.decompress(data)
+        self.size += len(data)
+        return data
+
+    def flush(self):
+        if self.decompressor is None and self.head:  # A one-byte body can only be raw deflate
+            self.decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            data = self.decompressor.decompress(self.head) + self.decompressor.flush()
+        else:
+            data = self.decompressor.flush() if self.decompressor else b""
+        self.size += len(data)
+        return data
+
+# Fields kept from each VirDomain record; everything else is dropped as soon as a record is parsed
+VM_FIELDS = ("uuid", "name", "description", "operatingSystem", "machineType", "state", "numVCPU", "mem", "nodeUUID", "blockDevs")
+BLOCK_FIELDS = ("uuid", "name", "type", "capacity", "allocation", "mountPoints")
+
+def project_vm(vm):
+    record = {field: vm[field] for field in VM_FIELDS if field in vm}
+    if "blockDevs" in record:
+        record["blockDevs"] = [{field: block[field] for field in BLOCK_FIELDS if field in block} for block in record["blockDevs"] or []]
+    return record
+
+# Incremental parser for a top-level JSON array: feed it body chunks, get back each completed element
+class JSONArrayStream:
+    _whitespace = re.compile(r'[ \t\n\r]*')
+
+    def __init__(self, projection=None):
+        self.projection = projection
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.state = "start"  # start, first (element or "]"), element, separator ("," or "]"), done
+        self.retry_size = 0
+
+    def feed(self, data, final=False):
+        buf = self.buffer + self.decoder.decode(data, final)
+        pos = 0
+        records = []
+        while True:
+            pos = self._whitespace.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            char = buf[pos]
+            if self.state == "start":
+                if char != "[":
+                    raise ValueError("Expected a JSON array")
+                self.state = "first"
+                pos += 1
+                continue
+            if self.state == "done":
+                raise ValueError(f"Unexpected data after the JSON array at offset {pos}")
+            if self.state == "separator" or (self.state == "first" and char == "]"):
+                if char not in ",]":
+                    raise ValueError(f"Expected ',' or ']' in the JSON array, got {char!r}")
+                self.state = "element" if char == "," else "done"
+                pos += 1
+                continue
+            if char in ",]":
+                raise ValueError(f"Expected a value in the JSON array, got {char!r}")
+            # Only retry a partial element once it has doubled, so large records aren't re-parsed per chunk
+            if not final and len(buf) - pos < self.retry_size:
+                break
+            try:
+                record, end = self.json_decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                self.retry_size = 2 * (len(buf) - pos)
+                break
+            # A number may continue in the next chunk ("12.5" of "12.5e3")
+            if not final and not isinstance(record, (dict, list, str)) and (end == len(buf) or buf[end] not in " \t\n\r,]"):
+                break
+            self.retry_size = 0
+            records.append(self.projection(record) if self.projection else record)
+            self.state = "separator"
+            pos = end
+
+        self.buffer = buf[pos:]
+        if final and self.state != "done":
+            raise ValueError("Truncated JSON array")
+        return records
+
+GIB = 1024 ** 3
+HIDDEN_BLOCK_TYPES = ("NVRAM", "IDE_CDROM", "VTPM")  # Exported, but not shown in the VM view
+
+# Interned string column: each distinct label is stored once and rows hold small integer codes
+class Categories:
+    def __init__(self, labels=()):
+        self.labels = list(labels)
+        self.codes = {label: code for code, label in enumerate(self.labels)}
+
+    def code(self, label):
+        code = self.codes.get(label)
+        if code is None:
+            code = self.codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    # Rank of each code when labels are sorted case-insensitively, for vectorized sorting
+    def ranks(self):
+        ranks = np.empty(len(self.labels), dtype=np.int64)
+        ranks[sorted(range(len(self.labels)), key=lambda code: str(self.labels[code]).lower())] = np.arange(len(self.labels))
+        return ranks
+
+def gib(value, digits=None):
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return np.nan
+    return round(value / GIB, digits) if digits else round(value / GIB)
+
+def mount_label(mount_points):
+    if isinstance(mount_points, (list, tuple)):
+        return ", ".join(str(item) for item in mount_points)
+    return "N/A" if mount_points is None else str(mount_points)
+
+def number_cell(value, missing, cast=float):
+    return missing if value != value else cast(value)  # NaN is the missing value
+
+def number_or_none(value):
+    return None if value != value else value
+
+def text_ranks(values):
+    return np.unique(np.array([str(value).lower() for value in values], dtype=object), return_inverse=True)[1].reshape(-1)
+
+# VM inventory keyed by UUID, stored column-wise: one entry per VM in self.vm and one per block
+# device in self.block. Repeated strings are Categories codes, numbers are float64 (NaN where the
+# API had no value), and both live in array.array columns that NumPy reads without copying.
+# A VM's block devices are a contiguous range of block rows. Frozen inventories are never
+# modified; changes produce a new one (see with_changes).
+class VMInventory:
+    VM_TEXT = ("uuid", "name")
+    VM_CODES = ("cluster", "description", "os", "machine_type", "state", "node")
+    VM_NUMBERS = ("vcpus", "memory")
+    VM_INDEXES = ("first_block", "block_count", "first_row")
+    BLOCK_TEXT = ("uuid",)
+    BLOCK_CODES = ("name", "type", "mount_points")
+    BLOCK_NUMBERS = ("capacity", "allocation")
+    TYPECODES = {"codes": "i", "numbers": "d", "indexes": "i", "alive": "b"}
+    DTYPES = {"i": "int32", "d": "float64", "b": "bool"}
+
+    def __init__(self, clustered=False):
+        self.clustered = clustered
+        self.categories = {name: Categories() for name in self.VM_CODES + self.BLOCK_CODES}
+        self.vm = self.new_columns(self.VM_TEXT, self.VM_CODES, self.VM_NUMBERS, self.VM_INDEXES)
+        self.block = self.new_columns(self.BLOCK_TEXT, self.BLOCK_CODES, self.BLOCK_NUMBERS, ("vm",))
+        self.index = {}  # uuid -> VM index
+        self.sums = None  # (vCPUs, memory, capacity, allocation) of the TOTAL row
+        self.errors = {}
+        self.frozen = False
+        self._displayed = None
+        self._sort_keys = {}
+        self._aggregates = {}  # Summary group-by keys -> groups, see summary()
+
+    def new_columns(self, text, codes, numbers, indexes):
+        columns = {name: [] for name in text}
+        for names, kind in ((codes, "codes"), (numbers, "numbers"), (indexes, "indexes"), (("alive",), "alive")):
+            for name in names:
+                columns[name] = array.array(self.TYPECODES[kind])
+        return columns
+
+    @classmethod
+    def from_records(cls, records, cluster=None):
+        inventory = cls(clustered=cluster is not None)
+        for record in records:
+            inventory.add_vm(record, cluster)
+        return inventory.freeze()
+
+    # One inventory over several clusters, with the cluster column set from the mapping key
+    @classmethod
+    def merge(cls, parts, errors=None):
+        inventory = cls(clustered=True)
+        for host, part in parts.items():
+            for v in range(part.vm_count()):
+                if part.vm["alive"][v]:
+                    inventory.copy_vm(part, v, inventory.new_vm(), cluster=host)
+        inventory.errors = dict(errors or {})
+        return inventory.freeze()
+
+    @property
+    def columns(self):
+        return FLEET_VM_COLUMNS if self.clustered else VM_COLUMNS
+
+    def vm_count(self):
+        return len(self.vm["uuid"])
+
+    def __len__(self):
+        return len(self.block["vm"])
+
+    def __getitem__(self, index):
+        return self.row(index)
+
+    # Zero-copy NumPy view of a column (only taken on frozen inventories)
+    def values(self, columns, name):
+        column = columns[name]
+        return np.frombuffer(column, dtype=self.DTYPES[column.typecode])
+
+    def label(self, column, code):
+        return self.categories[column].labels[code]
+
+    def blocks_of(self, v):
+        first = self.vm["first_block"][v]
+        return range(first, first + self.vm["block_count"][v])
+
+    def new_vm(self):
+        for name, values in self.vm.items():
+            values.append(None if isinstance(values, list) else np.nan if name in self.VM_NUMBERS else 0)
+        return self.vm_count() - 1
+
+    def new_block(self, v):
+        for name, values in self.block.items():
+            values.append(None if isinstance(values, list) else np.nan if name in self.BLOCK_NUMBERS else v if name == "vm" else 1 if name == "alive" else 0)
+        return len(self) - 1
+
+    # Append one projected VirDomain record
+    def add_vm(self, vm, cluster=None):
+        v = self.new_vm()
+        self.set_vm_fields(v, vm.get("uuid"), vm.get("name"), cluster, vm.get("description"),
+                           vm.get("operatingSystem", "N/A"), vm.get("machineType", "N/A"), vm.get("state", "N/A"), vm.get("nodeUUID"))
+        vcpus = vm.get("numVCPU")
+        self.vm["vcpus"][v] = float(vcpus) if isinstance(vcpus, int) and not isinstance(vcpus, bool) and vcpus >= 0 else np.nan
+        self.vm["memory"][v] = gib(vm.get("mem"))
+
+        # Nested data collection from blockDevs; a VM without any still gets one placeholder row
+        block_devices = vm.get("blockDevs") or [{"uuid": None}]
+        self.vm["first_block"][v] = len(self)
+        self.vm["block_count"][v] = len(block_devices)
+        for block in block_devices:
+            i = self.new_block(v)
+            self.block["uuid"][i] = block.get("uuid", "N/A")
+            self.block["name"][i] = self.categories["name"].code(block.get("name", "N/A"))
+            self.block["type"][i] = self.categories["type"].code(block.get("type", "N/A"))
+            self.block["capacity"][i] = gib(block.get("capacity") or None, 2)
+            self.block["allocation"][i] = gib(block.get("allocation") or None, 2)
+            self.block["mount_points"][i] = self.categories["mount_points"].code(mount_label(block.get("mountPoints", "N/A")))
+        self.update_first_row(v)
+        return v
+
+    def set_vm_fields(self, v, uuid, name, cluster, description, os_name, machine_type, state, node):
+        self.vm["uuid"][v] = uuid
+        self.vm["name"][v] = name
+        for column, label in zip(self.VM_CODES, (cluster, description, os_name, machine_type, state, node)):
+            self.vm[column][v] = self.categories[column].code(label)
+        self.vm["alive"][v] = 1
+        self.index[uuid] = v
+
+    def update_first_row(self, v):
+        hidden = [self.categories["type"].codes.get(block_type) for block_type in HIDDEN_BLOCK_TYPES]
+        self.vm["first_row"][v] = next((i for i in self.blocks_of(v) if self.block["type"][i] not in hidden), -1)
+
+    # Copy VM s of another inventory into slot v. v keeps its block rows when the new block
+    # devices fit in them, otherwise they move to the end.
+    def copy_vm(self, source, s, v, cluster=None):
+        code_label = source.label
+        self.set_vm_fields(v, source.vm["uuid"][s], source.vm["name"][s],
+                           cluster if cluster is not None else code_label("cluster", source.vm["cluster"][s]),
+                           *(code_label(column, source.vm[column][s]) for column in self.VM_CODES[1:]))
+        for name in self.VM_NUMBERS:
+            self.vm[name][v] = source.vm[name][s]
+
+        rows = source.blocks_of(s)
+        existing = self.blocks_of(v)
+        if len(rows) > len(existing):
+            self.kill_blocks(existing)
+            self.vm["first_block"][v] = len(self)
+            existing = [self.new_block(v) for _ in rows]
+        else:
+            self.kill_blocks(existing[len(rows):])
+        self.vm["block_count"][v] = len(rows)
+        for i, j in zip(existing, rows):
+            self.block["uuid"][i] = source.block["uuid"][j]
+            for name in self.BLOCK_CODES:
+                self.block[name][i] = self.categories[name].code(code_label(name, source.block[name][j]))
+            for name in self.BLOCK_NUMBERS:
+                self.block[name][i] = source.block[name][j]
+            self.block["alive"][i] = 1
+        self.update_first_row(v)
+
+    def kill_blocks(self, rows):
+        for i in rows:
+            self.block["alive"][i] = 0
+
+    def remove_vm(self, v):
+        self.kill_blocks(self.blocks_of(v))
+        self.vm["block_count"][v] = 0
+        self.vm["first_row"][v] = -1
+        self.vm["alive"][v] = 0
+        del self.index[self.vm["uuid"][v]]
+
+    # (vCPUs, memory, capacity, allocation) that one VM adds to the TOTAL row
+    def contribution(self, v):
+        def nansum(values):
+            return sum(value for value in values if value == value)
+        return (
+            nansum([self.vm["vcpus"][v]]),
+            nansum([self.vm["memory"][v]]),
+            nansum(self.block["capacity"][i] for i in self.blocks_of(v)),
+            nansum(self.block["allocation"][i] for i in self.blocks_of(v)),
+        )
+
+    def freeze(self):
+        self.frozen = True
+        if self.sums is None:
+            self.sums = self.vectorized_sums()
+        return self
+
+    # Pickled for the response cache without the caches derived from the columns
+    def __getstate__(self):
+        return dict(self.__dict__, _displayed=None, _sort_keys={}, _aggregates={})
+
+    # Editable copy; the array columns are copied with a memcpy
+    def thaw(self):
+        inventory = VMInventory(self.clustered)
+        inventory.categories = {name: Categories(categories.labels) for name, categories in self.categories.items()}
+        inventory.vm = {name: values[:] for name, values in self.vm.items()}
+        inventory.block = {name: values[:] for name, values in self.block.items()}
+        inventory.index = dict(self.index)
+        inventory.sums = list(self.sums) if self.sums is not None else None
+        inventory.errors = dict(self.errors)
+        return inventory
+
+    # Columnar file for handing a frozen inventory between processes: the header length (8 bytes),
+    # a JSON header with the labels, totals and where each column starts, then the raw bytes of
+    # every array column. Text columns are stored as JSON lists.
+    def write_file(self, path):
+        header = {"clustered": self.clustered, "sums": self.sums, "errors": self.errors, "columns": [],
+                  "categories": {name: categories.labels for name, categories in self.categories.items()}}
+        parts = []
+        offset = 0
+        for table, columns in (("vm", self.vm), ("block", self.block)):
+            for name, values in columns.items():
+                if isinstance(values, list):
+                    data, typecode = json.dumps(values).encode("utf-8"), None
+                else:
+                    data, typecode = memoryview(values).cast("B"), values.typecode
+                header["columns"].append((table, name, typecode, offset, len(data)))
+                parts.append(data)
+                offset += len(data)
+        head = json.dumps(header).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(len(head).to_bytes(8, "little"))
+            f.write(head)
+            for data in parts:
+                f.write(data)
+
+    # Inverse of write_file; array columns are copied straight out of the mapped file
+    @classmethod
+    def read_file(cls, path):
+        import mmap
+
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            size = int.from_bytes(data[:8], "little")
+            header = json.loads(data[8:8 + size])
+            start = 8 + size
+            inventory = cls(header["clustered"])
+            with memoryview(data) as view:
+                for table, name, typecode, offset, length in header["columns"]:
+                    with view[start + offset:start + offset + length] as chunk:
+                        if typecode is None:
+                            values = json.loads(bytes(chunk))
+                        else:
+                            values = array.array(typecode)
+                            values.frombytes(chunk)
+                    getattr(inventory, table)[name] = values
+        inventory.categories = {name: Categories(labels) for name, labels in header["categories"].items()}
+        alive = inventory.vm["alive"]
+        inventory.index = {uuid: v for v, uuid in enumerate(inventory.vm["uuid"]) if alive[v]}
+        inventory.sums = header["sums"]
+        inventory.errors = header["errors"]
+        return inventory.freeze()
+
+    # Column sums over the live VMs, or only those in vm_mask (and their block devices)
+    def vectorized_sums(self, vm_mask=None):
+        vm_alive = self.values(self.vm, "alive")
+        block_alive = self.values(self.block, "alive")
+        if vm_mask is not None:
+            vm_alive = vm_alive & vm_mask
+            block_alive = block_alive & self.rows_of(vm_mask)
+        return [
+            float(np.nansum(self.values(self.vm, "vcpus")[vm_alive])),
+            float(np.nansum(self.values(self.vm, "memory")[vm_alive])),
+            float(np.nansum(self.values(self.block, "capacity")[block_alive])),
+            float(np.nansum(self.values(self.block, "allocation")[block_alive])),
+        ]
+
+    def total_row(self, vm_mask=None):
+        total_vcpus, total_memory, total_capacity, total_allocation = self.sums if vm_mask is None else self.vectorized_sums(vm_mask)
+        return ("TOTAL",) + ("",) * (6 if self.clustered else 5) + (
+            int(total_vcpus), int(total_memory),
+            "", "",
+            round(total_capacity, 2),
+            round(total_allocation, 2),
+            ""
+        )
+
+    # Block row mask for a VM mask: the rows of the VMs in it
+    def rows_of(self, vm_mask):
+        return vm_mask[self.values(self.block, "vm")]
+
+    # Summary measures of the live VMs (or only those in vm_mask) grouped by SUMMARY_KEYS, in one
+    # vectorized pass over the block rows: {labels: [VMs, vCPUs, memory, block devices, capacity,
+    # allocation]}. Groups are numbered by the combined codes of their keys; a VM counts once in
+    # each group it has a block device in, which is one group unless a block device key is used.
+    def aggregate(self, keys, vm_mask=None):
+        vm_alive = self.values(self.vm, "alive")
+        if vm_mask is not None:
+            vm_alive = vm_alive & vm_mask
+        vm_of = self.values(self.block, "vm")
+        rows = np.flatnonzero(self.values(self.block, "alive") & vm_alive[vm_of])
+        row_vm = vm_of[rows]
+
+        sizes = [max(len(self.categories[SUMMARY_KEYS[key][1]].labels), 1) for key in keys]
+        codes = [self.values(self.vm, column)[row_vm] if table == "vm" else self.values(self.block, column)[rows]
+                 for table, column in (SUMMARY_KEYS[key] for key in keys)]
+        combined = np.ravel_multi_index(codes, sizes) if keys else np.zeros(len(rows), dtype=np.int64)
+        if np.prod(sizes) <= 4 * len(rows) + 1024:  # Few possible groups: number them without sorting
+            present = np.bincount(combined, minlength=int(np.prod(sizes))) > 0
+            groups = np.flatnonzero(present)
+            group_of = (np.cumsum(present) - 1)[combined]
+        else:
+            groups, group_of = np.unique(combined, return_inverse=True)
+            group_of = group_of.reshape(-1)
+
+        # Each (group, VM) pair once for the VM measures
+        if all(SUMMARY_KEYS[key][0] == "vm" for key in keys):
+            vm_group = np.full(self.vm_count(), -1, dtype=np.int64)
+            vm_group[row_vm] = group_of
+            pair_vm = np.flatnonzero(vm_group >= 0)
+            pair_group = vm_group[pair_vm]
+        else:
+            pairs = group_of.astype(np.int64) * self.vm_count() + row_vm
+            if len(groups) * self.vm_count() <= 32 * len(rows) + 1024:
+                seen = np.zeros(len(groups) * self.vm_count(), dtype=bool)
+                seen[pairs] = True
+                pairs = np.flatnonzero(seen)
+            else:
+                pairs = np.unique(pairs)
+            pair_group, pair_vm = np.divmod(pairs, self.vm_count())
+
+        def sums(group, values):
+            return np.bincount(group, weights=np.nan_to_num(values), minlength=len(groups))
+
+        measures = np.column_stack((
+            np.bincount(pair_group, minlength=len(groups)),
+            sums(pair_group, self.values(self.vm, "vcpus")[pair_vm]),
+            sums(pair_group, self.values(self.vm, "memory")[pair_vm]),
+            np.bincount(group_of, minlength=len(groups)),
+            sums(group_of, self.values(self.block, "capacity")[rows]),
+            sums(group_of, self.values(self.block, "allocation")[rows]),
+        )).tolist()
+        group_codes = np.unravel_index(groups, sizes) if keys else ()
+        labels = zip(*(np.array(self.categories[SUMMARY_KEYS[key][1]].labels, dtype=object)[key_codes]
+                       for key, key_codes in zip(keys, group_codes))) if keys else [()] * len(groups)
+        return dict(zip(labels, measures))
+
+    # Cached aggregate of a frozen inventory; with_changes carries the cache over to the edited copy
+    def summary(self, keys):
+        keys = tuple(keys)
+        groups = self._aggregates.get(keys)
+        if groups is None:
+            groups = self._aggregates[keys] = self.aggregate(keys)
+        return groups
+
+    # previous's cached aggregates brought up to date for this inventory: the VMs in uuids are
+    # taken out of their old groups and added to their new ones, the other groups are untouched
+    def carry_aggregates(self, previous, uuids):
+        if not previous._aggregates:
+            return
+        old_mask = np.zeros(previous.vm_count(), dtype=bool)
+        old_mask[[previous.index[uuid] for uuid in uuids if uuid in previous.index]] = True
+        new_mask = np.zeros(self.vm_count(), dtype=bool)
+        new_mask[[self.index[uuid] for uuid in uuids if uuid in self.index]] = True
+        for keys, groups in previous._aggregates.items():
+            groups = {labels: list(measures) for labels, measures in groups.items()}
+            for sign, inventory, vm_mask in ((-1, previous, old_mask), (1, self, new_mask)):
+                for labels, measures in inventory.aggregate(keys, vm_mask).items():
+                    current = groups.setdefault(labels, [0.0] * len(measures))
+                    for i, value in enumerate(measures):
+                        current[i] += sign * value
+            self._aggregates[keys] = {labels: measures for labels, measures in groups.items() if measures[0] > 0}
+
+    # UUIDs changed, added and removed in other relative to this inventory
+    def diff(self, other):
+        changed = []
+        added = []
+        for uuid, s in other.index.items():
+            v = self.index.get(uuid)
+            if v is None:
+                added.append(uuid)
+            elif self.signature(v) != other.signature(s):
+                changed.append(uuid)
+        removed = [uuid for uuid in self.index if uuid not in other.index]
+        return changed, added, removed
+
+    def signature(self, v):
+        return (
+            self.vm["name"][v],
+            tuple(self.label(name, self.vm[name][v]) for name in self.VM_CODES),
+            tuple(number_or_none(self.vm[name][v]) for name in self.VM_NUMBERS),
+            tuple((self.block["uuid"][i],)
+                  + tuple(self.label(name, self.block[name][i]) for name in self.BLOCK_CODES)
+                  + tuple(number_or_none(self.block[name][i]) for name in self.BLOCK_NUMBERS) for i in self.blocks_of(v)),
+        )
+
+    # New inventory with the given UUIDs taken from source (or removed if source lacks them).
+    # Unchanged VMs keep their row indexes and the TOTAL sums are adjusted rather than recomputed.
+    # Without any UUIDs this inventory itself is returned.
+    def with_changes(self, source, uuids):
+        if not uuids:
+            return self
+        inventory = self.thaw()
+        for uuid in uuids:
+            v = inventory.index.get(uuid)
+            s = source.index.get(uuid)
+            if v is not None:
+                for i, value in enumerate(inventory.contribution(v)):
+                    inventory.sums[i] -= value
+            if s is None:
+                if v is not None:
+                    inventory.remove_vm(v)
+                continue
+            if v is None:
+                v = inventory.new_vm()
+            inventory.copy_vm(source, s, v)
+            for i, value in enumerate(inventory.contribution(v)):
+                inventory.sums[i] += value
+        inventory.freeze()
+        inventory.carry_aggregates(self, uuids)
+        return inventory
+
+    def vm_at_row(self, index):
+        v = self.block["vm"][index]
+        return self.vm["uuid"][v], self.label("cluster", self.vm["cluster"][v])
+
+    def vm_cells(self, v):
+        return (
+            self.vm["uuid"][v],
+            self.label("description", self.vm["description"][v]),
+            self.label("os", self.vm["os"][v]),
+            self.label("machine_type", self.vm["machine_type"][v]),
+            self.label("state", self.vm["state"][v]),
+            number_cell(self.vm["vcpus"][v], "N/A", int),
+            number_cell(self.vm["memory"][v], "N/A", int),
+        )
+
+    def block_cells(self, i):
+        uuid = self.block["uuid"][i]
+        name = self.label("name", self.block["name"][i])
+        return (
+            name if uuid is None else f"{name} ({uuid})",
+            self.label("type", self.block["type"][i]),
+            number_cell(self.block["capacity"][i], ""),
+            number_cell(self.block["allocation"][i], ""),
+            self.label("mount_points", self.block["mount_points"][i]),
+        )
+
+    def prefix(self, v):
+        return (self.label("cluster", self.vm["cluster"][v]),) if self.clustered else ()
+
+    # View row for block row i: VM fields only on the VM's first shown block device
+    def row(self, index):
+        v = self.block["vm"][index]
+        vm_cells = self.vm_cells(v) if self.vm["first_row"][v] == index else ("",) * 7
+        return self.prefix(v) + (self.vm["name"][v],) + vm_cells + self.block_cells(index)
+
+    def rows_for_vm(self, v):
+        hidden = [self.categories["type"].codes.get(block_type) for block_type in HIDDEN_BLOCK_TYPES]
+        return [self.row(i) for i in self.blocks_of(v) if self.block["type"][i] not in hidden]
+
+    # Export rows: every block device, VM fields repeated on each
+    def export_rows(self):
+        for v in range(self.vm_count()):
+            if not self.vm["alive"][v]:
+                continue
+            vm_cells = self.prefix(v) + (self.vm["name"][v],) + self.vm_cells(v)
+            for i in self.blocks_of(v):
+                yield vm_cells + self.block_cells(i)
+
+    def displayed(self):
+        if self._displayed is None:
+            hidden = [self.categories["type"].codes[block_type] for block_type in HIDDEN_BLOCK_TYPES if block_type in self.categories["type"].codes]
+            self._displayed = self.values(self.block, "alive") & ~np.isin(self.values(self.block, "type"), hidden)
+        return self._displayed
+
+    # VirtualTable row source protocol
+    def live_indexes(self):
+        return np.flatnonzero(self.displayed()).tolist()
+
+    def sorted_indexes(self, column, key=None):
+        keys = self.sort_keys(self.columns[column])
+        order = np.argsort(keys, kind="stable")
+        return order[self.displayed()[order]].tolist()
+
+    # Typed sort key per block row, built vectorized from the columns; blank cells (VM fields on
+    # a VM's later rows) sort first for text and last for numbers, as in the table
+    def sort_keys(self, column):
+        keys = self._sort_keys.get(column)
+        if keys is not None:
+            return keys
+        vm_of = self.values(self.block, "vm")
+        vm_columns = {"Cluster": "cluster", "Name": "name", "UUID": "uuid", "Description": "description", "OS": "os",
+                      "Machine Type": "machine_type", "State": "state", "vCPUs": "vcpus", "Memory (GiB)": "memory"}
+        block_columns = {"Block Device": "name", "Device Type": "type", "Capacity (GiB)": "capacity",
+                         "Allocation (GiB)": "allocation", "Mount Points": "mount_points"}
+        if column in ("Cluster", "Name"):
+            keys = self.column_keys(self.vm, vm_columns[column])[vm_of]
+        elif column in vm_columns:
+            name = vm_columns[column]
+            first = self.values(self.vm, "first_row")[vm_of] == np.arange(len(self))
+            keys = np.where(first, self.column_keys(self.vm, name)[vm_of], np.inf if name in self.VM_NUMBERS else -1)
+        elif column == "Block Device":
+            keys = text_ranks(self.block_cells(i)[0] for i in range(len(self)))
+        else:
+            keys = self.column_keys(self.block, block_columns[column])
+        self._sort_keys[column] = keys
+        return keys
+
+    def column_keys(self, columns, name):
+        if isinstance(columns[name], list):
+            return text_ranks(columns[name])
+        values = self.values(columns, name)
+        if name in self.VM_NUMBERS + self.BLOCK_NUMBERS:
+            return np.where(np.isnan(values), np.inf, values)
+        return self.categories[name].ranks()[values]
+
+# Query fields: name -> (table, column). Numbers are compared in GiB for memory and disks; the
+# rest are text. Block device fields match a VM when any of its block devices matches.
+SEARCH_FIELDS = {
+    "name": ("vm", "name"), "uuid": ("vm", "uuid"), "cluster": ("vm", "cluster"), "description": ("vm", "description"),
+    "os": ("vm", "os"), "machine": ("vm", "machine_type"), "state": ("vm", "state"),
+    "vcpus": ("vm", "vcpus"), "memory": ("vm", "memory"),
+    "device": ("block", "name"), "type": ("block", "type"), "capacity": ("block", "capacity"),
+    "allocation": ("block", "allocation"), "mount": ("block", "mount_points"),
+}
+FREE_TEXT_FIELDS = ("name", "uuid", "cluster", "description", "os", "machine", "state", "device", "type", "mount")
+NUMBER_FIELDS = ("vcpus", "memory", "capacity", "allocation")
+# field, operator, then a quoted value, a number with an optional size unit (also after a space,
+# as in "memory > 64 GiB"), or a word
+_query_filter = re.compile(r'(\w+)\s*(>=|<=|!=|=|>|<|:|~)\s*'
+                           r'("[^"]*"?|-?\d+(?:\.\d*)?(?:\s*(?:gib|gb|g)(?![^\s"]))?(?![^\s"])|[^\s"]+)', re.IGNORECASE)
+
+# "web state=RUNNING memory > 64 GiB" -> (["web"], [("state", "=", "running"), ("memory", ">", "64 gib")])
+def parse_query(query):
+    filters = []
+
+    def take(match):
+        field = match.group(1).lower()
+        if field not in SEARCH_FIELDS:
+            return match.group(0)
+        value, _, rest = match.group(3).partition(" ")
+        if field in NUMBER_FIELDS or value.startswith('"'):
+            value, rest = match.group(3), ""
+        filters.append((field, match.group(2), value.strip('"').lower()))
+        return f" {rest} "
+
+    rest = _query_filter.sub(take, query)
+    terms = [term.strip('"').lower() for term in re.findall(r'"[^"]*"?|\S+', rest)]
+    return [term for term in terms if term], filters
+
+def parse_number(text):
+    match = re.match(r'\s*(-?\d+(?:\.\d*)?)\s*(?:gib|gb|g)?\s*$', text)
+    if not match:
+        raise ValueError(f"Not a number: {text}")
+    return float(match.group(1))
+
+# Trigram key of three code points (each below 2**21)
+def trigram_key(a, b, c):
+    return (a << 42) | (b << 21) | c
+
+# Search structures for one inventory. VM names get a trigram index (sorted keys with a posting
+# list of VM indexes each) plus a sorted copy for prefixes; UUIDs a sorted copy for prefixes.
+# Category columns need no index: the query is tested against their few distinct labels and
+# the matching codes are looked up in the code columns, vectorized.
+class SearchIndex:
+    REBUILD_FRACTION = 0.05
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+        self.names = np.char.lower(np.array([name or "" for name in inventory.vm["name"]], dtype=str))
+        self.uuids = np.char.lower(np.array([uuid or "" for uuid in inventory.vm["uuid"]], dtype=str))
+        self.keys, self.starts, self.postings = self.trigrams(self.names)
+        self.name_order = np.argsort(self.names, kind="stable")
+        self.sorted_names = self.names[self.name_order]
+        self.uuid_order = np.argsort(self.uuids, kind="stable")
+        self.sorted_uuids = self.uuids[self.uuid_order]
+        self.fresh = np.zeros(0, dtype=np.int64)  # VMs changed or added since the index was built
+
+    @staticmethod
+    def trigrams(texts, batch=4096):
+        keys = []
+        rows = []
+        width = texts.dtype.itemsize // 4
+        for start in range(0, len(texts) if width >= 3 else 0, batch):
+            codes = texts[start:start + batch].view(np.uint32).reshape(-1, width).astype(np.int64)
+            batch_keys = trigram_key(codes[:, :-2], codes[:, 1:-1], codes[:, 2:])
+            present = codes[:, 2:] != 0  # Shorter strings are padded with NULs
+            keys.append(batch_keys[present])
+            rows.append(np.broadcast_to(np.arange(start, start + len(codes))[:, None], batch_keys.shape)[present])
+        if not keys:
+            return np.zeros(0, dtype=np.int64), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        keys = np.concatenate(keys)
+        rows = np.concatenate(rows)
+        order = np.argsort(keys, kind="stable")
+        keys, rows = keys[order], rows[order]
+        unique, starts = np.unique(keys, return_index=True)
+        return unique, np.append(starts, len(keys)), rows
+
+    # Index for inventory, an edited copy of this one (see VMInventory.with_changes) with the given
+    # UUIDs changed or added. Unchanged VMs keep their indexes, so only the edited VMs are updated;
+    # once they make up a sizeable part of the inventory the index is rebuilt.
+    def update(self, inventory, uuids):
+        touched = [inventory.index[uuid] for uuid in uuids if uuid in inventory.index]
+        if len(self.fresh) + len(touched) > self.REBUILD_FRACTION * inventory.vm_count():
+            return SearchIndex(inventory)
+        index = SearchIndex.__new__(SearchIndex)
+        index.__dict__.update(self.__dict__)
+        index.inventory = inventory
+        index.names = self.extended(self.names, inventory.vm["name"], touched)
+        index.uuids = self.extended(self.uuids, inventory.vm["uuid"], touched)
+        for v in touched:
+            index.names[v] = (inventory.vm["name"][v] or "").lower()
+            index.uuids[v] = (inventory.vm["uuid"][v] or "").lower()
+        index.fresh = np.union1d(self.fresh, np.array(touched, dtype=np.int64))
+        return index
+
+    # Copy of texts grown to the inventory's VM count, wide enough for the touched VMs' values
+    @staticmethod
+    def extended(texts, column, touched):
+        width = max([texts.dtype.itemsize // 4, 1] + [len(column[v] or "") for v in touched])
+        extended = np.zeros(len(column), dtype=f"U{width}")
+        extended[:len(texts)] = texts
+        return extended
+
+    # Mask of the VMs whose name contains term, from the trigram postings, or starts with it
+    # for prefix matches and terms too short for trigrams (from the sorted names). The
+    # structures are as of the build, so VMs edited since are checked directly.
+    def match_names(self, term, prefix=False):
+        short = prefix or len(term) < 3
+        mask = np.zeros(len(self.names), dtype=bool)
+        if short:
+            mask[self.name_order[self.prefix_slice(self.sorted_names, term)]] = True
+        else:
+            postings = []
+            for i in range(len(term) - 2):
+                key = trigram_key(ord(term[i]), ord(term[i + 1]), ord(term[i + 2]))
+                k = np.searchsorted(self.keys, key)
+                if k == len(self.keys) or self.keys[k] != key:
+                    postings = None
+                    break
+                postings.append(self.postings[self.starts[k]:self.starts[k + 1]])
+            if postings:
+                postings.sort(key=len)
+                mask[postings[0]] = True
+                for posting in postings[1:]:
+                    found = np.zeros(len(self.names), dtype=bool)
+                    found[posting] = True
+                    mask &= found
+            if len(term) > 3:  # Having all the trigrams doesn't make them adjacent
+                candidates = np.flatnonzero(mask)
+                mask[candidates] = np.char.find(self.names[candidates], term) >= 0
+        if len(self.fresh):
+            names = self.names[self.fresh]
+            mask[self.fresh] = np.char.startswith(names, term) if short else np.char.find(names, term) >= 0
+        return mask
+
+    def match_uuids(self, term):
+        mask = np.zeros(len(self.uuids), dtype=bool)
+        mask[self.uuid_order[self.prefix_slice(self.sorted_uuids, term)]] = True
+        if len(self.fresh):
+            mask[self.fresh] = np.char.startswith(self.uuids[self.fresh], term)
+        return mask
+
+    @staticmethod
+    def prefix_slice(ordered, term):
+        return slice(np.searchsorted(ordered, term, "left"), np.searchsorted(ordered, term + "\U0010ffff", "left"))
+
+    # Boolean mask over the VMs for one text test on a column
+    def text_mask(self, table, column, test):
+        inventory = self.inventory
+        if table == "vm" and column == "name":
+            mask = self.match_names(test[1], prefix=test[0] == "=")
+            return mask & (self.names == test[1]) if test[0] == "=" else mask
+        if table == "vm" and column == "uuid":
+            mask = self.match_uuids(test[1])
+            return mask & (self.uuids == test[1]) if test[0] == "=" else mask
+        labels = inventory.categories[column].labels
+        op, text = test
+        matches = np.array([(str(label).lower() == text) if op == "=" else (text in str(label).lower()) for label in labels] or [False])
+        hits = matches[inventory.values(inventory.vm if table == "vm" else inventory.block, column)]
+        return self.to_vms(table, hits)
+
+    def number_mask(self, table, column, op, value):
+        columns = self.inventory.vm if table == "vm" else self.inventory.block
+        values = self.inventory.values(columns, column)
+        with np.errstate(invalid="ignore"):
+            hits = {">": values > value, "<": values < value, ">=": values >= value, "<=": values <= value,
+                    "=": values == value, ":": values == value, "~": values == value, "!=": values != value}[op]
+        return self.to_vms(table, hits)
+
+    def to_vms(self, table, hits):
+        if table == "vm":
+            return hits
+        inventory = self.inventory
+        mask = np.zeros(inventory.vm_count(), dtype=bool)
+        mask[inventory.values(inventory.block, "vm")[hits & inventory.values(inventory.block, "alive")]] = True
+        return mask
+
+    # VM mask for a query: every free-text term must be found in one of FREE_TEXT_FIELDS and every
+    # filter must hold. Raises ValueError for a numeric filter without a number.
+    def search(self, query):
+        inventory = self.inventory
+        terms, filters = parse_query(query)
+        mask = inventory.values(inventory.vm, "alive").copy()
+        for field, op, text in filters:
+            table, column = SEARCH_FIELDS[field]
+            if column in inventory.VM_NUMBERS + inventory.BLOCK_NUMBERS:
+                mask &= self.number_mask(table, column, op, parse_number(text))
+            elif op == "!=":
+                mask &= ~self.text_mask(table, column, ("=", text))
+            elif op in ("=", ":", "~"):
+                mask &= self.text_mask(table, column, ("=" if op == "=" else "~", text))
+            else:
+                raise ValueError(f"{field} is not a number field")
+        for term in terms:
+            found = np.zeros(inventory.vm_count(), dtype=bool)
+            for field in FREE_TEXT_FIELDS:
+                if field == "cluster" and not inventory.clustered:
+                    continue
+                found |= self.text_mask(*SEARCH_FIELDS[field], ("~", term))
+            mask &= found
+        return mask
+
+def stream_json_array(chunks, projection=None, job=None):
+    parser = JSONArrayStream(projection)
+    feed = job.timed("decode", parser.feed) if job else parser.feed
+    for chunk in chunks:
+        yield from feed(chunk)
+    yield from feed(b"", final=True)
+
+# Fetched snapshots keyed by (host, endpoint). Entries expire after ttl seconds, and concurrent
+# requests for the same key share one in-flight load instead of each hitting the cluster.
+class SnapshotCache:
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.entries = {}
+        self.flights = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def peek(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry and time.time() - entry[0] < self.ttl:
+            return entry[1]
+        return None
+
+    def age(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+        return time.time() - entry[0] if entry else None
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.time(), value)
+
+    def invalidate(self, host=None, endpoint=None):
+        with self.lock:
+            self.generation += 1
+            for key in [key for key in self.entries if (host is None or key[0] == host) and (endpoint is None or key[1] == endpoint)]:
+                del self.entries[key]
+
+    def get(self, key, loader, job=None):
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry and time.time() - entry[0] < self.ttl:
+                    return entry[1]
+                flight = self.flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self.flights[key] = {"done": threading.Event(), "value": None, "error": None}
+                generation = self.generation
+
+            if leader:
+                try:
+                    flight["value"] = loader()
+                    with self.lock:
+                        if generation == self.generation:  # Don't repopulate after an explicit refresh
+                            self.entries[key] = (time.time(), flight["value"])
+                    return flight["value"]
+                except Exception as e:
+                    flight["error"] = e
+                    raise
+                finally:
+                    with self.lock:
+                        self.flights.pop(key, None)
+                    flight["done"].set()
+
+            while not flight["done"].wait(0.1):
+                if job:
+                    job.check()
+            if flight["error"] is None:
+                return flight["value"]
+            if not isinstance(flight["error"], FetchCancelled):
+                raise flight["error"]
+            # The leading request was cancelled, take over the load
+
+# Per-user folder for the files the app keeps between sessions
+def user_data_dir():
+    if platform.system() == "Windows":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif platform.system() == "Darwin":
+        base = os.path.expanduser("~/Library/Application Support")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "HyperCoreDataViewer")
+
+def history_path():
+    return os.environ.get("HYPERCORE_HISTORY_DB") or os.path.join(user_data_dir(), "history.sqlite3")
+
+# Profiles written by profiling mode, to attach to bug reports
+def diagnostics_dir():
+    return os.environ.get("HYPERCORE_DIAGNOSTICS_DIR") or os.path.join(user_data_dir(), "diagnostics")
+
+HISTORY_DAYS = 90  # Snapshots older than this are pruned at startup, except each cluster's latest
+
+# Local history of fetched snapshots in SQLite: a row per snapshot (cluster, endpoint, time), and
+# each distinct record (a VM, or the cluster's registration) stored once by content hash. A record
+# keeps one version row for the run of snapshots it was unchanged in (since..until, until NULL
+# while current), so a snapshot costs a row plus one per changed record, and a diff only has to
+# look at the versions that start or end between the two snapshots.
+class HistoryStore:
+    SCHEMA = """
+        PRAGMA journal_mode = WAL;
+        CREATE TABLE IF NOT EXISTS snapshots (
+            id INTEGER PRIMARY KEY, cluster TEXT NOT NULL, endpoint TEXT NOT NULL, taken REAL NOT NULL,
+            records INTEGER NOT NULL, changed INTEGER NOT NULL);
+        CREATE INDEX IF NOT EXISTS snapshots_by_cluster ON snapshots (cluster, endpoint, id);
+        CREATE TABLE IF NOT EXISTS records (hash BLOB PRIMARY KEY, body TEXT NOT NULL) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS versions (
+            cluster TEXT NOT NULL, endpoint TEXT NOT NULL, key TEXT NOT NULL, since INTEGER NOT NULL, until INTEGER,
+            hash BLOB NOT NULL, PRIMARY KEY (cluster, endpoint, key, since)) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS versions_by_since ON versions (cluster, endpoint, since);
+        CREATE INDEX IF NOT EXISTS versions_by_until ON versions (cluster, endpoint, until);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.ready = False
+        self.error = None  # Last error saving a snapshot; saving never fails a fetch
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connect(self):
+        import sqlite3
+
+        with self.lock:
+            if not self.ready:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            with self.lock:
+                if not self.ready:
+                    db.executescript(self.SCHEMA)
+                    self.ready = True
+            yield db
+        finally:
+            db.close()
+
+    def recorder(self, cluster, endpoint):
+        return SnapshotRecorder(self, cluster, endpoint)
+
+    def save(self, cluster, endpoint, records):
+        recorder = self.recorder(cluster, endpoint)
+        for key, record in records.items():
+            recorder.add(key, record)
+        return recorder.commit()
+
+    # {key: hash} of the records in the cluster's latest snapshot
+    def current_hashes(self, cluster, endpoint):
+        with self.connect() as db:
+            return dict(db.execute("SELECT key, hash FROM versions WHERE cluster = ? AND endpoint = ? AND until IS NULL",
+                                   (cluster, endpoint)))
+
+    # Add a snapshot: changed is [(key, hash, body)] of new or edited records, removed the keys gone since the last one
+    def commit(self, cluster, endpoint, taken, count, changed, removed):
+        with self.connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                snapshot = db.execute("INSERT INTO snapshots (cluster, endpoint, taken, records, changed) VALUES (?, ?, ?, ?, ?)",
+                                      (cluster, endpoint, taken, count, len(changed) + len(removed))).lastrowid
+                db.executemany("INSERT OR IGNORE INTO records (hash, body) VALUES (?, ?)", [(digest, body) for key, digest, body in changed])
+                db.executemany("UPDATE versions SET until = ? WHERE cluster = ? AND endpoint = ? AND key = ? AND until IS NULL",
+                               [(snapshot, cluster, endpoint, key) for key in itertools.chain((change[0] for change in changed), removed)])
+                db.executemany("INSERT OR REPLACE INTO versions (cluster, endpoint, key, since, until, hash) VALUES (?, ?, ?, ?, NULL, ?)",
+                               [(cluster, endpoint, key, snapshot, digest) for key, digest, body in changed])
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return snapshot
+
+    def clusters(self, endpoint="/VirDomain"):
+        with self.connect() as db:
+            return [cluster for cluster, in db.execute("SELECT DISTINCT cluster FROM snapshots WHERE endpoint = ? ORDER BY cluster", (endpoint,))]
+
+    # [(snapshot, taken, records, changed)] for a cluster, newest first
+    def snapshots(self, cluster, endpoint="/VirDomain"):
+        with self.connect() as db:
+            return db.execute("SELECT id, taken, records, changed FROM snapshots WHERE cluster = ? AND endpoint = ? ORDER BY id DESC",
+                              (cluster, endpoint)).fetchall()
+
+    # (cluster, snapshot, taken) of the newest snapshot of endpoint, of any cluster unless one is given
+    def latest(self, endpoint="/VirDomain", cluster=None):
+        with self.connect() as db:
+            if cluster is None:
+                return db.execute("SELECT cluster, id, taken FROM snapshots WHERE endpoint = ? ORDER BY id DESC LIMIT 1", (endpoint,)).fetchone()
+            return db.execute("SELECT cluster, id, taken FROM snapshots WHERE cluster = ? AND endpoint = ? ORDER BY id DESC LIMIT 1",
+                              (cluster, endpoint)).fetchone()
+
+    def snapshot_info(self, db, snapshot):
+        info = db.execute("SELECT cluster, endpoint, taken FROM snapshots WHERE id = ?", (snapshot,)).fetchone()
+        if info is None:
+            raise ValueError(f"No snapshot {snapshot}")
+        return info
+
+    # {key: record} as of a snapshot
+    def load(self, snapshot):
+        with self.connect() as db:
+            cluster, endpoint, taken = self.snapshot_info(db, snapshot)
+            rows = db.execute("SELECT v.key, r.body FROM versions v JOIN records r ON r.hash = v.hash "
+                              "WHERE v.cluster = ? AND v.endpoint = ? AND v.since <= ? AND (v.until IS NULL OR v.until > ?)",
+                              (cluster, endpoint, snapshot, snapshot)).fetchall()
+        records = json.loads("[" + ",".join(body for key, body in rows) + "]")  # One decode call instead of one per record
+        return {key: record for (key, body), record in zip(rows, records)}
+
+    # Records that differ between two snapshots of the same cluster and endpoint:
+    # {"added": [record], "removed": [record], "changed": [(old, new)]}. Only keys with a version
+    # starting or ending between the two are looked at, found through the since/until indexes.
+    def diff(self, old, new):
+        old, new = min(old, new), max(old, new)
+        with self.connect() as db:
+            cluster, endpoint, _ = self.snapshot_info(db, old)
+            if self.snapshot_info(db, new)[:2] != (cluster, endpoint):
+                raise ValueError("Snapshots are of different clusters")
+            rows = db.execute("""
+                WITH candidates(key) AS (
+                    SELECT key FROM versions WHERE cluster = :cluster AND endpoint = :endpoint AND since > :old AND since <= :new
+                    UNION
+                    SELECT key FROM versions WHERE cluster = :cluster AND endpoint = :endpoint AND until > :old AND until <= :new)
+                SELECT v.key, v.since <= :old, v.hash, r.body FROM candidates c
+                JOIN versions v ON v.cluster = :cluster AND v.endpoint = :endpoint AND v.key = c.key
+                JOIN records r ON r.hash = v.hash
+                WHERE (v.since <= :old AND (v.until IS NULL OR v.until > :old)) OR (v.since <= :new AND (v.until IS NULL OR v.until > :new))
+            """, {"cluster": cluster, "endpoint": endpoint, "old": old, "new": new})
+            before = {}
+            after = {}
+            for key, is_old, digest, body in rows:
+                (before if is_old else after)[key] = (digest, body)
+        return {
+            "added": [json.loads(after[key][1]) for key in after if key not in before],
+            "removed": [json.loads(before[key][1]) for key in before if key not in after],
+            "changed": [(json.loads(before[key][1]), json.loads(after[key][1])) for key in before
+                        if key in after and before[key][0] != after[key][0]],
+        }
+
+    # Drop snapshots taken before the cutoff (except each cluster's latest), then the versions no
+    # remaining snapshot can see and the records no version uses
+    def prune(self, before):
+        with self.connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                deleted = db.execute("DELETE FROM snapshots WHERE taken < ? AND id NOT IN "
+                                     "(SELECT MAX(id) FROM snapshots GROUP BY cluster, endpoint)", (before,)).rowcount
+                if deleted:
+                    db.execute("DELETE FROM versions WHERE until IS NOT NULL AND until <= (SELECT MIN(s.id) FROM snapshots s "
+                               "WHERE s.cluster = versions.cluster AND s.endpoint = versions.endpoint)")
+                    db.execute("DELETE FROM records WHERE hash NOT IN (SELECT hash FROM versions)")
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+# Collects one snapshot as it streams in: each record is hashed on arrival and only encoded and
+# kept if it differs from the cluster's latest snapshot, so unchanged records never reach the
+# database. The hash is of repr(), which is stable here since projected records have a fixed
+# key order, and is several times cheaper than encoding every record as JSON.
+class SnapshotRecorder:
+    def __init__(self, store, cluster, endpoint):
+        self.store = store
+        self.cluster = cluster
+        self.endpoint = endpoint
+        self.taken = time.time()
+        self.current = store.current_hashes(cluster, endpoint)
+        self.seen = set()
+        self.changed = []
+
+    def add(self, key, record):
+        if key in self.seen:
+            return
+        self.seen.add(key)
+        digest = hashlib.blake2b(repr(record).encode("utf-8"), digest_size=16).digest()
+        if self.current.get(key) != digest:
+            self.changed.append((key, digest, json.dumps(record, separators=(",", ":"))))
+
+    def commit(self):
+        removed = [key for key in self.current if key not in self.seen]
+        return self.store.commit(self.cluster, self.endpoint, self.taken, len(self.seen), self.changed, removed)
+
+# Display rows for a VM diff: (change, VM, UUID, details) for added and removed VMs, state
+# changes, resized disks and any other edit
+def diff_rows(diff):
+    def vm(record):
+        return record.get("name", ""), record.get("uuid", "")
+
+    def size(value):
+        value = gib(value, 2)
+        return "N/A" if np.isnan(value) else f"{value} GiB"
+
+    def other_fields(blocks):
+        return {uuid: {field: value for field, value in block.items() if field != "capacity"} for uuid, block in blocks.items()}
+
+    rows = [("added",) + vm(record) + ("",) for record in diff["added"]]
+    rows += [("removed",) + vm(record) + ("",) for record in diff["removed"]]
+    for old, new in diff["changed"]:
+        if old.get("state") != new.get("state"):
+            rows.append(("state",) + vm(new) + (f"{old.get('state')} → {new.get('state')}",))
+        old_blocks = {block.get("uuid"): block for block in old.get("blockDevs") or []}
+        new_blocks = {block.get("uuid"): block for block in new.get("blockDevs") or []}
+        for uuid, block in new_blocks.items():
+            before = old_blocks.get(uuid)
+            if before is not None and before.get("capacity") != block.get("capacity"):
+                rows.append(("resized",) + vm(new) + (f"{block.get('name') or uuid}: {size(before.get('capacity'))} → {size(block.get('capacity'))}",))
+        other = sorted(field for field in set(old) | set(new) if field not in ("state", "blockDevs") and old.get(field) != new.get(field))
+        if other_fields(old_blocks) != other_fields(new_blocks):
+            other.append("blockDevs")
+        if other:
+            rows.append(("changed",) + vm(new) + (", ".join(other),))
+    return rows
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP Error {status}")
+        self.status = status
+
+class FetchCancelled(Exception):
+    pass
+
+# Peak resident memory of the process in MiB, or None where it can't be read
+def peak_memory_mb():
+    try:
+        if platform.system() == "Windows":
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong)] + [
+                    (name, ctypes.c_size_t) for name in ("PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                                                         "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                                                         "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+            return counters.PeakWorkingSetSize / 1024 ** 2
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if platform.system() == "Darwin" else peak / 1024  # Bytes on macOS, KiB elsewhere
+    except Exception:
+        return None
+
+# Per-phase timings and counts for one operation. Phases are summed over the threads that ran
+# them (connect, wait, transfer, decode, build, render, sort, write), so they can exceed the total.
+class Metrics:
+    PHASES = ("import", "toolkit import", "window", "first paint", "connect", "wait", "transfer", "decompress", "decode", "build",
+              "store", "render", "sort", "write")
+
+    def __init__(self, label, host=None):
+        self.label = label
+        self.host = host
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.phases = {}
+        self.counts = {}
+        self.transfers = {}  # host -> [bytes received, bytes after decompression]
+        self.peak_memory_mb = None
+        self.lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self.lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counts[name] = self.counts.get(name, 0) + amount
+
+    def transferred(self, host, received, decoded):
+        with self.lock:
+            totals = self.transfers.setdefault(host, [0, 0])
+            totals[0] += received
+            totals[1] += decoded
+
+    def timed(self, phase, function):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(phase, time.perf_counter() - start)
+        return wrapper
+
+    def finish(self, status="done"):
+        self.seconds = time.perf_counter() - self.start
+        self.status = status
+        self.peak_memory_mb = peak_memory_mb()
+        return self
+
+    def record(self):
+        return {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "operation": self.label,
+            "host": self.host,
+            "status": self.status,
+            "seconds": round(self.seconds, 4),
+            "phases": {phase: round(seconds, 4) for phase, seconds in self.phases.items()},
+            "counts": dict(self.counts),
+            "transfers": {host: {"bytes": received, "uncompressed bytes": decoded} for host, (received, decoded) in self.transfers.items()},
+            "peak_memory_mb": round(self.peak_memory_mb, 1) if self.peak_memory_mb is not None else None,
+        }
+
+    def summary(self):
+        parts = [f"{self.label}: {self.seconds:.2f} s" + ("" if self.status == "done" else f" ({self.status})")]
+        for phase in sorted(self.phases, key=lambda phase: self.PHASES.index(phase) if phase in self.PHASES else len(self.PHASES)):
+            parts.append(f"{phase} {self.phases[phase]:.3f} s")
+        for name, amount in self.counts.items():
+            parts.append(f"{amount / 1024 ** 2:.1f} MiB" if name == "bytes" else f"{amount:,} {name}")
+        for host, (received, decoded) in self.transfers.items():
+            if decoded > received:
+                parts.append(f"{host} {received / 1024 ** 2:.1f} of {decoded / 1024 ** 2:.1f} MiB ({1 - received / decoded:.0%} saved)")
+            else:
+                parts.append(f"{host} {received / 1024 ** 2:.1f} MiB uncompressed")
+        if self.peak_memory_mb is not None:
+            parts.append(f"peak {self.peak_memory_mb:.0f} MiB")
+        return " | ".join(parts)
+
+    def append_to_log(self, file_path):
+        with open(file_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.record()) + "\n")
+
+# CPU and allocation profile of one action, for slow runs that can't be reproduced here. CPU time
+# is sampled from the main thread and every thread the action starts, so worker pools and the UI
+# thread are covered alike, and written as collapsed stacks ("thread;outer;...;inner count" per
+# line) that flamegraph.pl and speedscope read directly. Allocations are traced with tracemalloc
+# and reported by source line as they stood at the peak and at the end of the action.
+class Profiler:
+    INTERVAL = 0.005  # Seconds between samples
+    PEAK_CHECK = 20  # Samples between checks for a new memory peak
+    PEAK_GROWTH = 1.25  # Growth over the last peak snapshot that takes a new one
+    TOP = 30  # Entries in each list of the report
+
+    def __init__(self, label, directory):
+        self.label = label
+        self.directory = directory
+        self.stacks = Counter()
+        self.samples = 0
+        self.seconds = None
+        self.peak = 0
+        self.peak_snapshot = None
+        self.peak_snapshot_size = 0
+        self.snapshot = None
+        self.stopped = threading.Event()
+        self.owns_tracemalloc = False
+
+    def start(self):
+        import tracemalloc
+
+        np.ndarray  # Load NumPy first: importing it while tracing takes seconds and would swamp the profile
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(1)  # Only the allocating line; each extra frame slows tracing down a lot
+            self.owns_tracemalloc = True
+        self.start_time = time.perf_counter()
+        self.thread = threading.Thread(target=self.sample, name="profiler", daemon=True)
+        self.thread.start()
+        return self
+
+    # Threads that were already running (idle in the background) are left out
+    def sample(self):
+        import tracemalloc
+
+        skip = {thread.ident for thread in threading.enumerate()} - {threading.main_thread().ident} | {threading.get_ident()}
+        names = {}
+        while not self.stopped.wait(self.INTERVAL):
+            for ident, frame in sys._current_frames().items():
+                if ident in skip:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack[0].startswith("mainloop "):  # UI thread waiting for events
+                    continue
+                if ident not in names:
+                    names.update((thread.ident, thread.name) for thread in threading.enumerate())
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            if self.samples % self.PEAK_CHECK == 0 and tracemalloc.is_tracing():
+                current = tracemalloc.get_traced_memory()[0]
+                if current > self.peak_snapshot_size * self.PEAK_GROWTH:
+                    self.peak_snapshot = tracemalloc.take_snapshot()
+                    self.peak_snapshot_size = current
+
+    def stop(self):
+        import tracemalloc
+
+        self.stopped.set()
+        self.thread.join()
+        self.seconds = time.perf_counter() - self.start_time
+        if tracemalloc.is_tracing():
+            self.peak = tracemalloc.get_traced_memory()[1]
+            self.snapshot = tracemalloc.take_snapshot()
+        if self.owns_tracemalloc:
+            tracemalloc.stop()
+        return self
+
+    # Write <time>-<action>.collapsed.txt and <time>-<action>.txt (top functions and allocations);
+    # returns the path of the report
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        stem = os.path.join(self.directory, time.strftime("%Y%m%d-%H%M%S-") + (re.sub(r"\W+", "-", self.label.lower()).strip("-") or "action"))
+        with open(stem + ".collapsed.txt", "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+        own = Counter()
+        total = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]
+            own[frames[-1]] += count
+            for frame in set(frames):
+                total[frame] += count
+        samples = max(sum(self.stacks.values()), 1)
+        lines = [f"{self.label}: {self.seconds:.2f} s, {self.samples:,} samples every {self.INTERVAL * 1000:.0f} ms "
+                 "(allocation tracing slows it down, so compare shares rather than seconds)",
+                 f"Flame graph input: {os.path.basename(stem)}.collapsed.txt", "", "Functions by own samples:"]
+        lines += [f"{count / samples:7.1%} {count:7,}  {frame}" for frame, count in own.most_common(self.TOP)]
+        lines += ["", "Functions by samples including callees:"]
+        lines += [f"{count / samples:7.1%} {count:7,}  {frame}" for frame, count in total.most_common(self.TOP)]
+        for title, snapshot in ((f"Allocations near the peak ({self.peak / 1024 ** 2:.1f} MiB traced)", self.peak_snapshot),
+                                ("Allocations still held at the end", self.snapshot)):
+            if snapshot is None:
+                continue
+            statistics = snapshot.statistics("lineno")
+            lines += ["", f"{title}: {sum(stat.size for stat in statistics) / 1024 ** 2:.1f} MiB in this snapshot"]
+            lines += [f"{stat.size / 1024 ** 2:9.2f} MiB {stat.count:9,} blocks  {stat.traceback[0]}" for stat in statistics[:self.TOP]]
+        with open(stem + ".txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return stem + ".txt"
+
+# Background fetch handle: reports progress to the UI queue and aborts its sockets on cancel
+class FetchJob:
+    def __init__(self, ui_queue, label, key=None):
+        self.ui_queue = ui_queue
+        self.label = label
+        self.key = key
+        self.parent = None
+        self.expired = False
+        self.detached = False  # Left running in the background by the app, see ClusterApp.start_job
+        self.cancelled = threading.Event()
+        self._children = set()
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._last_progress = 0
+        self.metrics = None  # Metrics when instrumentation is on
+
+    # function itself when metrics are off, so uninstrumented runs pay only this check
+    def timed(self, phase, function):
+        return self.metrics.timed(phase, function) if self.metrics else function
+
+    def count(self, name, amount=1):
+        if self.metrics:
+            self.metrics.count(name, amount)
+
+    # Phase times measured elsewhere, i.e. in the worker process
+    def add_times(self, phases):
+        if self.metrics:
+            for phase, seconds in phases.items():
+                self.metrics.add(phase, seconds)
+
+    def transferred(self, host, received, decoded):
+        if self.metrics:
+            self.metrics.transferred(host, received, decoded)
+
+    def post(self, kind, payload=None):
+        if self.parent:
+            self.parent.post(kind, payload)
+        elif self.ui_queue is not None:  # Background jobs have no UI queue
+            self.ui_queue.put((self, kind, payload))
+
+    def progress(self, endpoint, done, total):
+        now = time.perf_counter()
+        if now - self._last_progress >= 0.1 or done == total:  # Throttle to ~10 updates/s
+            self._last_progress = now
+            self.post("progress", (f"{self.label}{endpoint}" if self.parent else endpoint, done, total))
+
+    # Sub-job for one cluster of a multi-cluster fetch; cancelled with its parent or on its own deadline
+    def child(self, label):
+        child = FetchJob(self.ui_queue, label)
+        child.parent = self
+        child.metrics = self.metrics
+        with self._lock:
+            self._children.add(child)
+        if self.cancelled.is_set():
+            child.cancel()
+        return child
+
+    def remove_child(self, child):
+        with self._lock:
+            self._children.discard(child)
+
+    def expire(self):
+        self.expired = True
+        self.cancel()
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise FetchCancelled()
+
+    def attach(self, connection):
+        with self._lock:
+            self._connections.add(connection)
+        if self.cancelled.is_set():
+            self.abort(connection)
+
+    def detach(self, connection):
+        with self._lock:
+            self._connections.discard(connection)
+
+    def abort(self, connection):
+        try:
+            if connection.sock:
+                connection.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def cancel(self):
+        self.cancelled.set()
+        with self._lock:
+            connections = list(self._connections)
+            children = list(self._children)
+        for connection in connections:
+            self.abort(connection)
+        for child in children:
+            child.cancel()
+
+# A cluster is given as one node address, or several separated by commas, semicolons or spaces
+def cluster_nodes(host):
+    return [node for node in re.split(r"[\s,;]+", host) if node]
+
+# Connect latency and recent failures per node, kept between sessions so the fastest healthy node
+# of a cluster is tried first
+class NodeStats:
+    ALPHA = 0.3  # Weight of the newest sample in the moving average
+    PENALTY = 60  # Seconds a failed node is tried after the others
+
+    def __init__(self, path=None):
+        self.path = path
+        self.nodes = {}  # node -> {"latency": seconds, "failed": time of the last failure}
+        self.loaded = path is None
+        self.lock = threading.Lock()
+
+    def load(self):
+        with self.lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self.nodes = json.load(f)
+            except (OSError, ValueError):
+                pass
+
+    def save(self):
+        if self.path is None or not self.nodes:
+            return
+        with self.lock:
+            data = json.dumps(self.nodes)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(data)
+        except OSError:
+            pass
+
+    def record(self, node, seconds):
+        with self.lock:
+            stats = self.nodes.setdefault(node, {})
+            latency = stats.get("latency")
+            stats["latency"] = seconds if latency is None else latency + self.ALPHA * (seconds - latency)
+            stats.pop("failed", None)
+
+    def failed(self, node):
+        with self.lock:
+            self.nodes.setdefault(node, {})["failed"] = time.time()
+
+    # Nodes best first: healthy before recently failed, then by latency; unmeasured nodes keep their order
+    def rank(self, nodes):
+        self.load()
+        now = time.time()
+        with self.lock:
+            stats = [self.nodes.get(node, {}) for node in nodes]
+        return [node for i, node in sorted(enumerate(nodes), key=lambda item: (
+            now - stats[item[0]].get("failed", 0) < self.PENALTY, stats[item[0]].get("latency", float("inf")), item[0]))]
+
+# Last response per (host, endpoint): its validators (ETag, Last-Modified), a hash of the body and
+# the parsed result. Kept in memory and, with a path, on disk between sessions as one pickle per
+# endpoint, only ever written by the app; a file that fails to load is ignored.
+class ResponseCache:
+    VERSION = 1  # Bumped when the type of a cached result changes, so older files are ignored
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def file_for(self, key):
+        return os.path.join(self.path, hashlib.sha1(repr(key).encode("utf-8")).hexdigest() + ".pickle")
+
+    # {"etag", "last_modified", "hash", "value"} or None
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is not None or self.path is None:
+            return entry
+        import pickle
+
+        try:
+            with open(self.file_for(key), "rb") as f:
+                entry = pickle.load(f)
+        except Exception:  # Missing, truncated or written by another version
+            return None
+        if not isinstance(entry, dict) or entry.get("version") != self.VERSION or entry.get("key") != key:
+            return None
+        with self.lock:
+            return self.entries.setdefault(key, entry)
+
+    def put(self, key, etag, last_modified, content_hash, value):
+        entry = {"version": self.VERSION, "key": key, "etag": etag, "last_modified": last_modified, "hash": content_hash, "value": value}
+        with self.lock:
+            self.entries[key] = entry
+        if self.path is None:
+            return
+        import pickle
+
+        file_path = self.file_for(key)
+        temp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(temp_path, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, file_path)
+        except OSError:
+            pass
+
+# REST client holding a pool of warm keep-alive connections and a login session per cluster. With
+# several node addresses, new connections race the nodes and requests fail over between them.
+class HyperCoreClient:
+    _ssl_context = None
+    _tls_sessions = {}
+    _clients = {}
+    _clients_lock = threading.Lock()
+    node_stats = NodeStats()  # Replaced by a persisted one in the app and the export command
+    response_cache = ResponseCache()  # Likewise
+    CONNECT_STAGGER = 0.25  # Head start of each node over the next, as in happy eyeballs (RFC 8305)
+
+    def __init__(self, host, username, password, max_idle=4):
+        self.host = host
+        self.nodes = cluster_nodes(host) or [host]
+        self.username = username
+        self.password = password
+        self.max_idle = max_idle
+        self.session_id = None
+        self.use_basic_auth = False
+        self._idle = []
+        self._lock = threading.Lock()
+        self._login_lock = threading.Lock()
+
+    # One shared client per host, replaced when the credentials change
+    @classmethod
+    def for_host(cls, host, username, password):
+        with cls._clients_lock:
+            client = cls._clients.get(host)
+            if client and (client.username, client.password) == (username, password):
+                return client
+            if client:
+                client.close()
+            client = cls._clients[host] = cls(host, username, password)
+            return client
+
+    @classmethod
+    def close_all(cls):
+        with cls._clients_lock:
+            for client in cls._clients.values():
+                client.close()
+            cls._clients.clear()
+        cls.node_stats.save()
+
+    @classmethod
+    def ssl_context(cls):
+        if cls._ssl_context is None:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            cls._ssl_context = context
+        return cls._ssl_context
+
+    def basic_credentials(self):
+        return 'Basic {0}'.format(str(base64.b64encode(bytes(f'{self.username}:{self.password}', 'utf-8')), 'utf-8'))
+
+    def headers(self):
+        rest_opts = {
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive',
+            'Accept-Encoding': 'gzip, deflate'
+        }
+        if self.session_id:
+            rest_opts['Cookie'] = f'sessionID={self.session_id}'
+        else:
+            rest_opts['Authorization'] = self.basic_credentials()
+        return rest_opts
+
+    def new_connection(self, node, timeout):
+        connection = ResumableHTTPSConnection(node, self._tls_sessions, timeout=timeout, context=self.ssl_context())
+        connection.node = node
+        return connection
+
+    # An idle connection to a node not in exclude, else a new one (connected already when racing nodes)
+    def acquire(self, timeout, job=None, exclude=()):
+        with self._lock:
+            connection = next((connection for connection in reversed(self._idle) if connection.node not in exclude), None)
+            if connection is not None:
+                self._idle.remove(connection)
+        if connection is not None:
+            connection.reused = True
+        elif len(self.nodes) == 1:
+            connection = self.new_connection(self.nodes[0], timeout)
+            connection.reused = False
+        else:
+            connection = (job.timed("connect", self.race) if job else self.race)(timeout, job, exclude)
+            connection.reused = False
+        connection.timeout = timeout
+        if connection.sock:
+            connection.sock.settimeout(timeout)
+        return connection
+
+    # Connect to the best-ranked node, giving each attempt CONNECT_STAGGER before also trying the
+    # next (at once when one fails). The first to finish TCP and TLS wins; the rest are closed.
+    def race(self, timeout, job=None, exclude=()):
+        nodes = [node for node in self.node_stats.rank(self.nodes) if node not in exclude]
+        results = queue.Queue()
+
+        def attempt(connection):
+            start = time.perf_counter()
+            try:
+                connection.connect()
+                results.put((connection, time.perf_counter() - start, None))
+            except Exception as e:
+                results.put((connection, None, e))
+
+        started = 0
+        pending = 0
+        error = None
+        next_start = 0.0
+        try:
+            while True:
+                if started < len(nodes) and (pending == 0 or time.perf_counter() >= next_start):
+                    connection = self.new_connection(nodes[started], timeout)
+                    if job:
+                        job.attach(connection)
+                    threading.Thread(target=attempt, args=(connection,), daemon=True).start()
+                    started += 1
+                    pending += 1
+                    next_start = time.perf_counter() + self.CONNECT_STAGGER
+                if pending == 0:
+                    raise error
+                wait = next_start - time.perf_counter() if started < len(nodes) else 0.1
+                try:
+                    connection, seconds, e = results.get(timeout=max(0.0, min(wait, 0.1)))
+                except queue.Empty:
+                    if job:
+                        job.check()
+                    continue
+                pending -= 1
+                if e is None:
+                    break
+                self.node_stats.failed(connection.node)
+                self.discard(connection, job)
+                error = e
+        except BaseException:  # Cancelled: close the attempts still under way as they finish
+            if pending:
+                threading.Thread(target=self.close_losers, args=(results, pending, job), daemon=True).start()
+            raise
+
+        self.node_stats.record(connection.node, seconds)
+        if job:
+            job.count("connections")
+            if getattr(connection.sock, "session_reused", False):
+                job.count("resumed TLS sessions")
+        if pending:
+            threading.Thread(target=self.close_losers, args=(results, pending, job), daemon=True).start()
+        return connection
+
+    def close_losers(self, results, pending, job):
+        for _ in range(pending):
+            connection, seconds, e = results.get()
+            if e is None:
+                self.node_stats.record(connection.node, seconds)
+            self.discard(connection, job)
+
+    # Drop the idle connections to a node that failed
+    def drop_idle(self, node):
+        with self._lock:
+            dropped = [connection for connection in self._idle if connection.node == node]
+            self._idle = [connection for connection in self._idle if connection.node != node]
+        for connection in dropped:
+            connection.close()
+
+    def release(self, connection, response):
+        if response.will_close or connection.sock is None:
+            connection.close()
+            return
+        if getattr(connection.sock, "session", None) is not None:
+            self._tls_sessions[(connection.host, connection.port)] = connection.sock.session
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    # Send a request and return the connection with its response headers read but the body unread.
+    # A socket error or timeout on one node is retried on the others, if the cluster has several.
+    def open(self, method, endpoint, body=None, timeout=30, headers=None, job=None):
+        rest_opts = dict(headers if headers is not None else self.headers())
+        payload = json.dumps(body) if body is not None else None
+        retried = False
+        failed = set()
+        while True:
+            if job:
+                job.check()
+            connection = self.acquire(timeout, job, failed)
+            if job:
+                job.attach(connection)
+            try:
+                if job and job.metrics and connection.sock is None:  # Time the TCP and TLS handshake apart from the request
+                    job.timed("connect", connection.connect)()
+                    job.count("connections")
+                    if getattr(connection.sock, "session_reused", False):
+                        job.count("resumed TLS sessions")
+                request = job.timed("wait", self.request) if job else self.request
+                return connection, request(connection, method, endpoint, payload, rest_opts)
+            except Exception as e:
+                self.discard(connection, job)
+                if job:
+                    job.check()
+                stale = isinstance(e, (http.RemoteDisconnected, http.CannotSendRequest, ConnectionResetError, BrokenPipeError))
+                if stale and connection.reused and not retried:  # Server dropped an idle keep-alive, retry on a fresh socket
+                    retried = True
+                    continue
+                if isinstance(e, OSError) and len(failed) + 1 < len(self.nodes):  # Fail over to another node
+                    failed.add(connection.node)
+                    self.node_stats.failed(connection.node)
+                    self.drop_idle(connection.node)
+                    continue
+                raise
+
+    def request(self, connection, method, endpoint, payload, headers):
+        connection.request(method, f'/rest/v1{endpoint}', payload, headers)
+        return connection.getresponse()
+
+    def discard(self, connection, job=None):
+        connection.close()
+        if job:
+            job.detach(connection)
+
+    def finish(self, connection, response, job=None):
+        if job:
+            job.detach(connection)
+        self.release(connection, response)
+
+    # Yield the body in chunks so progress can be reported and a cancel takes effect mid-transfer.
+    # Compressed bodies are inflated chunk by chunk, so the consumer only ever sees plain JSON.
+    def iter_body(self, connection, response, endpoint, job=None, chunk_size=65536):
+        total = int(response.getheader('Content-Length') or 0)
+        done = 0
+        read = job.timed("transfer", response.read) if job else response.read
+        try:
+            inflater = Inflater.for_response(response)
+            inflate = (job.timed("decompress", inflater.feed) if job else inflater.feed) if inflater else None
+            while True:
+                chunk = read(chunk_size)
+                if not chunk:
+                    break
+                done += len(chunk)
+                if job:
+                    job.check()
+                    job.progress(endpoint, done, total)
+                if inflate:
+                    chunk = inflate(chunk)
+                    if not chunk:
+                        continue
+                yield chunk
+            if inflater:
+                tail = inflater.flush()
+                if tail:
+                    yield tail
+            if job:
+                job.count("bytes", done)
+                job.transferred(self.host, done, inflater.size if inflater else done)
+        except GeneratorExit:  # Consumer stopped early, the connection is mid-body and can't be reused
+            self.discard(connection, job)
+            raise
+        except Exception:
+            self.discard(connection, job)
+            if job:
+                job.check()
+            raise
+        self.finish(connection, response, job)
+
+    def send(self, method, endpoint, body=None, timeout=30, headers=None, job=None):
+        connection, response = self.open(method, endpoint, body, timeout, headers, job)
+        return response.status, b"".join(self.iter_body(connection, response, endpoint, job))
+
+    # Log in once and reuse the session cookie; fall back to Basic auth if sessions are unavailable
+    def login(self, job=None):
+        with self._login_lock:
+            if self.session_id or self.use_basic_auth:
+                return
+            status, data = self.send('POST', '/login', {"username": self.username, "password": self.password, "useOIDC": False},
+                                     headers={'Content-Type': 'application/json', 'Connection': 'keep-alive'}, job=job)
+            if status == 401:
+                raise Exception("HTTP Error 401")
+            session_id = json.loads(data.decode("utf-8")).get("sessionID") if status == 200 else None
+            if session_id:
+                self.session_id = session_id
+            else:
+                self.use_basic_auth = True
+
+    # Open an authenticated GET, logging in again if the cluster expired the session. With
+    # conditional headers (If-None-Match / If-Modified-Since), a 304 is returned as well.
+    def open_get(self, endpoint, timeout=30, job=None, conditions=None):
+        self.login(job)
+        session_id = self.session_id
+        connection, response = self.open('GET', endpoint, timeout=timeout, headers=dict(self.headers(), **(conditions or {})), job=job)
+        if response.status == 401 and session_id:
+            response.read()
+            self.finish(connection, response, job)
+            self.session_id = None
+            self.login(job)
+            connection, response = self.open('GET', endpoint, timeout=timeout, headers=dict(self.headers(), **(conditions or {})), job=job)
+        if response.status != 200 and not (response.status == 304 and conditions):
+            self.discard(connection, job)
+            raise HTTPError(response.status)
+        return connection, response
+
+    def stream(self, endpoint, timeout=30, job=None):
+        connection, response = self.open_get(endpoint, timeout, job)
+        yield from self.iter_body(connection, response, endpoint, job)
+
+    def get(self, endpoint, timeout=30, job=None):
+        return b"".join(self.stream(endpoint, timeout, job))
+
+    def get_json(self, endpoint, timeout=30, job=None):
+        loads = job.timed("decode", json.loads) if job else json.loads
+        return loads(self.get(endpoint, timeout, job).decode("utf-8"))
+
+    # GET endpoint and build a result from its body with parse(chunks, unchanged), through the
+    # response cache. A cached result is revalidated with If-None-Match / If-Modified-Since and
+    # reused as is on a 304. If the cluster sent no validators, the body is still parsed as it
+    # streams in, but hashed on the way; when it turns out the same as the cached one, the cached
+    # result is returned instead so it is not re-rendered. unchanged() tells parse so once the
+    # body is read, for side effects such as history snapshots to skip.
+    def get_parsed(self, endpoint, parse, timeout=30, job=None):
+        key = (self.host, endpoint)
+        cached = self.response_cache.get(key)
+        conditions = {}
+        if cached and cached["etag"]:
+            conditions["If-None-Match"] = cached["etag"]
+        if cached and cached["last_modified"]:
+            conditions["If-Modified-Since"] = cached["last_modified"]
+        connection, response = self.open_get(endpoint, timeout, job, conditions)
+        if response.status == 304:
+            response.read()
+            self.finish(connection, response, job)
+            if job:
+                job.count("not modified")
+            return cached["value"]
+
+        etag, last_modified = response.getheader("ETag"), response.getheader("Last-Modified")
+        content_hash = hashlib.blake2b(digest_size=16)
+
+        def hashed(chunks):
+            for chunk in chunks:
+                content_hash.update(chunk)
+                yield chunk
+
+        def unchanged():
+            return bool(cached) and not (etag or last_modified) and content_hash.digest() == cached["hash"]
+
+        value = parse(hashed(self.iter_body(connection, response, endpoint, job)), unchanged)
+        if unchanged():
+            if job:
+                job.count("unchanged")
+            return cached["value"]
+        put = job.timed("store", self.response_cache.put) if job else self.response_cache.put
+        put(key, etag, last_modified, content_hash.digest(), value)
+        return value
+
+    def close(self):
+        if self.session_id:
+            try:
+                self.send('POST', '/logout', timeout=5)
+            except Exception:
+                pass
+            self.session_id = None
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+NUMERIC_VM_COLUMNS = ("vCPUs", "Memory (GiB)", "Capacity (GiB)", "Allocation (GiB)")
+
+VM_COLUMNS = (
+    "Name", "UUID", "Description", "OS", "Machine Type", "State", "vCPUs", "Memory (GiB)", 
+    "Block Device", "Device Type", "Capacity (GiB)", "Allocation (GiB)", "Mount Points"
+)
+CLUSTER_COLUMNS = ("Tag", "Value")
+
+# Summary group-by keys: name -> (table, column) of a VMInventory code column
+SUMMARY_KEYS = {"Cluster": ("vm", "cluster"), "OS": ("vm", "os"), "Machine Type": ("vm", "machine_type"),
+                "State": ("vm", "state"), "Device Type": ("block", "type")}
+SUMMARY_MEASURES = ("VMs", "vCPUs", "Memory (GiB)", "Block Devices", "Capacity (GiB)", "Allocation (GiB)")
+NODE_COLUMNS = (
+    "Peer ID", "LAN IP", "Backplane IP", "Cores", "CPU Usage (%)", "Memory (GiB)", "Memory Used (GiB)",
+    "VMs", "Running", "vCPUs", "VM Memory (GiB)", "Busy vCPUs", "VM Network (Mbit/s)", "Hosted VMs"
+)
+
+def export_cell(value):
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(item) for item in value)
+    return "" if value is None else value
+
+def summary_cells(measures):
+    vms, vcpus, memory, blocks, capacity, allocation = measures
+    return (int(round(vms)), int(round(vcpus)), int(round(memory)), int(round(blocks)), round(capacity, 2), round(allocation, 2))
+
+# Measures of the whole inventory; each VM counts once even when a block device key puts it in several groups
+def summary_total(inventory):
+    vcpus, memory, capacity, allocation = inventory.sums
+    return summary_cells((np.count_nonzero(inventory.values(inventory.vm, "alive")), vcpus, memory,
+                          np.count_nonzero(inventory.values(inventory.block, "alive")), capacity, allocation))
+
+# Summary view table: (columns, one row per group sorted by its labels, TOTAL row); keys is non-empty
+def summary_table(inventory, keys):
+    groups = sorted(inventory.summary(keys).items(), key=lambda item: [str(label).lower() for label in item[0]])
+    rows = [labels + summary_cells(measures) for labels, measures in groups]
+    return tuple(keys) + SUMMARY_MEASURES, rows, ("TOTAL",) + ("",) * (len(keys) - 1) + summary_total(inventory)
+
+# Export sheet: the subtotals by each key in turn, one after the other
+def summary_export_rows(inventory):
+    for key in SUMMARY_KEYS:
+        if key != "Cluster" or inventory.clustered:
+            for row in summary_table(inventory, (key,))[1]:
+                yield (key,) + row
+
+SUMMARY_EXPORT_COLUMNS = ("Group By", "Group") + SUMMARY_MEASURES
+
+# One table per output: (sheet name, columns, row iterator, total row or None)
+def export_tables(vm_snapshot, cluster_data, collector=None, stats_rows=None, related=()):
+    cluster_columns, cluster_rows = cluster_table(cluster_data)
+    tables = [
+        ("Cluster", cluster_columns, iter(cluster_rows), None),
+        ("Virtual Machines", vm_snapshot.columns, vm_snapshot.export_rows(), vm_snapshot.total_row()),
+        ("Summary", SUMMARY_EXPORT_COLUMNS, summary_export_rows(vm_snapshot), ("TOTAL", "") + summary_total(vm_snapshot)),
+    ]
+    if stats_rows is None:
+        stats_rows = export_stats_rows(vm_snapshot, collector)
+    if stats_rows is not None:
+        tables.append(("VM Stats", STATS_COLUMNS, iter(stats_rows), None))
+    for table in related:
+        tables.append((table.name, table.columns, iter(table.rows), None))
+    return tables
+
+# Rows of the VM Stats sheet, or None without collected stats
+def export_stats_rows(vm_snapshot, collector):
+    if not (collector and collector.samples):
+        return None
+    names = {uuid: vm_snapshot.vm["name"][v] for uuid, v in vm_snapshot.index.items()}
+    return collector.capacity_rows(names)
+
+# Constant-memory workbook: rows are flushed as written and column widths tracked on the way
+def write_xlsx(file_path, tables):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(file_path, {"constant_memory": True})
+    try:
+        header_format = workbook.add_format({"bold": True, "border": 1})
+        bold_format = workbook.add_format({"bold": True})
+        for sheet_name, columns, rows, total in tables:
+            worksheet = workbook.add_worksheet(sheet_name)
+            widths = [len(col) for col in columns]
+            worksheet.write_row(0, 0, columns, header_format)
+            all_rows = itertools.chain(((row, None) for row in rows), [(total, bold_format)] if total else [])
+            for row_num, (row, cell_format) in enumerate(all_rows, start=1):
+                row = [export_cell(value) for value in row]
+                worksheet.write_row(row_num, 0, row, cell_format)
+                for i, value in enumerate(row):
+                    length = len(str(value))
+                    if length > widths[i]:
+                        widths[i] = length
+            for i, width in enumerate(widths):
+                worksheet.set_column(i, i, width + 2)
+    finally:
+        workbook.close()
+
+def sibling_path(file_path, sheet_name, index):
+    if index == 0:
+        return file_path
+    stem, ext = os.path.splitext(file_path)
+    return f"{stem}-{sheet_name.lower().replace(' ', '-')}{ext}"
+
+# Flat formats get one file per table: the VM table at file_path, the rest alongside it
+def flat_tables(tables):
+    return sorted(tables, key=lambda table: table[0] != "Virtual Machines")
+
+def write_csv(file_path, tables):
+    for index, (sheet_name, columns, rows, total) in enumerate(flat_tables(tables)):
+        with open(sibling_path(file_path, sheet_name, index), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow([export_cell(value) for value in row])
+            if total:
+                writer.writerow([export_cell(value) for value in total])
+
+def write_jsonl(file_path, tables):
+    for index, (sheet_name, columns, rows, total) in enumerate(flat_tables(tables)):
+        with open(sibling_path(file_path, sheet_name, index), "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(dict(zip(columns, row))) + "\n")
+
+def write_parquet(file_path, tables, batch_size=10000):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("Parquet export requires pyarrow (pip install pyarrow)")
+
+    for index, (sheet_name, columns, rows, total) in enumerate(flat_tables(tables)):
+        numeric = [col in NUMERIC_VM_COLUMNS + NUMERIC_STATS_COLUMNS + SUMMARY_MEASURES + NUMERIC_RELATED_COLUMNS for col in columns]
+        schema = pa.schema([(col, pa.float64() if is_numeric else pa.string()) for col, is_numeric in zip(columns, numeric)])
+
+        def to_batch(batch):
+            arrays = []
+            for i, is_numeric in enumerate(numeric):
+                if is_numeric:
+                    arrays.append(pa.array([row[i] if isinstance(row[i], (int, float)) else None for row in batch], pa.float64()))
+                else:
+                    arrays.append(pa.array([str(export_cell(row[i])) for row in batch], pa.string()))
+            return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+        with pq.ParquetWriter(sibling_path(file_path, sheet_name, index), schema) as writer:
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    writer.write_batch(to_batch(batch))
+                    batch = []
+            if batch:
+                writer.write_batch(to_batch(batch))
+
+FLEET_VM_COLUMNS = ("Cluster",) + VM_COLUMNS
+FLEET_CLUSTER_COLUMNS = ("Cluster",) + CLUSTER_COLUMNS
+FLEET_NODE_COLUMNS = ("Cluster",) + NODE_COLUMNS
+
+# Cluster list file: one cluster per line as "host" or "host,username,password"; '#' starts a comment
+def load_cluster_list(file_path):
+    clusters = []
+    with open(file_path, newline="", encoding="utf-8") as f:
+        for fields in csv.reader(line for line in f if line.strip() and not line.lstrip().startswith("#")):
+            fields = [field.strip() for field in fields] + ["", ""]
+            if fields[0]:
+                clusters.append((fields[0], fields[1], fields[2]))
+    return clusters
+
+# Fetch from every cluster at once through a bounded pool; each cluster gets its own deadline
+def collect_from_clusters(targets, work, job, max_workers=8, timeout=180):
+    def run(target):
+        host, username, password = target
+        child = job.child(host)
+        timer = threading.Timer(timeout, child.expire)
+        timer.daemon = True
+        timer.start()
+        try:
+            return host, work(HyperCoreClient.for_host(host, username, password), child), None
+        except Exception as e:
+            job.check()
+            return host, None, f"timed out after {timeout} s" if child.expired else str(e)
+        finally:
+            timer.cancel()
+            job.remove_child(child)
+
+    results = {}
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(targets)))) as pool:
+        for host, result, error in pool.map(run, targets):
+            if error is None:
+                results[host] = result
+            else:
+                errors[host] = error
+    return results, errors
+
+# Fleet cluster data is keyed by (host, tag) so both shapes stay plain dicts
+def merge_cluster_data(results, errors):
+    merged = {}
+    for host, cluster_data in results.items():
+        for tag, value in cluster_data.items():
+            merged[(host, tag)] = value
+    for host, error in errors.items():
+        merged[(host, "Error")] = error
+    return merged
+
+# {tag: value} from the clusterData XML of each /Registration record
+def parse_registration(ClusterDataResult):
+    import xml.etree.ElementTree as ET
+
+    cluster_data = {}
+    for xml in ClusterDataResult:
+        xml_data = xml.get("clusterData")
+        if xml_data:
+            # Parse the XML data (assuming it's a string)
+            root = ET.fromstring(xml_data)
+
+            # Assuming that the XML structure contains tags and their corresponding values
+            for elem in root.iter():
+                # Extract the tag name and the text (value) from each XML element
+                tag = elem.tag
+                value = elem.text.strip() if elem.text else "N/A"
+                cluster_data[tag] = value
+    return cluster_data
+
+def cluster_table(cluster_data):
+    if cluster_data and isinstance(next(iter(cluster_data)), tuple):
+        return FLEET_CLUSTER_COLUMNS, [(host, tag, value) for (host, tag), value in cluster_data.items()]
+    return CLUSTER_COLUMNS, list(cluster_data.items())
+
+def stat_value(record, field, missing=0.0):
+    value = record.get(field)
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else missing
+
+# One row per /Node record, joined with the VMs it hosts (VirDomain nodeUUID) and their live
+# usage from /VirDomainStats. Per-node sums are bincounts over the inventory columns.
+def node_table(nodes, stats, inventory):
+    vm = inventory.vm
+    alive = inventory.values(vm, "alive")
+    codes = inventory.values(vm, "node")[alive]
+    node_codes = inventory.categories["node"].codes
+    count = len(node_codes)
+
+    cpu_usage = np.zeros(inventory.vm_count())
+    network = np.zeros(inventory.vm_count())
+    for record in stats:
+        v = inventory.index.get(record.get("uuid"))
+        if v is not None:
+            cpu_usage[v] = stat_value(record, "cpuUsage")
+            network[v] = stat_value(record, "rxBitRate") + stat_value(record, "txBitRate")
+
+    def per_node(weights=None):
+        return np.bincount(codes, weights=weights, minlength=count)
+
+    vcpus = np.nan_to_num(inventory.values(vm, "vcpus")[alive])
+    hosted = per_node()
+    running = per_node((inventory.values(vm, "state")[alive] == inventory.categories["state"].codes.get("RUNNING", -1)).astype(float))
+    assigned = per_node(vcpus)
+    memory = per_node(np.nan_to_num(inventory.values(vm, "memory")[alive]))
+    busy = per_node(cpu_usage[alive] / 100 * vcpus)  # cpuUsage is a percentage of the VM's own vCPUs
+    traffic = per_node(network[alive])
+    names = np.split(np.flatnonzero(alive)[np.argsort(codes, kind="stable")], np.cumsum(hosted)[:-1])
+
+    rows = []
+    for node in sorted(nodes, key=lambda node: numeric_sort_key(node.get("peerID"))):
+        code = node_codes.get(node.get("uuid"))
+
+        def at(values):
+            return 0.0 if code is None else float(values[code])
+
+        cpu = node.get("cpuUsage")
+        rows.append((
+            node.get("peerID", "N/A"),
+            node.get("lanIP", "N/A"),
+            node.get("backplaneIP", "N/A"),
+            node.get("numCores", "N/A"),
+            round(cpu, 1) if isinstance(cpu, (int, float)) else "N/A",
+            number_cell(gib(node.get("memSize"), 2), "N/A"),
+            number_cell(gib(node.get("totalMemUsageBytes"), 2), "N/A"),
+            int(at(hosted)),
+            int(at(running)),
+            int(at(assigned)),
+            int(at(memory)),
+            round(at(busy), 2),
+            round(at(traffic) / 1e6, 2),
+            "" if code is None else ", ".join(sorted(str(vm["name"][v]) for v in names[code])),
+        ))
+    return {"columns": NODE_COLUMNS, "rows": rows}
+
+def merge_node_tables(results, errors):
+    rows = [(host,) + row for host, table in results.items() for row in table["rows"]]
+    return {"columns": FLEET_NODE_COLUMNS, "rows": rows, "errors": errors}
+
+def time_cell(value):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(value)) if isinstance(value, (int, float)) and value > 0 else ""
+
+def field_cell(name):
+    return lambda record: record.get(name, "")
+
+def flag_cell(name):
+    return lambda record: {True: "Yes", False: "No"}.get(record.get(name), "")
+
+# Endpoints listed against their VMs in the Related view and, when asked for, as export sheets:
+# endpoint -> (sheet name, field with the VM's UUID, ((column, cell of one record), ...))
+RELATED_TABLES = {
+    "/VirDomainSnapshot": ("Snapshots", "domainUUID", (
+        ("Label", field_cell("label")),
+        ("Type", field_cell("type")),
+        ("Taken", lambda record: time_cell(record.get("timestamp"))),
+        ("Retain Until", lambda record: time_cell(record.get("localRetainUntilTimestamp"))),
+        ("Snapshot UUID", field_cell("uuid")),
+    )),
+    "/VirDomainReplication": ("Replication", "sourceDomainUUID", (
+        ("Label", field_cell("label")),
+        ("Enabled", flag_cell("enable")),
+        ("Progress (%)", lambda record: (record.get("progress") or {}).get("percentComplete", "")),
+        ("Connection UUID", field_cell("connectionUUID")),
+        ("Replication UUID", field_cell("uuid")),
+    )),
+    "/VirDomainNetDevice": ("Network Devices", "virDomainUUID", (
+        ("Type", field_cell("type")),
+        ("MAC Address", field_cell("macAddress")),
+        ("VLAN", field_cell("vlan")),
+        ("Connected", flag_cell("connected")),
+        ("IPv4 Addresses", lambda record: ", ".join(record.get("ipv4Addresses") or [])),
+        ("Device UUID", field_cell("uuid")),
+    )),
+}
+NUMERIC_RELATED_COLUMNS = ("Progress (%)", "VLAN")
+
+# Streaming projection of a related endpoint's records to (VM UUID, cells)
+def related_projection(endpoint):
+    sheet_name, vm_field, cells = RELATED_TABLES[endpoint]
+    return lambda record: (record.get(vm_field, ""), tuple(cell(record) for _, cell in cells))
+
+# Records of a related endpoint joined to their VMs. The join goes through the inventory's
+# UUID index, built once per snapshot, so it is one lookup per record rather than a scan of
+# the VMs. Records of VMs not in the inventory keep a blank name. Rows are ordered by VM.
+class RelatedTable:
+    def __init__(self, endpoint, rows=(), clustered=False, errors=None):
+        self.endpoint = endpoint
+        self.name, _, cells = RELATED_TABLES[endpoint]
+        self.columns = ("Cluster",) * clustered + ("VM Name", "VM UUID") + tuple(column for column, _ in cells)
+        self.rows = list(rows)
+        self.errors = dict(errors or {})
+
+    @classmethod
+    def join(cls, endpoint, records, inventory):
+        names = inventory.vm["name"]
+        index = inventory.index
+        rows = sorted(((names[index[uuid]] if uuid in index else "", uuid) + cells for uuid, cells in records),
+                      key=lambda row: (str(row[0]).lower(), row[1]))
+        return cls(endpoint, rows)
+
+    @classmethod
+    def merge(cls, endpoint, parts, errors=None):
+        return cls(endpoint, [(host,) + row for host, part in parts.items() for row in part.rows], True, errors)
+
+    # VMs with at least one record
+    def vm_count(self):
+        column = self.columns.index("VM UUID")
+        return len({row[column] for row in self.rows})
+
+def disk_rate(record, field):
+    rates = [rate for vsd in record.get("vsdStats") or [] for rate in vsd.get("rates") or []]
+    return sum(stat_value(rate, field) for rate in rates) if rates else np.nan
+
+# (metric, unit, value from one VirDomainStats record)
+STAT_METRICS = (
+    ("CPU", "%", lambda record: stat_value(record, "cpuUsage", np.nan)),
+    ("Network Rx", "Mbit/s", lambda record: stat_value(record, "rxBitRate", np.nan) / 1e6),
+    ("Network Tx", "Mbit/s", lambda record: stat_value(record, "txBitRate", np.nan) / 1e6),
+    ("Disk Read", "KiB/s", lambda record: disk_rate(record, "readKibibytes")),
+    ("Disk Write", "KiB/s", lambda record: disk_rate(record, "writeKibibytes")),
+)
+STATS_COLUMNS = ("Name", "UUID", "Metric", "Unit", "Resolution", "Samples", "Mean", "P95", "Max", "From", "To")
+NUMERIC_STATS_COLUMNS = ("Samples", "Mean", "P95", "Max")
+
+# Fixed number of samples for a set of series (one column per VM); the oldest sample is overwritten
+class RingBuffer:
+    def __init__(self, capacity, width=0):
+        self.times = np.zeros(capacity)
+        self.values = np.full((capacity, width), np.nan, dtype=np.float32)
+        self.head = 0
+        self.count = 0
+
+    def widen(self, width):
+        extra = np.full((len(self.times), width - self.values.shape[1]), np.nan, dtype=np.float32)
+        self.values = np.hstack([self.values, extra])
+
+    def append(self, t, row):
+        self.times[self.head] = t
+        self.values[self.head] = row
+        self.head = (self.head + 1) % len(self.times)
+        self.count = min(self.count + 1, len(self.times))
+
+    # Samples oldest first
+    def ordered(self):
+        index = np.arange(self.head - self.count, self.head) % len(self.times)
+        return self.times[index], self.values[index]
+
+# Per-VM time series polled from /VirDomainStats. Every metric has a ring buffer per tier: raw
+# samples, then 1-minute and 15-minute means rolled up as each bucket closes. Memory is fixed by
+# the tier capacities times the number of VM columns, and a column is reused once its VM has been
+# gone longer than the longest tier covers. 1-minute means can also be appended to a CSV file.
+class StatsCollector:
+    TIERS = (("Raw", 0, 120), ("1 min", 60, 720), ("15 min", 900, 1344))  # (name, bucket seconds, capacity)
+
+    def __init__(self, spill_path=None):
+        self.spill_path = spill_path
+        self.lock = threading.Lock()
+        self.columns = {}  # VM uuid -> column
+        self.uuids = []  # column -> VM uuid
+        self.last_seen = []
+        self.free = []  # Columns of VMs gone longer than the retention, see reclaim()
+        self.expiry = np.inf  # Earliest last_seen among the other columns
+        self.width = 0
+        self.samples = 0
+        self.error = None
+        self.tiers = [{metric: RingBuffer(capacity) for metric, unit, value in STAT_METRICS} for name, step, capacity in self.TIERS]
+        self.pending = [None] * len(self.TIERS)  # Open bucket per downsampled tier: [start, sums, counts]
+
+    def retention(self):
+        return max(step * capacity for name, step, capacity in self.TIERS)
+
+    # Column for a VM polled at t, marked as seen so another new VM in the same poll can't take it
+    def column(self, uuid, t):
+        column = self.columns.get(uuid)
+        if column is not None:
+            self.last_seen[column] = t
+            self.expiry = min(self.expiry, t)  # Its column may have been on the free list
+            return column
+        if not self.free:
+            self.reclaim(t)
+        while self.free and self.last_seen[self.free[-1]] >= t - self.retention():
+            self.free.pop()  # Its VM came back
+        if self.free:
+            column = self.free.pop()
+            del self.columns[self.uuids[column]]
+            self.uuids[column] = uuid
+            self.last_seen[column] = t
+            self.clear(column)
+        else:
+            column = len(self.uuids)
+            self.uuids.append(uuid)
+            self.last_seen.append(t)
+        self.expiry = min(self.expiry, t)
+        self.columns[uuid] = column
+        return column
+
+    # Refill the free list in one pass over the columns, only once one of them can have expired
+    def reclaim(self, t):
+        cutoff = t - self.retention()
+        if cutoff <= self.expiry:
+            return
+        last_seen = np.array(self.last_seen)
+        stale = last_seen < cutoff
+        self.free = np.flatnonzero(stale)[::-1].tolist()  # Lowest column is reused first
+        self.expiry = last_seen[~stale].min() if not stale.all() else np.inf
+
+    def clear(self, column):
+        for tier in self.tiers:
+            for ring in tier.values():
+                ring.values[:, column] = np.nan
+        for pending in self.pending:
+            if pending:
+                pending[1][:, column] = 0
+                pending[2][:, column] = 0
+
+    # Columns are added in steps so new VMs don't reallocate every buffer one at a time
+    def grow(self, needed):
+        width = max(needed, 2 * self.width, 16)
+        for tier in self.tiers:
+            for ring in tier.values():
+                ring.widen(width)
+        for pending in self.pending:
+            if pending:
+                pending[1] = np.hstack([pending[1], np.zeros((len(STAT_METRICS), width - self.width))])
+                pending[2] = np.hstack([pending[2], np.zeros((len(STAT_METRICS), width - self.width))])
+        self.width = width
+
+    def add(self, t, records):
+        with self.lock:
+            columns = [self.column(record.get("uuid"), t) for record in records]
+            if len(self.uuids) > self.width:
+                self.grow(len(self.uuids))
+            row = np.full((len(STAT_METRICS), self.width), np.nan)
+            for record, column in zip(records, columns):
+                for m, (metric, unit, value) in enumerate(STAT_METRICS):
+                    row[m, column] = value(record)
+            self.push(0, t, row)
+            self.samples += 1
+
+    def push(self, level, t, row):
+        for m, (metric, unit, value) in enumerate(STAT_METRICS):
+            self.tiers[level][metric].append(t, row[m])
+        if level + 1 == len(self.TIERS):
+            return
+        bucket = t // self.TIERS[level + 1][1] * self.TIERS[level + 1][1]
+        pending = self.pending[level + 1]
+        if pending and pending[0] != bucket:  # Bucket closed: its mean moves up a tier
+            closed = pending[0]
+            with np.errstate(invalid="ignore"):
+                mean = pending[1] / pending[2]
+            self.pending[level + 1] = pending = None
+            if level == 0:
+                self.spill(closed, mean)
+            self.push(level + 1, closed, mean)
+        if pending is None:
+            pending = self.pending[level + 1] = [bucket, np.zeros(row.shape), np.zeros(row.shape)]
+        present = ~np.isnan(row)
+        pending[1] += np.where(present, row, 0)
+        pending[2] += present
+
+    def spill(self, t, mean):
+        if not self.spill_path:
+            return
+        try:
+            new_file = not os.path.exists(self.spill_path)
+            with open(self.spill_path, "a", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(["Time", "UUID"] + [f"{metric} ({unit})" for metric, unit, value in STAT_METRICS])
+                stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(t))
+                columns = np.flatnonzero((~np.isnan(mean)).any(axis=0))
+                for column, values in zip(columns, np.round(mean[:, columns], 3).T.tolist()):
+                    writer.writerow([stamp, self.uuids[column]] + ["" if value != value else value for value in values])
+        except OSError as e:
+            self.error = f"Spill file: {str(e)}"
+
+    # Capacity-planning summary per VM and metric from the tier covering the longest span
+    def capacity_rows(self, names=None):
+        names = names or {}
+        with self.lock:
+            def span(level):
+                times, values = self.tiers[level][STAT_METRICS[0][0]].ordered()
+                return times[-1] - times[0] if len(times) else -1
+
+            level = max(reversed(range(len(self.TIERS))), key=span)
+            rows = []
+            for metric, unit, value in STAT_METRICS:
+                times, values = self.tiers[level][metric].ordered()
+                values = values[:, :len(self.uuids)]
+                counts = (~np.isnan(values)).sum(axis=0)
+                valid = np.flatnonzero(counts)
+                if not len(valid):
+                    continue
+                data = values[:, valid].astype(np.float64)
+                means = np.nansum(data, axis=0) / counts[valid]
+                p95 = np.nanpercentile(data, 95, axis=0)
+                peaks = np.nanmax(data, axis=0)
+                start, end = (time.strftime("%Y-%m-%d %H:%M", time.localtime(t)) for t in (times[0], times[-1]))
+                for k, column in enumerate(valid):
+                    uuid = self.uuids[column]
+                    rows.append((names.get(uuid, ""), uuid, metric, unit, self.TIERS[level][0], int(counts[column]),
+                                 round(float(means[k]), 2), round(float(p95[k]), 2), round(float(peaks[k]), 2), start, end))
+        rows.sort(key=lambda row: (str(row[0]).lower(), row[1]))
+        return rows
+
+EXPORT_FORMATS = {
+    ".xlsx": write_xlsx,
+    ".csv": write_csv,
+    ".jsonl": write_jsonl,
+    ".parquet": write_parquet,
+}
+
+# Optional worker process for the CPU-bound steps: decoding the VM list and building its
+# inventory, and writing exports. These hold the GIL, so in a thread they stall the window;
+# in the worker only the drawing is left to this process. Bodies and results travel as files
+# (the columnar VMInventory.write_file form), never as pickled records. One process is started
+# on first use and kept.
+class WorkerProcess:
+    enabled = bool(os.environ.get("HYPERCORE_WORKER_PROCESS"))  # Also the Settings switch and export --worker-process
+    _executor = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def executor(cls):
+        with cls._lock:
+            if cls._executor is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                cls._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            return cls._executor
+
+    # Start the process ahead of the first job, which would otherwise wait for its imports
+    @classmethod
+    def warm_up(cls):
+        cls.executor().submit(cls.preload)
+
+    @staticmethod
+    def preload():
+        np.ndarray
+
+    # function(*args) in the worker process; job is checked while it runs. A cancelled job stops
+    # waiting, and the call finishes in the background.
+    @classmethod
+    def run(cls, job, function, *args):
+        from concurrent.futures import TimeoutError as FutureTimeout
+        from concurrent.futures.process import BrokenProcessPool
+
+        future = cls.executor().submit(function, *args)
+        while True:
+            try:
+                return future.result(timeout=0.1)
+            except FutureTimeout:
+                if job:
+                    job.check()
+            except BrokenProcessPool:
+                cls.shutdown()
+                raise RuntimeError("The worker process stopped unexpectedly")
+
+    # Scratch folder for one call's files. Removing it is queued behind that call in the worker,
+    # so it outlives a call that is still running after its job was cancelled.
+    @classmethod
+    @contextlib.contextmanager
+    def scratch(cls):
+        import shutil
+        import tempfile
+
+        directory = tempfile.mkdtemp(prefix="hypercore-")
+        try:
+            yield directory
+        finally:
+            try:
+                cls.executor().submit(shutil.rmtree, directory, True)
+            except RuntimeError:  # Pool broken or shut down
+                shutil.rmtree(directory, True)
+
+    @classmethod
+    def shutdown(cls):
+        with cls._lock:
+            executor, cls._executor = cls._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# Worker process side of export_inventory; returns the seconds spent per phase
+def export_inventory_file(inventory_path, file_path, cluster_data, stats_rows=None, related=()):
+    metrics = Metrics("Worker process")
+    vm_snapshot = metrics.timed("build", VMInventory.read_file)(inventory_path)
+    writer = metrics.timed("write", EXPORT_FORMATS.get(os.path.splitext(file_path)[1].lower(), write_xlsx))
+    writer(file_path, export_tables(vm_snapshot, cluster_data, stats_rows=stats_rows, related=related))
+    return metrics.phases
+
+# With WorkerProcess.enabled the file is written in the worker process, from a columnar copy of
+# the inventory and the VM Stats rows worked out here
+def export_inventory(file_path, vm_snapshot, cluster_data, collector=None, job=None, related=()):
+    if job:
+        job.count("exported rows", len(vm_snapshot))
+    if WorkerProcess.enabled:
+        stats_rows = export_stats_rows(vm_snapshot, collector)
+        with WorkerProcess.scratch() as directory:
+            inventory_path = os.path.join(directory, "inventory.bin")
+            (job.timed("write", vm_snapshot.write_file) if job else vm_snapshot.write_file)(inventory_path)
+            phases = WorkerProcess.run(job, export_inventory_file, inventory_path, file_path, cluster_data, stats_rows, related)
+        if job:
+            job.add_times(phases)
+    else:
+        writer = EXPORT_FORMATS.get(os.path.splitext(file_path)[1].lower(), write_xlsx)
+        if job:
+            writer = job.timed("write", writer)
+        writer(file_path, export_tables(vm_snapshot, cluster_data, collector, related=related))
+    if job and os.path.exists(file_path):
+        job.count("bytes", os.path.getsize(file_path))
+
+# Data fetch for cluster data (Registration in API), runs on the worker thread
+# An unchanged response reuses the cached result and adds no snapshot to history.
+def fetch_cluster_data(client, job, history=None):
+    def parse(chunks, unchanged):
+        ClusterDataResult = job.timed("decode", json.loads)(b"".join(chunks).decode("utf-8"))
+        cluster_data = job.timed("build", parse_registration)(ClusterDataResult)
+        if history and not unchanged():
+            use_history(history, job, lambda: history.save(client.host, "/Registration", {"": cluster_data}))
+        return cluster_data
+
+    cluster_data = client.get_parsed('/Registration', parse, timeout=30, job=job)
+    job.count("rows", len(cluster_data))
+    return cluster_data
+
+# History is kept on a best-effort basis: a database error is noted on the store, never fails the fetch
+def use_history(history, job, action):
+    import sqlite3
+
+    try:
+        return job.timed("store", action)()
+    except (sqlite3.Error, OSError) as e:
+        history.error = e
+        return None
+
+# Data fetch for the node view, runs on the worker thread. /Node, /VirDomainStats, /Registration
+# and the VM inventory are requested at once over the pooled connections, so the view costs
+# about one round trip; Registration and VirDomain go through the cache for the other views.
+def fetch_node_data(client, job, cache=None, history=None):
+    def cached(endpoint, fetch):
+        return lambda: cached_load(cache, (client.host, endpoint), lambda: fetch(client, job, history=history), job)
+
+    loaders = {
+        "/Node": lambda: client.get_json('/Node', timeout=30, job=job),
+        "/VirDomainStats": lambda: client.get_json('/VirDomainStats', timeout=60, job=job),
+        "/Registration": cached("/Registration", fetch_cluster_data),
+        "/VirDomain": cached("/VirDomain", fetch_vm_data),
+    }
+    with ThreadPoolExecutor(max_workers=len(loaders)) as pool:
+        futures = {endpoint: pool.submit(load) for endpoint, load in loaders.items()}
+        results = {endpoint: future.result() for endpoint, future in futures.items()}
+    node_data = job.timed("build", node_table)(results["/Node"], results["/VirDomainStats"], results["/VirDomain"])
+    job.count("nodes", len(node_data["rows"]))
+    return node_data
+
+# Data fetch for one of RELATED_TABLES, runs on the worker thread. The endpoint and the VM
+# inventory it is joined to are requested at once; the inventory goes through the cache it
+# shares with the VM view, so with the VM view loaded only the related records are fetched.
+def fetch_related_data(client, job, endpoint, cache=None, history=None):
+    def parse(chunks, unchanged):
+        return list(stream_json_array(chunks, related_projection(endpoint), job))
+
+    loaders = {
+        endpoint: lambda: client.get_parsed(endpoint, parse, timeout=60, job=job),
+        "/VirDomain": lambda: cached_load(cache, (client.host, "/VirDomain"), lambda: fetch_vm_data(client, job, history=history), job),
+    }
+    with ThreadPoolExecutor(max_workers=len(loaders)) as pool:
+        futures = {name: pool.submit(load) for name, load in loaders.items()}
+        results = {name: future.result() for name, future in futures.items()}
+    table = job.timed("build", RelatedTable.join)(endpoint, results[endpoint], results["/VirDomain"])
+    job.count("rows", len(table.rows))
+    return table
+
+# Decode a VirDomain body and build its inventory, handing rows to on_rows in batches as the
+# records stream in and saving a history snapshot when history is given, unless unchanged()
+# says the body is the same as last time
+def build_vm_inventory(chunks, job, host, on_rows=None, history=None, unchanged=None):
+    inventory = VMInventory()
+    add_vm = job.timed("build", inventory.add_vm)
+    rows_for_vm = job.timed("build", inventory.rows_for_vm)
+    recorder = use_history(history, job, lambda: history.recorder(host, "/VirDomain")) if history else None
+    record = job.timed("store", recorder.add) if recorder else None
+    rows = []
+    last_post = time.perf_counter()
+    for vm in stream_json_array(chunks, project_vm, job):
+        v = add_vm(vm)
+        if record:
+            record(vm.get("uuid", ""), vm)
+        if on_rows:
+            rows.extend(rows_for_vm(v))
+            if time.perf_counter() - last_post >= 0.1:
+                job.post("partial", (on_rows, rows))
+                rows = []
+                last_post = time.perf_counter()
+    if on_rows and rows:
+        job.post("partial", (on_rows, rows))
+    if recorder and not (unchanged and unchanged()):
+        use_history(history, job, recorder.commit)
+    return job.timed("build", inventory.freeze)()
+
+# build_vm_inventory in the worker process. The body is spooled to a file as it arrives and the
+# inventory comes back as a columnar file; rows are not streamed to the window in this mode.
+def build_in_worker(chunks, job, host, history=None, unchanged=None):
+    with WorkerProcess.scratch() as directory:
+        body_path = os.path.join(directory, "body.json")
+        with open(body_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        if unchanged and unchanged():
+            return None  # get_parsed returns the cached inventory
+        inventory_path = os.path.join(directory, "inventory.bin")
+        phases, history_error = WorkerProcess.run(job, build_inventory_file, body_path, inventory_path, host,
+                                                  history.path if history else None)
+        job.add_times(phases)
+        if history_error:
+            history.error = history_error
+        return job.timed("build", VMInventory.read_file)(inventory_path)
+
+# Worker process side of build_in_worker; returns the seconds spent per phase and the error
+# saving the history snapshot, if any
+def build_inventory_file(body_path, inventory_path, host, history_path=None):
+    job = FetchJob(None, "Worker process")
+    job.metrics = Metrics("Worker process")
+    history = HistoryStore(history_path) if history_path else None
+    with open(body_path, "rb") as f:
+        inventory = build_vm_inventory(iter(lambda: f.read(1 << 20), b""), job, host, history=history)
+    job.timed("build", inventory.write_file)(inventory_path)
+    return job.metrics.phases, str(history.error) if history and history.error else None
+
+# Data fetch for VM data (VirDomain in API), runs on the worker thread.
+# Records are parsed as the body streams in and their rows handed to on_rows in batches. An
+# unchanged response returns the cached inventory itself, without a history snapshot.
+def fetch_vm_data(client, job, on_rows=None, history=None):
+    def parse(chunks, unchanged):
+        if WorkerProcess.enabled:
+            return build_in_worker(chunks, job, client.host, history, unchanged)
+        return build_vm_inventory(chunks, job, client.host, on_rows, history, unchanged)
+
+    inventory = client.get_parsed('/VirDomain', parse, timeout=120, job=job)
+    job.count("vms", inventory.vm_count())
+    job.count("rows", len(inventory))
+    return inventory
+
+# Re-fetch only the given VMs (GET /VirDomain/<uuid>), concurrently over the pooled connections.
+# Returns {uuid: projected record, or None if the VM is gone}.
+def fetch_vms_by_uuid(client, uuids, job):
+    def fetch_one(uuid):
+        try:
+            records = client.get_json(f'/VirDomain/{uuid}', timeout=30, job=job)
+        except HTTPError as e:
+            if e.status == 404:
+                return uuid, None
+            raise
+        return uuid, project_vm(records[0]) if records else None
+
+    with ThreadPoolExecutor(max_workers=max(1, min(4, len(uuids)))) as pool:
+        return dict(pool.map(fetch_one, uuids))
+
+def cached_load(cache, key, loader, job):
+    return cache.get(key, loader, job) if cache else loader()
+
+# Load one endpoint ("/VirDomain", "/Node", "/Registration" or one of RELATED_TABLES) from one
+# cluster, or from all of targets in parallel when fleet is set, through the snapshot cache when
+# one is given. Fetched VirDomain and Registration snapshots are added to history when a
+# HistoryStore is given.
+def load_snapshot(targets, endpoint, job, cache=None, fleet=False, on_rows=None, history=None):
+    def fetch(client, job, on_rows=None):
+        if endpoint == "/VirDomain":
+            return fetch_vm_data(client, job, on_rows, history)
+        if endpoint == "/Node":
+            return fetch_node_data(client, job, cache, history)
+        if endpoint in RELATED_TABLES:
+            return fetch_related_data(client, job, endpoint, cache, history)
+        return fetch_cluster_data(client, job, history)
+
+    if not fleet:
+        host, username, password = targets[0]
+        client = HyperCoreClient.for_host(host, username, password)
+        return cached_load(cache, (host, endpoint), lambda: fetch(client, job, on_rows), job)
+
+    def load_fleet():
+        results, errors = collect_from_clusters(
+            targets, lambda client, child: cached_load(cache, (client.host, endpoint), lambda: fetch(client, child), child), job)
+        if endpoint == "/VirDomain":
+            return VMInventory.merge(results, errors)
+        if endpoint == "/Node":
+            return merge_node_tables(results, errors)
+        if endpoint in RELATED_TABLES:
+            return RelatedTable.merge(endpoint, results, errors)
+        return merge_cluster_data(results, errors)
+
+    return cached_load(cache, ("fleet", endpoint), load_fleet, job)
+
+# load_snapshot of several endpoints at once. Sharing one cache lets the related endpoints and
+# the VM view wait on the same VM inventory fetch instead of each making their own.
+def load_snapshots(targets, endpoints, job, cache, fleet=False, history=None):
+    with ThreadPoolExecutor(max_workers=len(endpoints)) as pool:
+        futures = [pool.submit(load_snapshot, targets, endpoint, job, cache, fleet, None, history) for endpoint in endpoints]
+        return [future.result() for future in futures]
+
+# Headless equivalent of the Export button: fetch the VM and cluster data of every target, plus
+# the related endpoints given (see RELATED_TABLES), and write them to file_path (format from the
+# extension). Returns {host: error} for clusters that failed.
+def export_clusters(targets, file_path, job=None, history=None, related=()):
+    job = job or FetchJob(None, "Export")
+    fleet = len(targets) > 1
+    try:
+        vm_snapshot, cluster_data, *related_tables = load_snapshots(
+            targets, ("/VirDomain", "/Registration") + tuple(related), job, SnapshotCache(), fleet, history)
+        export_inventory(file_path, vm_snapshot, cluster_data, job=job, related=related_tables)
+    finally:
+        HyperCoreClient.close_all()
+    return vm_snapshot.errors
+
+# Credentials for the export command: HYPERCORE_USERNAME / HYPERCORE_PASSWORD, optionally
+# overridden by a file of "username=..." and "password=..." lines
+def load_credentials(file_path=None):
+    credentials = {"username": os.environ.get("HYPERCORE_USERNAME", ""), "password": os.environ.get("HYPERCORE_PASSWORD", "")}
+    if file_path:
+        with open(file_path, encoding="utf-8") as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep and key.strip().lower() in credentials:
+                    credentials[key.strip().lower()] = value.strip()
+    return credentials["username"], credentials["password"]
+
+def export_command(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="HyperCoreDataViewer export", description="Export VM and cluster data without opening the window.")
+    parser.add_argument("--host", action="append", default=[], help="cluster node IP or hostname (repeat for several clusters)")
+    parser.add_argument("--cluster-list", help="file with one cluster per line, as in Settings > Cluster list")
+    parser.add_argument("--credentials", help="file with username=... and password=... lines (default: HYPERCORE_USERNAME and HYPERCORE_PASSWORD)")
+    parser.add_argument("--out", required=True, help="output file; .xlsx, .csv, .jsonl or .parquet")
+    parser.add_argument("--metrics-log", help="append per-phase timings to this JSON-lines file")
+    parser.add_argument("--history", action="store_true", help="also save the fetched snapshots to the app's history")
+    parser.add_argument("--profile", action="store_true", help="write a CPU and allocation profile of the export to the diagnostics folder")
+    parser.add_argument("--worker-process", action="store_true", help="decode the VM lists and write the file in a separate process")
+    related_sheets = {name.lower().replace(" ", "-"): endpoint for endpoint, (name, _, _) in RELATED_TABLES.items()}
+    parser.add_argument("--related", action="append", default=[], choices=related_sheets,
+                        help="also export these sheets of related VM data (repeat for several)")
+    args = parser.parse_args(argv)
+
+    username, password = load_credentials(args.credentials)
+    targets = [(host, username, password) for host in args.host]
+    if args.cluster_list:
+        targets += [(host, user or username, pw or password) for host, user, pw in load_cluster_list(args.cluster_list)]
+    if not targets:
+        parser.error("no clusters given; use --host or --cluster-list")
+    if not all(user and pw for host, user, pw in targets):
+        parser.error("no credentials; set HYPERCORE_USERNAME and HYPERCORE_PASSWORD or use --credentials")
+
+    HyperCoreClient.node_stats = NodeStats(os.path.join(user_data_dir(), "nodes.json"))
+    HyperCoreClient.response_cache = ResponseCache(os.path.join(user_data_dir(), "responses"))
+    WorkerProcess.enabled = WorkerProcess.enabled or args.worker_process
+    job = FetchJob(None, "Export")
+    if args.metrics_log:
+        job.metrics = Metrics("Export", "fleet" if len(targets) > 1 else targets[0][0])
+    profiler = Profiler("Export", diagnostics_dir()).start() if args.profile else None
+    status = "error"
+    try:
+        errors = export_clusters(targets, args.out, job, HistoryStore(history_path()) if args.history else None,
+                                 [related_sheets[name] for name in dict.fromkeys(args.related)])
+        status = "done"
+    except Exception as e:
+        print(f"Error exporting: {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        if job.metrics:
+            job.metrics.finish(status).append_to_log(args.metrics_log)
+        if profiler:
+            print(f"Profile saved to {profiler.stop().save()}", file=sys.stderr)
+        WorkerProcess.shutdown()
+    for host, error in errors.items():
+        print(f"{host}: {error}", file=sys.stderr)
+    print(f"Exported {len(targets) - len(errors)} of {len(targets)} cluster(s) to {args.out}")
+    return 1 if errors else 0
+
+# Typed sort keys; blanks and "N/A" sort after every number
+def numeric_sort_key(value):
+    return float(value) if isinstance(value, (int, float)) else float("inf")
+
+def text_sort_key(value):
+    return str(value).lower()
+
+# Row source over a plain list of row tuples, used while rows are still streaming in
+class ListRows:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return self.rows[index]
+
+    def extend(self, rows):
+        self.rows.extend(rows)
+
+    def live_indexes(self):
+        return None
+
+    def sorted_indexes(self, column, key):
+        keys = [key(row[column]) for row in self.rows]
+        return sorted(range(len(keys)), key=keys.__getitem__)
+
+# Treeview that only materializes the rows in the viewport; everything else stays in the row
+# source (a ListRows, or a VMInventory which builds each row from its columns on demand)
+class VirtualTable:
+    def __init__(self, parent, yscrollbar, **kwargs):
+        self.tree = ttk.Treeview(parent, show="headings", selectmode="browse", **kwargs)
+        self.yscrollbar = yscrollbar
+        self.source = ListRows([])
+        self.order = None  # Optional list of row indexes giving the display order
+        self.row_mask = None  # Optional boolean array over the source rows; only True rows are shown
+        self.footer = None
+        self.sorting = None  # (column, key, reverse) of the last sort, reapplied when the source changes
+        self.sort_orders = {}  # column -> ascending row order, built once per source
+        self.top = 0
+        self.visible = 1
+        self.items = []
+        self.selected = None
+        self.refresh_pending = False
+
+        self.tree.bind("<Configure>", self.on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll(3))
+        self.tree.bind("<Up>", lambda event: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda event: self.move_selection(1))
+        self.tree.bind("<Prior>", lambda event: self.scroll(-self.visible) or "break")
+        self.tree.bind("<Next>", lambda event: self.scroll(self.visible) or "break")
+
+    def __len__(self):
+        return self.row_count() + (1 if self.footer else 0)
+
+    def row_count(self):
+        return len(self.order) if self.order is not None else len(self.source)
+
+    def clear(self):
+        self.set_rows([])
+        self.top = 0
+        self.selected = None
+
+    def set_rows(self, rows, footer=None):
+        self.set_source(ListRows(rows), footer)
+
+    # keep_view keeps the current sort, scroll position and selection, for a source that is
+    # an edited copy of the one shown (row indexes of unchanged rows stay the same)
+    def set_source(self, source, footer=None, keep_view=False, row_mask=None):
+        self.source = source
+        self.footer = footer
+        self.row_mask = row_mask
+        self.sort_orders = {}
+        if not keep_view:
+            self.sorting = None
+        self.apply_order()
+
+    # Show only the rows in row_mask (None shows all), keeping the current sort
+    def set_filter(self, row_mask, footer=None):
+        self.row_mask = row_mask
+        self.footer = footer
+        self.top = 0
+        self.selected = None
+        self.apply_order()
+
+    def apply_order(self):
+        if self.sorting:
+            self.sort(*self.sorting)
+        else:
+            self.set_order(self.source.live_indexes())
+
+    def append_rows(self, rows):
+        start = len(self.source)
+        self.source.extend(rows)
+        self.sort_orders = {}
+        if self.order is not None:
+            self.order = self.order + list(range(start, len(self.source)))
+        self.request_refresh()
+
+    # Ascending order is computed once per column and source; descending is its reverse
+    def sort(self, column, key, reverse=False):
+        self.sorting = (column, key, reverse)
+        order = self.sort_orders.get(column)
+        if order is None:
+            order = self.sort_orders[column] = self.source.sorted_indexes(column, key)
+        self.set_order(order[::-1] if reverse else order)
+
+    def set_order(self, order):
+        if self.row_mask is not None:
+            order = np.arange(len(self.source)) if order is None else np.asarray(order, dtype=np.int64)
+            order = order[self.row_mask[order]].tolist()
+        self.order = order
+        self.request_refresh()
+
+    def row_index(self, position):
+        return self.order[position] if self.order is not None else position
+
+    def row_at(self, position):
+        if position >= self.row_count():
+            return self.footer
+        return self.source[self.row_index(position)]
+
+    def selected_row_index(self):
+        if self.selected is None or self.selected >= self.row_count():
+            return None
+        return self.row_index(self.selected)
+
+    # Coalesce refreshes from bursts of appends into one per idle cycle
+    def request_refresh(self):
+        if not self.refresh_pending:
+            self.refresh_pending = True
+            self.tree.after_idle(self.refresh)
+
+    def refresh(self):
+        self.refresh_pending = False
+        total = len(self)
+        self.top = max(0, min(self.top, total - self.visible))
+        count = max(0, min(self.visible, total - self.top))
+
+        while len(self.items) < count:
+            self.items.append(self.tree.insert("", "end"))
+        while len(self.items) > count:
+            self.tree.delete(self.items.pop())
+
+        for offset, item in enumerate(self.items):
+            index = self.top + offset
+            if index >= self.row_count():
+                tag = 'total'
+            else:
+                tag = 'evenrow' if index % 2 == 0 else 'oddrow'
+            self.tree.item(item, values=self.row_at(index), tags=(tag,))
+
+        if self.selected is not None and self.top <= self.selected < self.top + count:
+            self.tree.selection_set(self.items[self.selected - self.top])
+        elif self.tree.selection():
+            self.tree.selection_set(())
+
+        if total:
+            self.yscrollbar.set(self.top / total, min(1.0, (self.top + self.visible) / total))
+        else:
+            self.yscrollbar.set(0, 1)
+
+    def on_resize(self, event):
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible = max(1, (event.height - row_height) // row_height)  # Less the heading row
+        if visible != self.visible:
+            self.visible = visible
+            self.request_refresh()
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection and selection[0] in self.items:
+            self.selected = self.top + self.items.index(selection[0])
+
+    def on_mousewheel(self, event):
+        if platform.system() == "Darwin":
+            self.scroll(-event.delta)
+        else:
+            self.scroll(-(event.delta // 120) * 3)
+
+    def scroll(self, rows):
+        self.top = max(0, min(self.top + rows, len(self) - self.visible))
+        self.refresh()
+
+    def move_selection(self, step):
+        if self.selected is None:
+            return "break"
+        self.selected = max(0, min(self.selected + step, len(self) - 1))
+        if self.selected < self.top:
+            self.top = self.selected
+        elif self.selected >= self.top + self.visible:
+            self.top = self.selected - self.visible + 1
+        self.refresh()
+        return "break"
+
+    # Scrollbar protocol: ("moveto", fraction) or ("scroll", n, "units"/"pages")
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.visible if args[2] == "pages" else 1)
+            self.top += step
+        self.top = max(0, min(self.top, len(self) - self.visible))
+        self.refresh()
 
 class ClusterApp:
     def __init__(self, root):
@@ -39,11 +3187,53 @@ class ClusterApp:
         root.focus_force()
 
         self.cluster_ip = ""
-        self.username = ""
-        self.password = ""
-        self.processed_vms = {}
+        self.username, self.password = load_credentials()  # Prefilled from HYPERCORE_USERNAME / HYPERCORE_PASSWORD if set
         self.processed_cluster = {}
+        self.cluster_list = []
+        self.vm_snapshot = None  # VMInventory shown in the VM view
+        self.search_index = None  # SearchIndex of the VM view's inventory, built on the first search
+        self.search_after = None
+        self.summary_keys = ["OS", "State"]  # Group-by keys of the Summary view
+        self.related_endpoint = "/VirDomainSnapshot"  # Table shown in the Related view
+        self.export_related = False  # Whether exports fetch and add the related tables
+        self.auto_refresh_interval = 60
+        self.auto_refresh_after = None
+        self.collector = None
+        self.stats_job = None
+        self.stats_interval = 30
+        self.stats_spill_path = ""
+        self.stats_status_after = None
+        self.metrics_log_path = os.environ.get("HYPERCORE_METRICS_LOG", "")
+        self.metrics_visible = False
+        self.metrics_history = deque(maxlen=50)
+        self.profile_every = bool(os.environ.get("HYPERCORE_PROFILE"))  # Profile every action, not just the next
+        self.profile_next = False
+        self.profiler = None  # Profiler of the action running
+        self.images = {}
+        self.startup_metrics = None
+        self.current_view = "cluster"
+        self.cache = SnapshotCache(ttl=300)
+        self.history = HistoryStore(history_path())
+        HyperCoreClient.node_stats = NodeStats(os.path.join(user_data_dir(), "nodes.json"))
+        HyperCoreClient.response_cache = ResponseCache(os.path.join(user_data_dir(), "responses"))
+        self.saved = {}  # Last saved snapshot, shown until fresh data arrives: endpoint -> data, plus "host" and "taken"
+        self.ui_queue = queue.Queue()
+        self.job = None
+        self.fetches = {}  # Snapshot key -> view fetch left running in the background, see start_job
+        self.draining = False
         self.setup_gui()
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.restore_last_snapshot()
+
+    def on_close(self):
+        if self.stats_job:
+            self.stats_job.cancel()
+        HyperCoreClient.close_all()
+        WorkerProcess.shutdown()
+        self.root.destroy()
+
+    def get_client(self):
+        return HyperCoreClient.for_host(self.cluster_ip, self.username, self.password)
 
     def resource_path(self, relative_path):
         if getattr(sys, 'frozen', False):  # Compiled bundle check
@@ -57,23 +3247,29 @@ class ClusterApp:
         else:
             return os.path.join(os.path.abspath("./assets"), relative_path) # Adjust for CLI
 
+    # Images are decoded once and shared by the main window and every dialog
+    def asset_image(self, name):
+        image = self.images.get(name)
+        if image is None:
+            image = Image.open(self.resource_path(name))
+            image.load()
+            self.images[name] = image
+        return image
+
+    def apply_window_icon(self, window):
+        if platform.system() == "Windows":
+            window.iconbitmap(self.resource_path("icon.ico"))
+        elif platform.system() == "Darwin":
+            photo = self.images.get("icon.icns photo")
+            if photo is None:
+                photo = self.images["icon.icns photo"] = ImageTk.PhotoImage(self.asset_image("icon.icns"))
+            window.iconphoto(True, photo)
+
     # GUI setup, logos, icons, and the like
     def setup_gui(self):
         self.root.title("SC//HyperCore Data Viewer")
         self.root.configure(bg="#2e2e2e") 
-        if platform.system() == "Windows":
-            icon_path = self.resource_path("icon.ico")
-            self.root.iconbitmap(icon_path)
-        elif platform.system() == "Darwin":
-            icon_path = self.resource_path("icon.icns")
-            icon_image = Image.open(icon_path)
-            icon_photo = ImageTk.PhotoImage(icon_image)
-            self.root.iconphoto(True, icon_photo)
-        icon_png_path = self.resource_path("icon.png")
-        logo_path = self.resource_path("logo.png")
-        icon_image = Image.open(icon_png_path)
-        font_path = self.resource_path("MartelSans-Regular.ttf")
-        martel_sans_font = font.Font(family="Martel Sans", size=14)
+        self.apply_window_icon(self.root)
         self.root.tk.call("font", "create", "MartelSans", "-family", "Martel Sans", "-size", "14")
 
         screen_width = self.root.winfo_screenwidth()
@@ -87,7 +3283,7 @@ class ClusterApp:
         self.top_frame = ctk.CTkFrame(self.root)
         self.top_frame.pack(fill=ctk.X, padx=20, pady=(20, 5)) 
 
-        logo_image = ctk.CTkImage(light_image=Image.open(logo_path), size=(220, 93)) 
+        logo_image = ctk.CTkImage(light_image=self.asset_image("logo.png"), size=(220, 93)) 
         self.logo_label = ctk.CTkLabel(self.top_frame, image=logo_image, text="")
         self.logo_label.image = logo_image 
         self.logo_label.pack(side=ctk.LEFT, padx=10, pady=10)
@@ -99,12 +3295,18 @@ class ClusterApp:
         self.view_button1 = ctk.CTkButton(self.button_frame_top, text="Cluster", command=self.switch_view_cluster, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE")
         self.view_button1.pack(side=ctk.LEFT, padx=10, pady=10)
 
-        #self.view_button2 = ctk.CTkButton(self.button_frame_top, text="Node", command=self.switch_view_node, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE")
-        #self.view_button2.pack(side=ctk.LEFT, padx=10, pady=10)
+        self.view_button2 = ctk.CTkButton(self.button_frame_top, text="Node", command=self.switch_view_node, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE")
+        self.view_button2.pack(side=ctk.LEFT, padx=10, pady=10)
 
         self.view_button3 = ctk.CTkButton(self.button_frame_top, text="Virtual Machines", command=self.switch_view_vm, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE")
         self.view_button3.pack(side=ctk.LEFT, padx=10, pady=10)
 
+        self.view_button4 = ctk.CTkButton(self.button_frame_top, text="Summary", command=self.switch_view_summary, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE")
+        self.view_button4.pack(side=ctk.LEFT, padx=10, pady=10)
+
+        self.view_button5 = ctk.CTkButton(self.button_frame_top, text="Related", command=self.switch_view_related, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE")
+        self.view_button5.pack(side=ctk.LEFT, padx=10, pady=10)
+
         # Instructions box
         self.instructions = ctk.CTkTextbox(self.top_frame, height=150, width=500, font=("MartelSans", 12), padx=10)
         self.instructions.insert(ctk.END, "Instructions:\n1. Create a read-only user in your SC//HyperCore user interface.\n"
@@ -120,45 +3322,14 @@ class ClusterApp:
 
         self.cluster_frame = ctk.CTkFrame(self.main_frame)
         self.cluster_frame.pack(fill=ctk.BOTH, expand=True)
-        self.cluster_tree = ttk.Treeview(self.cluster_frame, show="headings")
-
-        self.node_frame = ctk.CTkFrame(self.main_frame)
-        self.node_frame.pack(fill=ctk.BOTH, expand=True)
-        self.node_tree = ttk.Treeview(self.node_frame, show="headings")
-
-        self.vm_frame = ctk.CTkFrame(self.main_frame)
-        self.vm_frame.pack(fill=ctk.BOTH, expand=True)
-        self.vm_tree = ttk.Treeview(self.vm_frame, show="headings")
-
-        # Create scrollbars
-        self.vm_tree_scroll_x = ctk.CTkScrollbar(self.vm_frame, orientation="horizontal", command=self.vm_tree.xview)
-        self.vm_tree_scroll_x.pack(side=ctk.BOTTOM, fill=ctk.X)
-        self.vm_tree_scroll_y = ctk.CTkScrollbar(self.vm_frame, orientation="vertical", command=self.vm_tree.yview)
-        self.vm_tree_scroll_y.pack(side=ctk.RIGHT, fill=ctk.Y)
-        self.cluster_tree_scroll_y = ctk.CTkScrollbar(self.cluster_frame, orientation="vertical", command=self.cluster_tree.yview)
+        self.cluster_tree_scroll_y = ctk.CTkScrollbar(self.cluster_frame, orientation="vertical")
         self.cluster_tree_scroll_y.pack(side=ctk.RIGHT, fill=ctk.Y)
-        self.node_tree_scroll_y = ctk.CTkScrollbar(self.node_frame, orientation="vertical", command=self.node_tree.yview)
-        self.node_tree_scroll_y.pack(side=ctk.RIGHT, fill=ctk.Y)
-        
-        # Create treeview
-        self.vm_tree = ttk.Treeview(
-            self.vm_frame, show="headings", 
-            xscrollcommand=self.vm_tree_scroll_x.set, 
-            yscrollcommand=self.vm_tree_scroll_y.set
-        )
         self.cluster_tree = ttk.Treeview(self.cluster_frame, show="headings", yscrollcommand=self.cluster_tree_scroll_y.set)
-        self.node_tree = ttk.Treeview(self.node_frame, show="headings", yscrollcommand=self.node_tree_scroll_y.set)
-
-        # Pack the treeview 
-        self.cluster_tree.pack(fill=ctk.BOTH, expand=True, padx=(0, 10), pady=(0, 10))
-        self.node_tree.pack(fill=ctk.BOTH, expand=True, padx=(0, 10), pady=(0, 10))
-        self.vm_tree.pack(fill=ctk.BOTH, expand=True, padx=(0, 10), pady=(0, 10))
-
-        # Configure treeview scrollbars
-        self.vm_tree_scroll_x.configure(command=self.vm_tree.xview)
-        self.vm_tree_scroll_y.configure(command=self.vm_tree.yview)
         self.cluster_tree_scroll_y.configure(command=self.cluster_tree.yview)
-        self.node_tree_scroll_y.configure(command=self.node_tree.yview)
+        self.node_frame = None  # Built when first shown
+        self.vm_frame = None
+        self.summary_frame = None
+        self.related_frame = None
 
         # Treeview styling
         style = ttk.Style()
@@ -191,15 +3362,6 @@ class ClusterApp:
         self.cluster_tree.pack(fill=ctk.BOTH, expand=True, padx=10, pady=10)
         self.cluster_tree.tag_configure('oddrow', background='#2e2e2e')
         self.cluster_tree.tag_configure('evenrow', background='#1e1e1e')
-        self.node_tree.pack(fill=ctk.BOTH, expand=True, padx=10, pady=10)
-        self.node_tree.tag_configure('oddrow', background='#2e2e2e')
-        self.node_tree.tag_configure('evenrow', background='#1e1e1e')
-        self.vm_tree.pack(fill=ctk.BOTH, expand=True, padx=10, pady=10)
-        self.vm_tree.tag_configure('oddrow', background='#2e2e2e')
-        self.vm_tree.tag_configure('evenrow', background='#1e1e1e')
-
-        self.node_frame.pack_forget()
-        self.vm_frame.pack_forget()
 
         self.button_frame = ctk.CTkFrame(self.root)
         self.button_frame.pack(pady=(0,10))
@@ -210,23 +3372,179 @@ class ClusterApp:
         self.export_button = ctk.CTkButton(self.button_frame, text="Export", command=self.export, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE")
         self.export_button.pack(side=ctk.LEFT, padx=10, pady=10)
 
+        self.refresh_button = ctk.CTkButton(self.button_frame, text="Refresh", command=self.refresh_data, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE")
+        self.refresh_button.pack(side=ctk.LEFT, padx=10, pady=10)
+
+        self.history_button = ctk.CTkButton(self.button_frame, text="History", command=self.open_history, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE")
+        self.history_button.pack(side=ctk.LEFT, padx=10, pady=10)
+
+        self.auto_refresh_switch = ctk.CTkSwitch(self.button_frame, text="Auto-refresh", command=self.toggle_auto_refresh, font=("MartelSans", 14), progress_color="#194F90")
+        self.auto_refresh_switch.pack(side=ctk.LEFT, padx=10, pady=10)
+
+        self.stats_switch = ctk.CTkSwitch(self.button_frame, text="Collect stats", command=self.toggle_stats, font=("MartelSans", 14), progress_color="#194F90")
+        self.stats_switch.pack(side=ctk.LEFT, padx=10, pady=10)
+
+        # Status bar with transfer progress and a cancel button for the running fetch
+        self.status_frame = ctk.CTkFrame(self.root)
+        self.status_frame.pack(fill=ctk.X, padx=20, pady=(0, 10))
+
+        self.status_label = ctk.CTkLabel(self.status_frame, text="Ready", font=("MartelSans", 12), anchor="w")
+        self.status_label.pack(side=ctk.LEFT, padx=10, fill=ctk.X, expand=True)
+
+        self.cancel_button = ctk.CTkButton(self.status_frame, text="Cancel", command=self.cancel_job, font=("MartelSans", 12), width=80, fg_color="#194F90", hover_color="#009ADE", state="disabled")
+        self.cancel_button.pack(side=ctk.RIGHT, padx=10, pady=5)
+
+        self.metrics_button = ctk.CTkButton(self.status_frame, text="Metrics ▸", command=self.toggle_metrics_panel, font=("MartelSans", 12), width=80, fg_color="#194F90", hover_color="#009ADE")
+        self.metrics_button.pack(side=ctk.RIGHT, padx=(0, 10), pady=5)
+
+        self.profile_button = ctk.CTkButton(self.status_frame, text="Profile", command=self.toggle_profile_next, font=("MartelSans", 12), width=80, fg_color="#194F90", hover_color="#009ADE")
+        self.profile_button.pack(side=ctk.RIGHT, padx=(0, 10), pady=5)
+
+        self.progress_bar = ctk.CTkProgressBar(self.status_frame, width=200)
+        self.progress_bar.set(0)
+        self.progress_bar.pack(side=ctk.RIGHT, padx=10)
+
+        # Collapsible panel with per-phase timings of recent operations; metrics are only
+        # recorded while it is open or a metrics log file is set
+        self.metrics_frame = ctk.CTkFrame(self.root)
+        self.metrics_text = ctk.CTkTextbox(self.metrics_frame, height=120, font=("MartelSans", 12), wrap="word")
+        self.metrics_text.pack(fill=ctk.BOTH, expand=True, padx=10, pady=10)
+        self.metrics_text.configure(state="disabled")
+
+    def build_node_view(self):
+        if self.node_frame is not None:
+            return
+        self.node_frame = ctk.CTkFrame(self.main_frame)
+        self.node_tree_scroll_y = ctk.CTkScrollbar(self.node_frame, orientation="vertical")
+        self.node_tree_scroll_y.pack(side=ctk.RIGHT, fill=ctk.Y)
+        self.node_tree = ttk.Treeview(self.node_frame, show="headings", yscrollcommand=self.node_tree_scroll_y.set)
+        self.node_tree_scroll_y.configure(command=self.node_tree.yview)
+        self.node_tree.pack(fill=ctk.BOTH, expand=True, padx=10, pady=10)
+        self.node_tree.tag_configure('oddrow', background='#2e2e2e')
+        self.node_tree.tag_configure('evenrow', background='#1e1e1e')
+
+    def build_vm_view(self):
+        if self.vm_frame is not None:
+            return
+        self.vm_frame = ctk.CTkFrame(self.main_frame)
+        search_frame = ctk.CTkFrame(self.vm_frame, fg_color="transparent")
+        search_frame.pack(side=ctk.TOP, fill=ctk.X, padx=10, pady=(10, 0))
+        self.search_label = ctk.CTkLabel(search_frame, text="", font=("MartelSans", 12), anchor="e")
+        self.search_label.pack(side=ctk.RIGHT, padx=(10, 0))
+        self.search_entry = ctk.CTkEntry(search_frame, font=("MartelSans", 14),
+                                         placeholder_text="Search VMs, e.g. web state=RUNNING memory>64")
+        self.search_entry.pack(side=ctk.LEFT, fill=ctk.X, expand=True)
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+        self.vm_tree_scroll_x = ctk.CTkScrollbar(self.vm_frame, orientation="horizontal")
+        self.vm_tree_scroll_x.pack(side=ctk.BOTTOM, fill=ctk.X)
+        self.vm_tree_scroll_y = ctk.CTkScrollbar(self.vm_frame, orientation="vertical")
+        self.vm_tree_scroll_y.pack(side=ctk.RIGHT, fill=ctk.Y)
+        self.vm_table = VirtualTable(self.vm_frame, self.vm_tree_scroll_y, xscrollcommand=self.vm_tree_scroll_x.set)
+        self.vm_tree = self.vm_table.tree
+        self.vm_tree.bind("<Double-1>", self.refresh_selected_vm)
+        self.vm_tree_scroll_x.configure(command=self.vm_tree.xview)
+        self.vm_tree_scroll_y.configure(command=self.vm_table.yview)
+        self.vm_tree.pack(fill=ctk.BOTH, expand=True, padx=10, pady=10)
+        self.vm_tree.tag_configure('oddrow', background='#2e2e2e')
+        self.vm_tree.tag_configure('evenrow', background='#1e1e1e')
+        self.vm_tree.tag_configure('total', background='#194F90', foreground='white', font=("MartelSans", 14))
+
+    def build_summary_view(self):
+        if self.summary_frame is not None:
+            return
+        self.summary_frame = ctk.CTkFrame(self.main_frame)
+        key_frame = ctk.CTkFrame(self.summary_frame, fg_color="transparent")
+        key_frame.pack(side=ctk.TOP, fill=ctk.X, padx=10, pady=(10, 0))
+        ctk.CTkLabel(key_frame, text="Group by:", font=("MartelSans", 14)).pack(side=ctk.LEFT, padx=(0, 10))
+        self.summary_checkboxes = {}
+        for key in SUMMARY_KEYS:
+            checkbox = ctk.CTkCheckBox(key_frame, text=key, command=self.render_summary, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE")
+            if key in self.summary_keys:
+                checkbox.select()
+            checkbox.pack(side=ctk.LEFT, padx=(0, 10))
+            self.summary_checkboxes[key] = checkbox
+        self.summary_tree_scroll_y = ctk.CTkScrollbar(self.summary_frame, orientation="vertical")
+        self.summary_tree_scroll_y.pack(side=ctk.RIGHT, fill=ctk.Y)
+        self.summary_tree = ttk.Treeview(self.summary_frame, show="headings", yscrollcommand=self.summary_tree_scroll_y.set)
+        self.summary_tree_scroll_y.configure(command=self.summary_tree.yview)
+        self.summary_tree.pack(fill=ctk.BOTH, expand=True, padx=10, pady=10)
+        self.summary_tree.tag_configure('oddrow', background='#2e2e2e')
+        self.summary_tree.tag_configure('evenrow', background='#1e1e1e')
+        self.summary_tree.tag_configure('total', background='#194F90', foreground='white', font=("MartelSans", 14))
+
+    def build_related_view(self):
+        if self.related_frame is not None:
+            return
+        self.related_frame = ctk.CTkFrame(self.main_frame)
+        table_frame = ctk.CTkFrame(self.related_frame, fg_color="transparent")
+        table_frame.pack(side=ctk.TOP, fill=ctk.X, padx=10, pady=(10, 0))
+        names = {name: endpoint for endpoint, (name, _, _) in RELATED_TABLES.items()}
+        self.related_selector = ctk.CTkSegmentedButton(table_frame, values=list(names), font=("MartelSans", 14), selected_color="#194F90",
+                                                       command=lambda name: self.select_related(names[name]))
+        self.related_selector.set(RELATED_TABLES[self.related_endpoint][0])
+        self.related_selector.pack(side=ctk.LEFT)
+        self.related_export_checkbox = ctk.CTkCheckBox(table_frame, text="Include in exports", command=self.toggle_export_related,
+                                                       font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE")
+        if self.export_related:
+            self.related_export_checkbox.select()
+        self.related_export_checkbox.pack(side=ctk.LEFT, padx=20)
+        self.related_label = ctk.CTkLabel(table_frame, text="", font=("MartelSans", 12), anchor="e")
+        self.related_label.pack(side=ctk.RIGHT)
+        self.related_tree_scroll_x = ctk.CTkScrollbar(self.related_frame, orientation="horizontal")
+        self.related_tree_scroll_x.pack(side=ctk.BOTTOM, fill=ctk.X)
+        self.related_tree_scroll_y = ctk.CTkScrollbar(self.related_frame, orientation="vertical")
+        self.related_tree_scroll_y.pack(side=ctk.RIGHT, fill=ctk.Y)
+        self.related_table = VirtualTable(self.related_frame, self.related_tree_scroll_y, xscrollcommand=self.related_tree_scroll_x.set)
+        self.related_tree = self.related_table.tree
+        self.related_tree_scroll_x.configure(command=self.related_tree.xview)
+        self.related_tree_scroll_y.configure(command=self.related_table.yview)
+        self.related_tree.pack(fill=ctk.BOTH, expand=True, padx=10, pady=10)
+        self.related_tree.tag_configure('oddrow', background='#2e2e2e')
+        self.related_tree.tag_configure('evenrow', background='#1e1e1e')
+
+    # Only the cluster view exists at startup; the others are built the first time they are shown
+    def show_frame(self, view_type):
+        if view_type == "node":
+            self.build_node_view()
+        elif view_type == "vm":
+            self.build_vm_view()
+        elif view_type == "summary":
+            self.build_summary_view()
+        elif view_type == "related":
+            self.build_related_view()
+        frames = {"cluster": self.cluster_frame, "node": self.node_frame, "vm": self.vm_frame, "summary": self.summary_frame,
+                  "related": self.related_frame}
+        for name, frame in frames.items():
+            if frame is not None and name != view_type:
+                frame.pack_forget()
+        frames[view_type].pack(fill=ctk.BOTH, expand=True)
+
     def switch_view_cluster(self):
         self.fetch_data(view_type="cluster")
-        self.cluster_frame.pack(fill=ctk.BOTH, expand=True)
-        self.vm_frame.pack_forget() 
-        self.node_frame.pack_forget() 
+        self.show_frame("cluster")
 
     def switch_view_node(self):
         self.fetch_data(view_type="node")
-        self.node_frame.pack(fill=ctk.BOTH, expand=True)
-        self.vm_frame.pack_forget()
-        self.cluster_frame.pack_forget()
+        self.show_frame("node")
 
     def switch_view_vm(self):
         self.fetch_data(view_type="vm")
-        self.vm_frame.pack(fill=ctk.BOTH, expand=True)
-        self.cluster_frame.pack_forget()
-        self.node_frame.pack_forget()
+        self.show_frame("vm")
+
+    def switch_view_summary(self):
+        self.fetch_data(view_type="summary")
+        self.show_frame("summary")
+
+    def switch_view_related(self):
+        self.fetch_data(view_type="related")
+        self.show_frame("related")
+
+    def select_related(self, endpoint):
+        self.related_endpoint = endpoint
+        self.fetch_data(view_type="related")
+
+    def toggle_export_related(self):
+        self.export_related = bool(self.related_export_checkbox.get())
 
     # Settings modal
     def open_settings(self, view_type="cluster"):
@@ -239,17 +3557,10 @@ class ClusterApp:
         settings_window.configure(bg="#2e2e2e")
         ctk.set_appearance_mode("dark")
         apply_dark_title_bar(settings_window)
-        if platform.system() == "Windows":
-            icon_path = self.resource_path("icon.ico") 
-            settings_window.iconbitmap(icon_path)
-        elif platform.system() == "Darwin":
-            icon_path = self.resource_path("icon.icns")
-            icon_image = Image.open(icon_path)
-            icon_photo = ImageTk.PhotoImage(icon_image)
-            settings_window.iconphoto(True, icon_photo)
+        self.apply_window_icon(settings_window)
 
         window_width = 300
-        window_height = 230
+        window_height = 510
         screen_width = self.root.winfo_screenwidth()
         screen_height = self.root.winfo_screenheight()
         x = (screen_width  // 2) - (window_width // 2)
@@ -259,7 +3570,7 @@ class ClusterApp:
         frame = ctk.CTkFrame(settings_window)
         frame.pack(pady=20, padx=20, fill='both', expand=True)
 
-        ctk.CTkLabel(frame, text="Node IP:", font=("MartelSans", 14)).grid(row=0, column=0, padx=10, pady=(15, 5), sticky='w')
+        ctk.CTkLabel(frame, text="Node IPs:", font=("MartelSans", 14)).grid(row=0, column=0, padx=10, pady=(15, 5), sticky='w')
         node_ip_entry = ctk.CTkEntry(frame, font=("MartelSans", 14))
         node_ip_entry.grid(row=0, column=1, padx=10, pady=(15, 5), sticky='ew')
         node_ip_entry.insert(0, self.cluster_ip)
@@ -275,15 +3586,118 @@ class ClusterApp:
         password_entry.grid(row=2, column=1, padx=10, pady=5, sticky='ew')
         password_entry.insert(0, self.password)
 
+        ctk.CTkLabel(frame, text="Cache TTL (s):", font=("MartelSans", 14)).grid(row=3, column=0, padx=10, pady=5, sticky='w')
+        ttl_entry = ctk.CTkEntry(frame, font=("MartelSans", 14))
+        ttl_entry.grid(row=3, column=1, padx=10, pady=5, sticky='ew')
+        ttl_entry.insert(0, str(self.cache.ttl))
+
+        ctk.CTkLabel(frame, text="Auto-refresh (s):", font=("MartelSans", 14)).grid(row=4, column=0, padx=10, pady=5, sticky='w')
+        interval_entry = ctk.CTkEntry(frame, font=("MartelSans", 14))
+        interval_entry.grid(row=4, column=1, padx=10, pady=5, sticky='ew')
+        interval_entry.insert(0, str(self.auto_refresh_interval))
+
+        # Optional list of further clusters to collect from in parallel
+        cluster_list = list(self.cluster_list)
+        ctk.CTkLabel(frame, text="Cluster list:", font=("MartelSans", 14)).grid(row=5, column=0, padx=10, pady=5, sticky='w')
+        list_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        list_frame.grid(row=5, column=1, padx=10, pady=5, sticky='ew')
+        list_label = ctk.CTkLabel(list_frame, text=f"{len(cluster_list)} loaded", font=("MartelSans", 12))
+        list_label.pack(side=ctk.LEFT)
+
+        def load_list():
+            file_path = filedialog.askopenfilename(parent=settings_window, filetypes=[("Cluster lists", "*.txt *.csv"), ("All Files", "*.*")])
+            if file_path:
+                try:
+                    cluster_list[:] = load_cluster_list(file_path)
+                except Exception as e:
+                    self.show_message_box(f"Error reading cluster list: {str(e)}")
+                list_label.configure(text=f"{len(cluster_list)} loaded")
+
+        def clear_list():
+            cluster_list.clear()
+            list_label.configure(text="0 loaded")
+
+        ctk.CTkButton(list_frame, text="Clear", command=clear_list, width=50, font=("MartelSans", 12), fg_color="#194F90", hover_color="#009ADE").pack(side=ctk.RIGHT)
+        ctk.CTkButton(list_frame, text="Load...", command=load_list, width=60, font=("MartelSans", 12), fg_color="#194F90", hover_color="#009ADE").pack(side=ctk.RIGHT, padx=5)
+
+        ctk.CTkLabel(frame, text="Stats interval (s):", font=("MartelSans", 14)).grid(row=6, column=0, padx=10, pady=5, sticky='w')
+        stats_interval_entry = ctk.CTkEntry(frame, font=("MartelSans", 14))
+        stats_interval_entry.grid(row=6, column=1, padx=10, pady=5, sticky='ew')
+        stats_interval_entry.insert(0, str(self.stats_interval))
+
+        # Optional CSV file that collected 1-minute stats are appended to
+        spill_path = [self.stats_spill_path]
+        ctk.CTkLabel(frame, text="Stats file:", font=("MartelSans", 14)).grid(row=7, column=0, padx=10, pady=5, sticky='w')
+        spill_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        spill_frame.grid(row=7, column=1, padx=10, pady=5, sticky='ew')
+        spill_label = ctk.CTkLabel(spill_frame, text=os.path.basename(spill_path[0]) or "None", font=("MartelSans", 12))
+        spill_label.pack(side=ctk.LEFT)
+
+        def choose_spill():
+            file_path = filedialog.asksaveasfilename(parent=settings_window, defaultextension=".csv", filetypes=[("CSV files", "*.csv"), ("All Files", "*.*")])
+            if file_path:
+                spill_path[0] = file_path
+                spill_label.configure(text=os.path.basename(file_path))
+
+        def clear_spill():
+            spill_path[0] = ""
+            spill_label.configure(text="None")
+
+        ctk.CTkButton(spill_frame, text="Clear", command=clear_spill, width=50, font=("MartelSans", 12), fg_color="#194F90", hover_color="#009ADE").pack(side=ctk.RIGHT)
+        ctk.CTkButton(spill_frame, text="Choose...", command=choose_spill, width=60, font=("MartelSans", 12), fg_color="#194F90", hover_color="#009ADE").pack(side=ctk.RIGHT, padx=5)
+
+        # Optional JSON-lines file that the metrics of every operation are appended to
+        metrics_log_path = [self.metrics_log_path]
+        ctk.CTkLabel(frame, text="Metrics log:", font=("MartelSans", 14)).grid(row=8, column=0, padx=10, pady=5, sticky='w')
+        metrics_log_frame = ctk.CTkFrame(frame, fg_color="transparent")
+        metrics_log_frame.grid(row=8, column=1, padx=10, pady=5, sticky='ew')
+        metrics_log_label = ctk.CTkLabel(metrics_log_frame, text=os.path.basename(metrics_log_path[0]) or "None", font=("MartelSans", 12))
+        metrics_log_label.pack(side=ctk.LEFT)
+
+        def choose_metrics_log():
+            file_path = filedialog.asksaveasfilename(parent=settings_window, defaultextension=".jsonl", filetypes=[("JSON Lines files", "*.jsonl"), ("All Files", "*.*")])
+            if file_path:
+                metrics_log_path[0] = file_path
+                metrics_log_label.configure(text=os.path.basename(file_path))
+
+        def clear_metrics_log():
+            metrics_log_path[0] = ""
+            metrics_log_label.configure(text="None")
+
+        ctk.CTkButton(metrics_log_frame, text="Clear", command=clear_metrics_log, width=50, font=("MartelSans", 12), fg_color="#194F90", hover_color="#009ADE").pack(side=ctk.RIGHT)
+        ctk.CTkButton(metrics_log_frame, text="Choose...", command=choose_metrics_log, width=60, font=("MartelSans", 12), fg_color="#194F90", hover_color="#009ADE").pack(side=ctk.RIGHT, padx=5)
+
+        # Decoding and exports in a separate process, so the window stays responsive with large clusters
+        worker_switch = ctk.CTkSwitch(frame, text="Worker process", font=("MartelSans", 14), progress_color="#194F90")
+        worker_switch.grid(row=9, column=0, columnspan=2, padx=10, pady=5, sticky='w')
+        if WorkerProcess.enabled:
+            worker_switch.select()
+
         def save_settings():
             self.cluster_ip = node_ip_entry.get()
             self.username = username_entry.get()
             self.password = password_entry.get()
+            if ttl_entry.get().strip().isdigit():
+                self.cache.ttl = int(ttl_entry.get())
+            if interval_entry.get().strip().isdigit() and int(interval_entry.get()) > 0:
+                self.auto_refresh_interval = int(interval_entry.get())
+            if stats_interval_entry.get().strip().isdigit() and int(stats_interval_entry.get()) > 0:
+                self.stats_interval = int(stats_interval_entry.get())
+            self.stats_spill_path = spill_path[0]
+            self.metrics_log_path = metrics_log_path[0]
+            if self.collector:
+                self.collector.spill_path = self.stats_spill_path
+            self.cluster_list = cluster_list
+            WorkerProcess.enabled = bool(worker_switch.get())
+            if WorkerProcess.enabled:
+                WorkerProcess.warm_up()
+            self.cache.invalidate()
+            self.drop_fetches()
             settings_window.destroy()
             self.fetch_data(self.current_view)
 
         save_button = ctk.CTkButton(frame, text="Fetch Data", command=save_settings, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE")
-        save_button.grid(row=3, column=0, columnspan=2, pady=10)
+        save_button.grid(row=10, column=0, columnspan=2, pady=10)
         settings_window.bind("<Return>", lambda event: save_settings())
         
         frame.columnconfigure(1, weight=1)
@@ -295,7 +3709,7 @@ class ClusterApp:
         self.cluster_tree["columns"] = columns
         for col in columns:
             self.cluster_tree.heading(col, text=col, anchor="w")
-            if col in ["Tag"]:
+            if col in ["Cluster", "Tag"]:
                 self.cluster_tree.column(col, anchor="w", width=200, stretch=False)
             else:
                 self.cluster_tree.column(col, anchor="w", width=750, stretch=True)
@@ -310,8 +3724,8 @@ class ClusterApp:
         self.node_tree["columns"] = columns
         for col in columns:
             self.node_tree.heading(col, text=col, anchor="w")
-            if col in ["TO BE DEFINED"]:
-                self.node_tree.column(col, anchor="w", width=200, stretch=False)
+            if col != "Hosted VMs":
+                self.node_tree.column(col, anchor="w", width=font.nametofont("TkDefaultFont").measure(col) + 40, stretch=False)
             else:
                 self.node_tree.column(col, anchor="w", width=750, stretch=True)
         
@@ -321,7 +3735,6 @@ class ClusterApp:
     def update_vm_columns(self, columns):
         for col in self.vm_tree["columns"]:
             self.vm_tree.heading(col, text="", anchor="w")
-        self.processed_vms.clear()  
         
         self.vm_tree["columns"] = columns
         tree_font = font.nametofont("TkDefaultFont")
@@ -335,58 +3748,49 @@ class ClusterApp:
             else:
                 self.vm_tree.column(col, anchor="w", stretch=False, width=text_width)
         
-        for item in self.vm_tree.get_children():
-            self.vm_tree.delete(item)
-
-    def sort_vm_tree(self, col, reverse=False):
-        children = self.vm_tree.get_children("")
-        data = []
-        total_item = None
-
-        for item in children:
-            row_values = self.vm_tree.item(item, "values")
-            if "TOTAL" in row_values:  # Identify the TOTAL row
-                total_item = item
-            else:
-                data.append((self.vm_tree.set(item, col), item))
-
-        # Sort data excluding total row
-        data.sort(key=lambda x: (float(x[0]) if x[0].replace('.', '', 1).isdigit() else x[0].lower()), reverse=reverse)
-
-        # Move sorted rows back into the tree
-        for index, (val, item) in enumerate(data):
-            self.vm_tree.move(item, "", index)
+        self.vm_table.clear()
 
-        # Ensure total row sits at the bottom
-        if total_item:
-            self.vm_tree.move(total_item, "", len(data))
-
-        # Reapply alternating row colors
-        self.alternate_row_colors()
+    def update_related_columns(self, columns):
+        self.related_tree["columns"] = columns
+        tree_font = font.nametofont("TkDefaultFont")
+        for col in columns:
+            self.related_tree.heading(col, text=col, command=lambda _col=col: self.sort_related_tree(_col), anchor="w")
+            anchor = "e" if col in NUMERIC_RELATED_COLUMNS else "w"
+            self.related_tree.column(col, anchor=anchor, stretch=False, width=tree_font.measure(col) + 20)
+        self.related_table.clear()
 
-        # Reapply total row styling
-        if total_item:
-            self.vm_tree.item(total_item, tags=('total',))
+    def sort_related_tree(self, col, reverse=False):
+        key = numeric_sort_key if col in NUMERIC_RELATED_COLUMNS else text_sort_key
+        self.related_table.sort(self.related_tree["columns"].index(col), key, reverse)
+        self.related_tree.heading(col, command=lambda: self.sort_related_tree(col, not reverse))
 
-        self.vm_tree.tag_configure('total', background='#194F90', foreground='#ffffff')
+    # Sort the row model and let the table redraw only the visible window; TOTAL stays pinned last
+    def sort_vm_tree(self, col, reverse=False):
+        key = numeric_sort_key if col in NUMERIC_VM_COLUMNS else text_sort_key
+        metrics = self.new_metrics(f"Sorting by {col}")
+        self.begin_profile(f"Sorting by {col}")
+        if metrics:
+            metrics.timed("sort", self.vm_table.sort)(self.columns_vm.index(col), key, reverse)
+            metrics.timed("render", self.root.update_idletasks)()
+            metrics.count("rows", self.vm_table.row_count())
+            self.record_metrics(metrics.finish())
+        else:
+            self.vm_table.sort(self.columns_vm.index(col), key, reverse)
+        if self.profiler:
+            self.root.update_idletasks()
+        self.end_profile()
 
         # Toggle sorting direction
         self.vm_tree.heading(col, command=lambda: self.sort_vm_tree(col, not reverse))
 
     def alternate_row_colors(self):
-        children = self.vm_tree.get_children()
-        
         for index, item in enumerate(self.cluster_tree.get_children()):
             tag = 'evenrow' if index % 2 == 0 else 'oddrow'
             self.cluster_tree.item(item, tags=(tag,))
 
-        for index, item in enumerate(self.node_tree.get_children()):
+        for index, item in enumerate(self.node_tree.get_children() if self.node_frame is not None else ()):
             tag = 'evenrow' if index % 2 == 0 else 'oddrow'
             self.node_tree.item(item, tags=(tag,))
-
-        for index, item in enumerate(self.vm_tree.get_children()):
-            tag = 'evenrow' if index % 2 == 0 else 'oddrow'
-            self.vm_tree.item(item, tags=(tag,))
     
     # Error/message box 
     def show_message_box(self, error_message):
@@ -394,14 +3798,7 @@ class ClusterApp:
         message_box.title("Message")
         message_box.transient(self.root)
         message_box.configure(bg="#2e2e2e")
-        if platform.system() == "Windows":
-            icon_path = self.resource_path("icon.ico") 
-            message_box.iconbitmap(icon_path)
-        elif platform.system() == "Darwin":
-            icon_path = self.resource_path("icon.icns")
-            icon_image = Image.open(icon_path)
-            icon_photo = ImageTk.PhotoImage(icon_image)
-            message_box.iconphoto(True, icon_photo)
+        self.apply_window_icon(message_box)
         apply_dark_title_bar(message_box)
         message_box.grab_set()
         message_box.focus_set()
@@ -424,313 +3821,777 @@ class ClusterApp:
 
         message_box.protocol("WM_DELETE_WINDOW", message_box.destroy)
 
+    # Background jobs: work runs on a thread, results come back through ui_queue. A view fetch (a
+    # job with a snapshot key) isn't cancelled by the next job but goes on loading into the
+    # snapshot cache in the background, and a later job for the same key attaches to it.
+    def start_job(self, label, work, on_done, error_prefix="Error", key=None):
+        if self.attach_job(key):
+            return
+        self.detach_job()
+        job = FetchJob(self.ui_queue, label, key)
+        job.metrics = self.new_metrics(label)
+        self.begin_profile(label)
+        self.job = job
+        self.status_label.configure(text=f"{label}...")
+        self.progress_bar.set(0)
+        self.cancel_button.configure(state="normal")
+
+        def run():
+            try:
+                result = work(job)
+                job.check()
+                job.post("done", (on_done, result))
+            except Exception as e:
+                if job.cancelled.is_set():
+                    job.post("cancelled")
+                else:
+                    job.post("error", f"{error_prefix}: {str(e)}")
+
+        threading.Thread(target=run, daemon=True).start()
+        self.schedule_drain()
+
+    def job_running(self, key):
+        return key is not None and self.job is not None and self.job.key == key and not self.job.cancelled.is_set()
+
+    # Make the running or background fetch of key the current job; its result goes to the
+    # on_done it was started with
+    def attach_job(self, key):
+        if self.job_running(key):
+            return True
+        job = self.fetches.pop(key, None)
+        if job is None or job.cancelled.is_set():
+            return False
+        self.detach_job()
+        self.job = job
+        self.status_label.configure(text=f"{job.label}...")
+        self.progress_bar.set(0)
+        self.cancel_button.configure(state="normal")
+        self.schedule_drain()
+        return True
+
+    # Stop following the current job: a view fetch carries on in the background, anything else is cancelled
+    def detach_job(self):
+        job, self.job = self.job, None
+        if job is None:
+            return
+        if job.key is None or job.cancelled.is_set():
+            job.cancel()
+        else:
+            job.detached = True  # Its partial rows were for the view it was started from
+            self.fetches[job.key] = job
+
+    # Cancel the background fetches, whose results are stale once the cache is invalidated
+    def drop_fetches(self):
+        for job in self.fetches.values():
+            job.cancel()
+        self.fetches.clear()
+
+    def cancel_job(self):
+        if self.job:
+            self.job.cancel()
+
+    def schedule_drain(self):
+        if not self.draining:
+            self.draining = True
+            self.root.after(15, self.drain_queue)
+
+    # Apply worker results within a per-frame time budget so the mainloop stays responsive
+    def drain_queue(self):
+        deadline = time.perf_counter() + 0.03
+        while time.perf_counter() < deadline:
+            try:
+                job, kind, payload = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not self.job:  # Background, superseded or cancelled job
+                if kind in ("done", "error", "cancelled") and self.fetches.get(job.key) is job:
+                    del self.fetches[job.key]  # A fetched snapshot is in the cache for the next view that needs it
+                    if job.metrics:
+                        self.record_metrics(job.metrics.finish(kind))
+                continue
+            if kind == "progress":
+                self.show_progress(job, *payload)
+            elif kind == "partial":
+                if job.detached:
+                    continue
+                callback, data = payload
+                job.timed("render", callback)(data)
+            else:
+                self.finish_job()
+                if kind == "done":
+                    on_done, result = payload
+                    job.timed("render", on_done)(result)
+                    if job.metrics:  # Include the Treeview updates deferred to idle time
+                        job.timed("render", self.root.update_idletasks)()
+                elif kind == "error":
+                    self.status_label.configure(text="Error")
+                    self.show_message_box(payload)
+                elif kind == "cancelled":
+                    self.status_label.configure(text="Cancelled")
+                if job.metrics:
+                    self.record_metrics(job.metrics.finish(kind))
+                self.end_profile()
+
+        if self.job or self.fetches or not self.ui_queue.empty():
+            self.root.after(15, self.drain_queue)
+        else:
+            self.draining = False
+
+    def finish_job(self):
+        self.job = None
+        self.cancel_button.configure(state="disabled")
+        self.progress_bar.set(1)
+        self.status_label.configure(text="Ready")
+
+    def show_progress(self, job, endpoint, done, total):
+        size = f"{done / (1024 ** 2):.1f} MiB"
+        if total:
+            size += f" of {total / (1024 ** 2):.1f} MiB"
+            self.progress_bar.set(done / total)
+        self.status_label.configure(text=f"{job.label}: {endpoint} {size}")
+
+    # Clusters to query: the one in Settings plus any loaded cluster list (blank credentials use the Settings ones)
+    def cluster_targets(self):
+        targets = []
+        if self.cluster_ip:
+            targets.append((self.cluster_ip, self.username, self.password))
+        for host, username, password in self.cluster_list:
+            if host != self.cluster_ip:
+                targets.append((host, username or self.username, password or self.password))
+        return targets
+
+    def snapshot_key(self, endpoint):
+        return ("fleet", endpoint) if self.cluster_list else (self.cluster_ip, endpoint)
+
+    # Worker-side load of one endpoint for the configured cluster(s), through the snapshot cache,
+    # saving what is fetched to history
+    def load_snapshot(self, endpoint, job, on_rows=None):
+        snapshot = load_snapshot(self.cluster_targets(), endpoint, job, self.cache, bool(self.cluster_list), on_rows, self.history)
+        self.saved.pop(endpoint, None)  # Fresh data from here on
+        return snapshot
+
     # Data fetch
     def fetch_data(self, view_type):
-        host = self.cluster_ip
-        username = self.username
-        password = self.password
+        targets = self.cluster_targets()
 
-        if not host or not username or not password:
-            self.open_settings(view_type)
+        if not targets or not all(username and password for host, username, password in targets):
+            if not self.show_saved(view_type, refreshing=False):
+                self.open_settings(view_type)
             return
 
-        try:
-            if view_type == "cluster":
-                self.columns_cluster = ("Tag", "Value")
-                self.update_cluster_columns(self.columns_cluster)
-                self.vm_frame.pack_forget()
-                self.cluster_frame.pack(fill=ctk.BOTH, expand=True)
-                self.fetch_cluster_data(host, username, password)
-            elif view_type == "vm":
-                self.columns_vm = (
-                "Name", "UUID", "Description", "OS", "Machine Type", "State", "vCPUs", "Memory (GiB)", 
-                "Block Device", "Device Type", "Capacity (GiB)", "Allocation (GiB)", "Mount Points"
-                )
-                self.update_vm_columns(self.columns_vm)
-                self.cluster_frame.pack_forget()  
-                self.vm_frame.pack(fill=ctk.BOTH, expand=True)
-                self.fetch_vm_data(host, username, password)
+        self.current_view = view_type
+        if view_type == "cluster":
+            self.show_frame("cluster")
+            key = self.snapshot_key("/Registration")
+            cached = self.cache.peek(key)
+            if cached is not None:
+                self.render_cluster_data(cached)
+                self.show_cache_age(key)
+                return
+            self.show_saved(view_type, refreshing=True)
+            self.start_job("Fetching cluster data", lambda job: self.load_snapshot("/Registration", job),
+                           self.render_cluster_data, "Error fetching cluster data", key)
+        elif view_type == "node":
+            self.show_frame("node")
+            key = self.snapshot_key("/Node")
+            cached = self.cache.peek(key)
+            if cached is not None:
+                self.render_node_data(cached)
+                self.show_cache_age(key)
+                return
+            self.start_job("Fetching node data", lambda job: self.load_snapshot("/Node", job),
+                           self.node_data_loaded, "Error fetching node data", key)
+        elif view_type in ("vm", "summary"):  # The Summary view groups the VM view's inventory
+            self.show_frame(view_type)
+            key = self.snapshot_key("/VirDomain")
+            cached = self.cache.peek(key)
+            if cached is not None:
+                self.render_vm_data(cached)
+                self.show_cache_age(key)
+                return
+            if self.attach_job(key):
+                return
+            on_rows = None  # The saved snapshot stays up until the fresh one replaces it
+            if not self.show_saved(view_type, refreshing=True) and view_type == "vm":
+                self.begin_vm_rows(FLEET_VM_COLUMNS if self.cluster_list else VM_COLUMNS)
+                on_rows = self.append_vm_rows
+            self.start_job("Fetching VM data", lambda job: self.load_snapshot("/VirDomain", job, on_rows),
+                           self.vm_data_loaded, "Error fetching VM data", key)
+        elif view_type == "related":  # Fetched on first view, joined to the VM view's inventory
+            self.show_frame("related")
+            endpoint = self.related_endpoint
+            key = self.snapshot_key(endpoint)
+            cached = self.cache.peek(key)
+            if cached is not None:
+                self.render_related_data(cached)
+                self.show_cache_age(key)
+                return
+            if self.attach_job(key):
+                return
+            self.start_job(f"Fetching {RELATED_TABLES[endpoint][0].lower()}", lambda job: self.load_snapshot(endpoint, job),
+                           self.related_data_loaded, f"Error fetching {RELATED_TABLES[endpoint][0].lower()}", key)
 
-        except Exception as e:
-            self.show_message_box(f"Error: {str(e)}")
+    def refresh_data(self):
+        if self.cluster_list:
+            self.cache.invalidate()
+        elif self.cluster_ip:
+            self.cache.invalidate(self.cluster_ip)
+        self.drop_fetches()
+        self.fetch_data(self.current_view)
 
-    # Data fetch for cluster data (Registration in API)
-    def fetch_cluster_data(self, host, username, password):
-        host = self.cluster_ip
-        username = self.username
-        password = self.password
+    def toggle_auto_refresh(self):
+        if self.auto_refresh_after:
+            self.root.after_cancel(self.auto_refresh_after)
+            self.auto_refresh_after = None
+        if self.auto_refresh_switch.get():
+            self.auto_refresh_after = self.root.after(self.auto_refresh_interval * 1000, self.auto_refresh)
 
-        if not host or not username or not password:
-            self.show_message_box("Please enter your credentials in the Settings!")
+    # Periodic refresh; the VM view is diffed against what is shown instead of being rebuilt
+    def auto_refresh(self):
+        self.auto_refresh_after = None
+        if not self.auto_refresh_switch.get():
             return
-        
+        if self.job is None and self.cluster_targets():  # Don't interrupt work the user started
+            if self.current_view in ("vm", "summary"):
+                self.refresh_vm_delta()
+            else:
+                self.refresh_data()
+        self.auto_refresh_after = self.root.after(self.auto_refresh_interval * 1000, self.auto_refresh)
+
+    # Stats collection runs on its own thread beside the regular jobs until switched off
+    def toggle_stats(self):
+        if self.stats_job:
+            self.stats_job.cancel()
+            self.stats_job = None
+        if self.stats_switch.get():
+            targets = self.cluster_targets()
+            if not targets or not all(username and password for host, username, password in targets):
+                self.stats_switch.deselect()
+                self.open_settings(self.current_view)
+                return
+            if self.collector is None:
+                self.collector = StatsCollector(self.stats_spill_path)
+            self.stats_job = FetchJob(None, "Collecting stats")
+            threading.Thread(target=self.collect_stats, args=(self.stats_job, targets, self.collector), daemon=True).start()
+        self.show_stats_status()
+
+    # Poll /VirDomainStats on every cluster each interval, on the worker thread
+    def collect_stats(self, job, targets, collector):
+        next_poll = time.monotonic()
+        while not job.cancelled.is_set():
+            try:
+                results, errors = collect_from_clusters(
+                    targets, lambda client, child: client.get_json('/VirDomainStats', timeout=30, job=child), job,
+                    timeout=max(30, self.stats_interval))
+                if results:
+                    collector.add(time.time(), [record for records in results.values() for record in records])
+                collector.error = "; ".join(f"{host}: {error}" for host, error in errors.items()) or None
+            except FetchCancelled:
+                break
+            except Exception as e:
+                collector.error = str(e)
+            next_poll = max(next_poll + self.stats_interval, time.monotonic())
+            job.cancelled.wait(next_poll - time.monotonic())
+
+    def show_stats_status(self):
+        if self.stats_status_after:
+            self.root.after_cancel(self.stats_status_after)
+            self.stats_status_after = None
+        if self.stats_job is None:
+            self.stats_switch.configure(text="Collect stats")
+            return
+        collector = self.collector
+        self.stats_switch.configure(text=f"Collect stats ({'error' if collector.error else collector.samples})")
+        if collector.error and self.job is None:
+            self.status_label.configure(text=f"Stats collection: {collector.error}")
+        self.stats_status_after = self.root.after(1000, self.show_stats_status)
+
+    # Profiling mode: the next action (or every one, with HYPERCORE_PROFILE set) runs under a
+    # Profiler, from the click until its results are drawn, including any job it starts
+    def toggle_profile_next(self):
+        self.profile_next = not self.profile_next
+        self.profile_button.configure(text="Profiling next" if self.profile_next else "Profile")
+        if self.profile_next:
+            self.status_label.configure(text=f"The next action will be profiled into {diagnostics_dir()}")
+
+    def begin_profile(self, label):
+        if self.profiler is None and (self.profile_next or self.profile_every):
+            self.profile_next = False
+            self.profile_button.configure(text="Profiling...")
+            self.profiler = Profiler(label, diagnostics_dir()).start()
+
+    # Stop once no job is left running, and write the files on a thread since the
+    # allocation statistics take a while on a large heap
+    def end_profile(self):
+        profiler = self.profiler
+        if profiler is None or self.job is not None:
+            return
+        self.profiler = None
+        profiler.stop()
+        self.profile_button.configure(text="Profile")
+        result = {}
+
+        def save():
+            try:
+                result["path"] = profiler.save()
+            except OSError as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=save, daemon=True)
+        thread.start()
+
+        def check():
+            if thread.is_alive():
+                self.root.after(200, check)
+            elif "error" in result:
+                self.status_label.configure(text=f"Error saving profile: {str(result['error'])}")
+            else:
+                self.status_label.configure(text=f"Profile saved to {result['path']}")
+
+        self.root.after(200, check)
+
+    # Metrics for a new operation, or None when nothing would show or log them
+    def new_metrics(self, label):
+        if not (self.metrics_visible or self.metrics_log_path):
+            return None
+        return Metrics(label, "fleet" if self.cluster_list else self.cluster_ip)
+
+    def record_metrics(self, metrics):
+        self.metrics_history.appendleft(metrics.summary())
+        self.show_metrics()
+        if self.metrics_log_path:
+            try:
+                metrics.append_to_log(self.metrics_log_path)
+            except OSError as e:
+                self.status_label.configure(text=f"Metrics log: {str(e)}")
+
+    def show_metrics(self):
+        self.metrics_text.configure(state="normal")
+        self.metrics_text.delete("1.0", ctk.END)
+        self.metrics_text.insert(ctk.END, "\n".join(self.metrics_history) or "Metrics of the next fetch, sort or export show here.")
+        self.metrics_text.configure(state="disabled")
+
+    def toggle_metrics_panel(self):
+        self.metrics_visible = not self.metrics_visible
+        if not self.metrics_visible:
+            self.metrics_frame.pack_forget()
+            self.metrics_button.configure(text="Metrics ▸")
+        else:
+            self.metrics_frame.pack(fill=ctk.X, padx=20, pady=(0, 10), after=self.status_frame)
+            self.metrics_button.configure(text="Metrics ▾")
+            self.show_metrics()
+
+    # Open the newest snapshot in history in the background at startup. Its cluster becomes the
+    # Settings one, and the current view shows it at once and, with credentials set, refreshes it.
+    def restore_last_snapshot(self):
+        history = self.history
+
+        def work(job):
+            history.prune(time.time() - HISTORY_DAYS * 86400)
+            latest = history.latest("/VirDomain")
+            if latest is None:
+                return None
+            host, snapshot, taken = latest
+            inventory = job.timed("build", VMInventory.from_records)(history.load(snapshot).values())
+            registration = history.latest("/Registration", host)
+            cluster_data = history.load(registration[1]).get("", {}) if registration else {}
+            return {"host": host, "taken": taken, "/VirDomain": inventory, "/Registration": cluster_data}
+
+        self.start_job("Opening saved snapshot", work, self.saved_snapshot_loaded, "Error opening saved snapshot")
+
+    def saved_snapshot_loaded(self, saved):
+        if saved is None or self.cluster_ip or self.cluster_list:  # Nothing saved, or Settings were filled in meanwhile
+            return
+        self.cluster_ip = saved["host"]
+        self.saved = saved
+        self.fetch_data(self.current_view)
+
+    # Show the saved snapshot for a view, if there is one for the configured cluster, until fresh
+    # data replaces it (stale-while-revalidate). Returns whether there was one.
+    def show_saved(self, view_type, refreshing):
+        endpoint = {"cluster": "/Registration", "vm": "/VirDomain", "summary": "/VirDomain"}.get(view_type)
+        if endpoint not in self.saved or self.cluster_list or self.saved["host"] != self.cluster_ip:
+            return False
+        self.current_view = view_type
+        self.show_frame(view_type)
+        if endpoint == "/VirDomain":
+            self.render_vm_data(self.saved[endpoint])
+        else:
+            self.render_cluster_data(self.saved[endpoint])
+        if not refreshing:
+            taken = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.saved["taken"]))
+            self.status_label.configure(text=f"Showing snapshot saved {taken} (enter credentials in Settings to refresh)")
+        return True
+
+    # Snapshot history of a cluster: open an older snapshot in the VM view, or compare two
+    def open_history(self):
+        clusters = self.history.clusters()
+        if not clusters:
+            self.show_message_box("No snapshots saved yet.")
+            return
+        history_window = ctk.CTkToplevel(self.root)
+        history_window.title("History")
+        history_window.transient(self.root)
+        history_window.configure(bg="#2e2e2e")
+        apply_dark_title_bar(history_window)
+        self.apply_window_icon(history_window)
+        history_window.geometry("900x600")
+
+        top = ctk.CTkFrame(history_window, fg_color="transparent")
+        top.pack(fill=ctk.X, padx=20, pady=(20, 5))
+        ctk.CTkLabel(top, text="Cluster:", font=("MartelSans", 14)).pack(side=ctk.LEFT, padx=(0, 10))
+        cluster_menu = ctk.CTkOptionMenu(top, values=clusters, font=("MartelSans", 14), fg_color="#194F90", button_color="#194F90",
+                                         command=lambda cluster: show_snapshots(cluster))
+        cluster_menu.pack(side=ctk.LEFT)
+
+        snapshot_tree = ttk.Treeview(history_window, show="headings", selectmode="extended", height=8,
+                                     columns=("Snapshot", "Saved", "VMs", "Changes"))
+        for col in snapshot_tree["columns"]:
+            snapshot_tree.heading(col, text=col, anchor="w")
+        snapshot_tree.pack(fill=ctk.X, padx=20, pady=5)
+
+        buttons = ctk.CTkFrame(history_window, fg_color="transparent")
+        buttons.pack(padx=20, pady=5)
+        diff_label = ctk.CTkLabel(history_window, text="Select two snapshots and click Compare.", font=("MartelSans", 12), anchor="w")
+        diff_label.pack(fill=ctk.X, padx=20)
+        if self.history.error:
+            diff_label.configure(text=f"The last snapshot could not be saved: {self.history.error}")
+        diff_tree = ttk.Treeview(history_window, show="headings", columns=("Change", "VM", "UUID", "Details"))
+        for col in diff_tree["columns"]:
+            diff_tree.heading(col, text=col, anchor="w")
+        diff_tree.pack(fill=ctk.BOTH, expand=True, padx=20, pady=(5, 20))
+
+        def show_snapshots(cluster):
+            snapshot_tree.delete(*snapshot_tree.get_children())
+            for snapshot, taken, records, changed in self.history.snapshots(cluster):
+                saved = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(taken))
+                snapshot_tree.insert("", ctk.END, iid=str(snapshot), values=(snapshot, saved, records, changed))
+
+        def selected():
+            return sorted(int(item) for item in snapshot_tree.selection())
+
+        def open_snapshot():
+            if len(selected()) != 1:
+                diff_label.configure(text="Select one snapshot to open.")
+                return
+            snapshot = selected()[0]
+
+            def loaded(inventory):
+                self.show_frame("vm")
+                self.current_view = "vm"
+                self.render_vm_data(inventory)
+                self.status_label.configure(text=f"Showing snapshot {snapshot} of {cluster_menu.get()} from history")
+
+            self.start_job("Opening snapshot", lambda job: VMInventory.from_records(self.history.load(snapshot).values()),
+                           loaded, "Error opening snapshot")
+
+        def compare():
+            if len(selected()) != 2:
+                diff_label.configure(text="Select two snapshots to compare.")
+                return
+            old, new = selected()
+
+            def compared(rows):
+                if not diff_tree.winfo_exists():
+                    return
+                diff_tree.delete(*diff_tree.get_children())
+                for index, row in enumerate(rows):
+                    diff_tree.insert("", ctk.END, values=row, tags=('evenrow' if index % 2 == 0 else 'oddrow',))
+                diff_label.configure(text=f"{len(rows)} change(s) from snapshot {old} to {new}")
+
+            self.start_job("Comparing snapshots", lambda job: diff_rows(self.history.diff(old, new)), compared, "Error comparing snapshots")
+
+        ctk.CTkButton(buttons, text="Open", command=open_snapshot, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE").pack(side=ctk.LEFT, padx=10)
+        ctk.CTkButton(buttons, text="Compare", command=compare, font=("MartelSans", 14), fg_color="#194F90", hover_color="#009ADE").pack(side=ctk.LEFT, padx=10)
+        for tree in (snapshot_tree, diff_tree):
+            tree.tag_configure('oddrow', background='#2e2e2e')
+            tree.tag_configure('evenrow', background='#1e1e1e')
+
+        cluster_menu.set(self.cluster_ip if self.cluster_ip in clusters else clusters[0])
+        show_snapshots(cluster_menu.get())
+
+    def show_cache_age(self, key):
+        age = self.cache.age(key) or 0
+        self.status_label.configure(text=f"Showing data loaded {int(age)} s ago (Refresh to reload)")
+
+    def show_fleet_errors(self, errors):
+        if errors:
+            failed = "\n".join(f"{host}: {error}" for host, error in errors.items())
+            self.status_label.configure(text=f"{len(errors)} cluster(s) failed")
+            self.show_message_box(f"Some clusters could not be reached:\n{failed}")
+
+    def render_node_data(self, node_data):
+        self.build_node_view()
+        self.update_node_columns(node_data["columns"])
+        for index, row in enumerate(node_data["rows"]):
+            self.node_tree.insert("", ctk.END, values=row, tags=('evenrow' if index % 2 == 0 else 'oddrow',))
+
+    def node_data_loaded(self, node_data):
+        self.render_node_data(node_data)
+        self.show_fleet_errors(node_data.get("errors"))
+
+    def render_related_data(self, table):
+        self.build_related_view()
+        if table.endpoint != self.related_endpoint:  # Another table was picked while this one loaded
+            return
+        if self.related_tree["columns"] != table.columns:
+            self.update_related_columns(table.columns)
+        self.related_table.set_rows(table.rows)
+        self.related_label.configure(text=f"{len(table.rows)} {table.name.lower()} on {table.vm_count()} VMs")
+
+    def related_data_loaded(self, table):
+        self.render_related_data(table)
+        self.show_fleet_errors(table.errors)
+
+    def render_cluster_data(self, cluster_data):
+        self.columns_cluster, rows = cluster_table(cluster_data)
+        self.update_cluster_columns(self.columns_cluster)
+        self.processed_cluster = cluster_data
+
+        # Now, display this data in the treeview
+        for index, row in enumerate(rows):
+            self.cluster_tree.insert("", ctk.END, values=row, tags=('evenrow' if index % 2 == 0 else 'oddrow',))
+
+    def begin_vm_rows(self, columns=VM_COLUMNS):
+        self.build_vm_view()
+        self.columns_vm = columns
+        self.update_vm_columns(self.columns_vm)
+
+    def append_vm_rows(self, rows):
+        self.vm_table.append_rows(rows)
+
+    # The inventory replaces whatever was streamed in while loading
+    def render_vm_data(self, inventory):
+        self.build_vm_view()
+        if inventory is self.vm_snapshot and self.vm_table.source is inventory:
+            return  # Unchanged response, already shown
+        if getattr(self, "columns_vm", None) != inventory.columns:
+            self.begin_vm_rows(inventory.columns)
+        self.vm_snapshot = inventory
+        self.show_vm_inventory(inventory)
+
+    # Swap in an edited copy of the shown inventory; the table keeps its sort, scroll and selection
+    def apply_vm_delta(self, delta):
+        inventory, changed, added, removed = delta
+        if inventory is self.vm_snapshot:
+            self.status_label.configure(text="Up to date")
+            return
+        if getattr(self, "columns_vm", None) != inventory.columns:
+            self.render_vm_data(inventory)
+            return
+        if self.search_index is not None and self.search_index.inventory is self.vm_snapshot:
+            self.search_index = self.search_index.update(inventory, changed + added)
+        self.vm_snapshot = inventory
+        self.show_vm_inventory(inventory, keep_view=True)
+        self.status_label.configure(text=f"Updated: {len(changed)} changed, {len(added)} added, {len(removed)} removed")
+
+    # Show inventory in the VM table, filtered by the search box
+    def show_vm_inventory(self, inventory, keep_view=False):
         try:
-            url = f'https://{host}/rest/v1'
-            credentials = 'Basic {0}'.format(str(base64.b64encode(bytes(f'{username}:{password}', 'utf-8')), 'utf-8'))
-            rest_opts = {
-                'Content-Type': 'application/json',
-                'Authorization': credentials,
-                'Connection': 'keep-alive'
-            }
-            
-            context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
+            vm_mask = self.search_vms(inventory)
+        except ValueError as e:
+            self.search_label.configure(text=str(e))
+            vm_mask = None
+        row_mask = None if vm_mask is None else inventory.rows_of(vm_mask)
+        self.vm_table.set_source(inventory, inventory.total_row(vm_mask), keep_view, row_mask)
+        if self.current_view == "summary":
+            self.render_summary()
 
-            connection = http.HTTPSConnection(host, timeout=30, context=context)
-            connection.request('GET', f'{url}/Registration', None, rest_opts)
-            response = connection.getresponse()
-            if response.status != 200:
-                raise Exception(f"HTTP Error {response.status}")
-            ClusterDataResult = json.loads(response.read().decode("utf-8"))
-            connection.close()
-            
-            for xml in ClusterDataResult:
-                xml_data = xml.get("clusterData")
-                if xml_data:
-                    # Parse the XML data (assuming it's a string)
-                    root = ET.fromstring(xml_data)
-                    
-                    # Assuming that the XML structure contains tags and their corresponding values
-                    cluster_data = {}
-                    for elem in root.iter():
-                        # Extract the tag name and the text (value) from each XML element
-                        tag = elem.tag
-                        value = elem.text.strip() if elem.text else "N/A"
-                        cluster_data[tag] = value
-                    
-                    self.processed_cluster.update(cluster_data)
-
-                    # Now, display this data in the treeview
-                    for tag, value in cluster_data.items():
-                        self.cluster_tree.insert("", ctk.END, values=(tag, value))
-
-            self.alternate_row_colors()
+    # Summary view: the shown inventory grouped by the checked keys. Each grouping is computed
+    # once per inventory, and auto-refresh carries it over to the next one (see with_changes).
+    def render_summary(self):
+        self.build_summary_view()
+        inventory = self.vm_snapshot
+        if inventory is None:
+            return
+        keys = [key for key, checkbox in self.summary_checkboxes.items()
+                if checkbox.get() and (key != "Cluster" or inventory.clustered)]
+        if not keys:  # At least one key
+            self.summary_checkboxes["OS"].select()
+            keys = ["OS"]
+        self.summary_keys = keys
+        columns, rows, total = summary_table(inventory, keys)
 
-        except Exception as e:
-            self.show_message_box(f"Error fetching cluster data: {str(e)}")
+        for item in self.summary_tree.get_children():
+            self.summary_tree.delete(item)
+        self.summary_tree["columns"] = columns
+        tree_font = font.nametofont("TkDefaultFont")
+        for col in columns:
+            self.summary_tree.heading(col, text=col, anchor="w")
+            width = max(tree_font.measure(col) + 40, 200 if col in SUMMARY_KEYS else 0)
+            self.summary_tree.column(col, anchor="w" if col in SUMMARY_KEYS else "e", width=width, stretch=col in SUMMARY_KEYS)
+        for index, row in enumerate(rows):
+            self.summary_tree.insert("", ctk.END, values=[export_cell(value) for value in row], tags=('evenrow' if index % 2 == 0 else 'oddrow',))
+        self.summary_tree.insert("", ctk.END, values=total, tags=('total',))
 
-    # Data fetch for VM data (VirDomain in API)
-    def fetch_vm_data(self, host, username, password):
-        host = self.cluster_ip
-        username = self.username
-        password = self.password
-        
+    # VM mask for the search box's query, or None when it is empty. Raises ValueError for a bad query.
+    def search_vms(self, inventory):
+        query = self.search_entry.get().strip()
+        if not query:
+            self.search_label.configure(text="")
+            return None
+        if self.search_index is None or self.search_index.inventory is not inventory:
+            self.search_index = SearchIndex(inventory)
+        vm_mask = self.search_index.search(query)
+        live = np.count_nonzero(inventory.values(inventory.vm, "alive"))
+        self.search_label.configure(text=f"{np.count_nonzero(vm_mask):,} of {live:,} VMs")
+        return vm_mask
+
+    # Search once typing pauses rather than on every key
+    def schedule_search(self, event=None):
+        if self.search_after:
+            self.root.after_cancel(self.search_after)
+        self.search_after = self.root.after(50, self.apply_search)
+
+    def apply_search(self):
+        self.search_after = None
+        inventory = self.vm_snapshot
+        if inventory is None or self.vm_table.source is not inventory:
+            return  # Rows are still streaming in; the query is applied when the inventory arrives
         try:
-            url = f'https://{host}/rest/v1'
-            credentials = 'Basic {0}'.format(str(base64.b64encode(bytes(f'{username}:{password}', 'utf-8')), 'utf-8'))
-            rest_opts = {
-                'Content-Type': 'application/json',
-                'Authorization': credentials,
-                'Connection': 'keep-alive'
-            }
-            
-            context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-            
-            connection = http.HTTPSConnection(host, timeout=120, context=context)
-            connection.request('GET', f'{url}/VirDomain', None, rest_opts)
-            response = connection.getresponse()
-            if response.status != 200:
-                raise Exception(f"HTTP Error {response.status}")
-            VirDomainResult = json.loads(response.read().decode("utf-8"))
-            connection.close()
-            
-            for vm in VirDomainResult:
-                memory = vm.get('mem')
-                memory = round(memory / (1024 ** 3)) if isinstance(memory, (int, float)) else "N/A"
-                vm_name = vm.get("name")
-                if vm_name not in self.processed_vms:
-                    self.processed_vms[vm_name] = {
-                        "uuid": vm.get("uuid"),
-                        "description": vm.get("description"),
-                        "os": vm.get("operatingSystem", "N/A"),
-                        "machineType": vm.get("machineType", "N/A"),
-                        "state": vm.get("state", "N/A"),
-                        "vcpus": vm.get("numVCPU", "N/A"),
-                        "memory": memory,
-                        "blocks": []
-                    }
-                
-                # Nested data collection from blockDevs
-                block_devices = vm.get("blockDevs", [])
-                if not block_devices:
-                    self.processed_vms[vm_name]["blocks"].append({
-                        "name": "N/A",
-                        "type": "N/A",
-                        "capacity": "",
-                        "allocation": "",
-                        "mountPoints": "N/A"
-                    })
-                else:
-                    for block in block_devices:
-                        self.processed_vms[vm_name]["blocks"].append({
-                            "name": f"{block.get('name', 'N/A')} ({block.get('uuid', 'N/A')})",
-                            "type": block.get("type", "N/A"),
-                            "capacity": round(float(block.get("capacity", 0)) / (1024 ** 3), 2) if block.get("capacity") else "",
-                            "allocation": round(float(block.get("allocation", 0)) / (1024 ** 3), 2) if block.get("allocation") else "",
-                            "mountPoints": block.get("mountPoints", "N/A")
-                        })
-            
-            row_index = 0
-            for vm_name, info in self.processed_vms.items():
-                first_entry = True
-                for block in info["blocks"]:
-                    if block["type"] in ["NVRAM", "IDE_CDROM", "VTPM"]:
-                        continue  
-                    item_id = self.vm_tree.insert("", ctk.END, values=(
-                        vm_name, 
-                        info["uuid"] if first_entry else "",  
-                        info["description"] if first_entry else "",
-                        info["os"] if first_entry else "",
-                        info["machineType"] if first_entry else "",
-                        info["state"] if first_entry else "",
-                        info["vcpus"] if first_entry else "",
-                        info["memory"] if first_entry else "",
-                        block["name"], 
-                        block["type"], 
-                        block["capacity"], 
-                        block["allocation"],
-                        block["mountPoints"]
-                    ))
-                    tag = 'evenrow' if row_index % 2 == 0 else 'oddrow'
-                    self.vm_tree.item(item_id, tags=(tag,))
-                    row_index += 1
-                    first_entry = False
+            vm_mask = self.search_vms(inventory)
+        except ValueError as e:
+            self.search_label.configure(text=str(e))
+            return
+        row_mask = None if vm_mask is None else inventory.rows_of(vm_mask)
+        self.vm_table.set_filter(row_mask, inventory.total_row(vm_mask))
 
-        except Exception as e:
-            self.show_message_box(f"Error fetching VM data: {str(e)}")
-
-        # Total calculations
-        total_vcpus = 0
-        total_memory = 0
-        total_capacity = 0
-        total_allocation = 0
-
-        for vm_name, info in self.processed_vms.items():
-            vcpus = str(info["vcpus"])
-            total_vcpus += int(info["vcpus"]) if str(info["vcpus"]).isdigit() else 0
-            total_memory += int(info["memory"]) if str(info["memory"]).isdigit() else 0
-            
-            for block in info["blocks"]:
-                total_capacity += float(block["capacity"]) if block["capacity"] else 0
-                total_allocation += float(block["allocation"]) if block["allocation"] else 0
-
-        self.vm_tree.insert("", ctk.END, values=(
-            "TOTAL", "", "", "", "", "", 
-            total_vcpus, total_memory, 
-            "", "", 
-            round(total_capacity, 2), 
-            round(total_allocation, 2),
-            ""
-        ), tags=('total'))
+    def refresh_vm_delta(self):
+        previous = self.vm_snapshot
+        if previous is None:
+            self.refresh_data()
+            return
+        key = self.snapshot_key("/VirDomain")
+        self.cache.invalidate(None if self.cluster_list else self.cluster_ip, "/VirDomain")
+        self.drop_fetches()
 
-        self.vm_tree.tag_configure('total', background='#194F90', foreground='white', font=("MartelSans", 14))
-        self.vm_tree.tag_configure('separator', background='#2e2e2e')
+        def work(job):
+            fresh = self.load_snapshot("/VirDomain", job)
+            if fresh is previous:  # Unchanged response
+                return previous, [], [], []
+            changed, added, removed = previous.diff(fresh)
+            if not changed + added + removed:  # Unchanged since the last delta, which made previous a copy of fresh
+                return previous, [], [], []
+            return previous.with_changes(fresh, changed + added + removed), changed, added, removed
+
+        self.start_job("Refreshing VM data", work, self.apply_vm_delta, "Error refreshing VM data", key)
+
+    # Double-click a VM row to re-fetch just that VM
+    def refresh_selected_vm(self, event=None):
+        previous = self.vm_snapshot
+        index = self.vm_table.selected_row_index()
+        if previous is None or index is None:
+            return
+        uuid, host = previous.vm_at_row(index)
+        target = next((target for target in self.cluster_targets() if target[0] == (host or self.cluster_ip)), None)
+        if target is None:
+            return
+
+        key = self.snapshot_key("/VirDomain")
+        client = HyperCoreClient.for_host(*target)
+
+        def work(job):
+            records = fetch_vms_by_uuid(client, [uuid], job)
+            source = VMInventory.from_records([record for record in records.values() if record], host)
+            inventory = previous.with_changes(source, [uuid])
+            self.cache.put(key, inventory)
+            found = uuid in source.index
+            return inventory, [uuid] if found else [], [], [] if found else [uuid]
 
-    # Export to Excel function
+        self.start_job("Refreshing VM", work, self.apply_vm_delta, "Error refreshing VM")
+
+    def vm_data_loaded(self, snapshot):
+        self.render_vm_data(snapshot)
+        self.show_fleet_errors(snapshot.errors)
+
+    # Export to Excel function; writes the loaded snapshot unless it has expired
     def export(self):
-        self.fetch_data(view_type="vm")
-        self.fetch_data(view_type="cluster")
+        targets = self.cluster_targets()
+        if not targets or not all(username and password for host, username, password in targets):
+            self.open_settings("vm")
+            return
+
+        endpoints = ("/VirDomain", "/Registration") + (tuple(RELATED_TABLES) if self.export_related else ())
+
+        def work(job):
+            results = load_snapshots(targets, endpoints, job, self.cache, bool(self.cluster_list), self.history)
+            for endpoint in endpoints:
+                self.saved.pop(endpoint, None)  # Fresh data from here on
+            return results
+
+        self.start_job("Fetching data for export", work, self.choose_export_path, "Error fetching data")
 
-        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx"), ("All Files", "*.*")])
+    def choose_export_path(self, results):
+        vm_snapshot, cluster_data, *related = results
+        self.render_vm_data(vm_snapshot)
+        self.render_cluster_data(cluster_data)
+
+        file_path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel files", "*.xlsx"), ("CSV files", "*.csv"), ("JSON Lines files", "*.jsonl"), ("Parquet files", "*.parquet"), ("All Files", "*.*")])
         if not file_path:
             return
 
-        # Prepare VM data
-        vm_data = []
-        total_vcpus = 0
-        total_memory = 0
-        total_capacity = 0
-        total_allocation = 0
-
-        for vm_name, info in self.processed_vms.items():
-            for block in info["blocks"]:
-                vm_data.append([
-                    vm_name, 
-                    info["uuid"], 
-                    info["description"], 
-                    info["os"], 
-                    info["machineType"], 
-                    info["state"], 
-                    info["vcpus"], 
-                    info["memory"], 
-                    block["name"], 
-                    block["type"], 
-                    block["capacity"], 
-                    block["allocation"],
-                    block["mountPoints"]
-                ])
-
-            # Summing up values for the total line and float conversion
-            total_vcpus += int(info["vcpus"]) if info["vcpus"] else 0
-            total_memory += float(info["memory"]) if info["memory"] else 0
-            total_capacity += float(block["capacity"]) if block["capacity"] else 0
-            total_allocation += float(block["allocation"]) if block["allocation"] else 0
-
-        # Append the total row
-        vm_data.append([
-            "TOTAL", "", "", "", "", "",
-            total_vcpus, 
-            total_memory, 
-            "", "",  
-            total_capacity, 
-            total_allocation,
-            ""
-        ])
-
-        vm_columns = ["Name", "UUID", "Description", "OS", "Machine Type", "State", 
-                    "vCPUs", "Memory (GiB)", "Block Device", "Device Type", "Capacity (GiB)", 
-                    "Allocation (GiB)", "Mount Points"]
-
-        # Prepare Cluster Data
-        cluster_data = []
-        for tag, value in self.processed_cluster.items():
-            cluster_data.append([tag, value])
-
-        cluster_columns = ["Tag", "Value"]
-
-        # Write to Excel
-        with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-            workbook = writer.book
-        # Write Cluster sheet
-            if cluster_data:
-                df_cluster = pd.DataFrame(cluster_data, columns=cluster_columns)
-                df_cluster.to_excel(writer, sheet_name="Cluster", index=False)
-                worksheet_cluster = writer.sheets["Cluster"]
-
-                # Auto-adjust column width for Cluster sheet
-                for i, col in enumerate(cluster_columns):
-                    max_length = max(df_cluster[col].astype(str).apply(len).max(), len(col)) + 2
-                    worksheet_cluster.set_column(i, i, max_length)
-
-            # Write Virtual Machines sheet
-            if vm_data:
-                df_vm = pd.DataFrame(vm_data, columns=vm_columns)
-                df_vm.to_excel(writer, sheet_name="Virtual Machines", index=False)
-                worksheet_vm = writer.sheets["Virtual Machines"]
-
-                # Auto-adjust column width for Virtual Machines sheet
-                for i, col in enumerate(vm_columns):
-                    max_length = max(df_vm[col].astype(str).apply(len).max(), len(col)) + 2
-                    worksheet_vm.set_column(i, i, max_length)
-
-                # Apply formatting to the total row
-                workbook = writer.book
-                worksheet = writer.sheets["Virtual Machines"]
-                bold_format = workbook.add_format({"bold": True})
-
-                # Find the total row number
-                total_row = len(df_vm) 
-
-                # Apply bold formatting to the total row
-                for col_num in range(len(vm_columns)):  
-                    worksheet.write(total_row, col_num, df_vm.iloc[-1, col_num], bold_format)
-
-        self.show_message_box("Successfully exported!")
+        collector = self.collector
+        self.start_job("Exporting", lambda job: export_inventory(file_path, vm_snapshot, cluster_data, collector, job, related),
+                       lambda _: self.show_message_box("Successfully exported!"), "Error exporting")
 
-if __name__ == "__main__":
+# Create the main window, timing each step of startup up to the first idle moment after the
+# window is drawn; the result is the first entry in the Metrics panel
+def open_window():
+    metrics = Metrics("Startup")
+    metrics.start = STARTED
+    metrics.add("import", time.perf_counter() - STARTED)
+    metrics.timed("toolkit import", import_gui)()
+    start = time.perf_counter()
     root = ctk.CTk()
     app = ClusterApp(root)
-    root.mainloop()
\ No newline at end of file
+    metrics.add("window", time.perf_counter() - start)
+    start = time.perf_counter()
+
+    def first_idle():
+        metrics.add("first paint", time.perf_counter() - start)
+        app.startup_metrics = metrics.finish()
+        app.record_metrics(metrics)
+
+    root.after_idle(first_idle)
+    return root, app
+
+# List a cluster's saved snapshots, or print the changes between two of them
+def history_command(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="HyperCoreDataViewer history", description="List or compare saved VM snapshots.")
+    parser.add_argument("--host", help="cluster to list (default: every cluster with snapshots)")
+    parser.add_argument("--diff", nargs=2, type=int, metavar=("OLD", "NEW"), help="print the changes between two snapshots")
+    args = parser.parse_args(argv)
+
+    history = HistoryStore(history_path())
+    if args.diff:
+        try:
+            rows = diff_rows(history.diff(*args.diff))
+        except ValueError as e:
+            print(f"Error comparing snapshots: {str(e)}", file=sys.stderr)
+            return 1
+        for row in rows:
+            print("\t".join(str(value) for value in row))
+        print(f"{len(rows)} change(s)")
+        return 0
+    for cluster in [args.host] if args.host else history.clusters():
+        print(cluster)
+        for snapshot, taken, records, changed in history.snapshots(cluster):
+            print(f"  {snapshot:>6}  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(taken))}  {records:>7} VMs  {changed:>6} changed")
+    return 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["export"]:
+        return export_command(argv[1:])
+    if argv[:1] == ["history"]:
+        return history_command(argv[1:])
+    root, app = open_window()
+    root.mainloop()
+    return 0
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # The worker process of a bundled app starts the bundle itself
+    sys.exit(main())
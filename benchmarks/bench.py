@@ -0,0 +1,234 @@
+"""
+bench.py: Times each stage of loading and exporting VM data against the
+          mock HyperCore server (or a real cluster) and writes the
+          results as JSON, optionally comparing them with a baseline.
+
+    python benchmarks/bench.py --vms 20000 --max-blocks 6 --out results.json
+    python benchmarks/bench.py --vms 20000 --max-blocks 6 --baseline results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import HyperCoreDataViewer as viewer
+from mock_server import add_cluster_arguments
+
+STAGES = ("module_import", "first_window", "connect", "download", "json_decode", "stream_parse", "model_build", "fetch_total",
+          "refetch", "tree_render", "sort", "export_xlsx", "export_csv")
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+def chunks(data, size=65536):
+    for offset in range(0, len(data), size):
+        yield data[offset:offset + size]
+
+# Fresh interpreters, so nothing is already imported: module import alone, and the app's own
+# startup metrics up to the first idle moment after the window is drawn (needs a display)
+IMPORT_SCRIPT = "import time; t = time.perf_counter(); import HyperCoreDataViewer; print(time.perf_counter() - t)"
+WINDOW_SCRIPT = """
+import HyperCoreDataViewer as viewer
+root, app = viewer.open_window()
+def check():
+    if app.startup_metrics:
+        print(app.startup_metrics.seconds)
+        root.destroy()
+    else:
+        root.after(10, check)
+root.after(10, check)
+root.mainloop()
+"""
+
+def run_script(script):
+    result = subprocess.run([sys.executable, "-c", script], cwd=REPO, capture_output=True, text=True, timeout=60)
+    if result.returncode:
+        return None, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit status {result.returncode}"
+    return float(result.stdout.split()[-1]), None
+
+# Tk is optional here: without a display the render stage is reported as skipped
+def make_table():
+    try:
+        import tkinter
+        from tkinter import ttk
+        viewer.import_gui()
+        root = tkinter.Tk()
+    except Exception as e:
+        return None, None, str(e)
+    root.geometry("1600x900")
+    scrollbar = ttk.Scrollbar(root)
+    table = viewer.VirtualTable(root, scrollbar, columns=viewer.VM_COLUMNS)
+    table.tree.pack(fill="both", expand=True)
+    root.update()
+    return root, table, None
+
+def run_once(host, username, password, workdir, table_root, table):
+    job = viewer.FetchJob(None, "Benchmark")
+    times = {}
+    counts = {}
+
+    times["module_import"], _ = run_script(IMPORT_SCRIPT)
+    if table is not None:
+        first_window, _ = run_script(WINDOW_SCRIPT)
+        if first_window is not None:
+            times["first_window"] = first_window
+
+    client = viewer.HyperCoreClient(host, username, password)
+    viewer.HyperCoreClient._tls_sessions.clear()  # Time a full handshake
+    times["connect"], _ = timed(client.login, job)
+    download = viewer.FetchJob(None, "Benchmark download")
+    download.metrics = viewer.Metrics("download")  # For the bytes on the wire when the body is compressed
+    times["download"], body = timed(client.get, "/VirDomain", 300, download)
+    counts["bytes"] = len(body)
+    counts["wire_bytes"] = download.metrics.transfers[host][0]
+    times["json_decode"], _ = timed(json.loads, body)
+    times["stream_parse"], records = timed(lambda data: list(viewer.stream_json_array(chunks(data), viewer.project_vm)), body)
+    times["model_build"], inventory = timed(viewer.VMInventory.from_records, records)
+    counts["vms"] = inventory.vm_count()
+    counts["block_rows"] = len(inventory)
+    del body, records
+    times["fetch_total"], _ = timed(lambda: viewer.VMInventory.from_records(
+        viewer.stream_json_array(client.stream("/VirDomain", 300, job), viewer.project_vm)))
+
+    # Fetch again through the response cache: a 304 revalidation, or with --no-validators a full
+    # download that is hashed and found unchanged
+    viewer.HyperCoreClient.response_cache = viewer.ResponseCache()
+    viewer.fetch_vm_data(client, job)
+    times["refetch"], _ = timed(viewer.fetch_vm_data, client, job)
+
+    if table is not None:
+        def render():
+            table.set_source(inventory, inventory.total_row())
+            table.refresh()
+            table_root.update_idletasks()
+        times["tree_render"], _ = timed(render)
+
+    def sort_all():
+        inventory._sort_keys.clear()
+        for column in range(len(inventory.columns)):
+            inventory.sorted_indexes(column)
+    times["sort"], _ = timed(sort_all)
+
+    cluster_data = {"clusterName": "mock-cluster"}
+    for ext in ("xlsx", "csv"):
+        times[f"export_{ext}"], _ = timed(viewer.export_inventory, os.path.join(workdir, f"export.{ext}"), inventory, cluster_data)
+    client.close()
+    return times, counts
+
+def summarize(runs):
+    summary = {}
+    for stage in STAGES:
+        values = [run[stage] for run in runs if stage in run]
+        if values:
+            summary[stage] = {"median": statistics.median(values), "min": min(values), "max": max(values), "runs": values}
+        else:
+            summary[stage] = {"skipped": True}
+    return summary
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 ** 2 if sys.platform == "darwin" else rss / 1024  # Bytes on macOS, KiB elsewhere
+
+# Stages slower than the baseline median by more than tolerance are regressions
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"{'stage':<14}{'baseline':>12}{'current':>12}{'change':>10}")
+    for stage in STAGES:
+        old = baseline["stages"].get(stage, {}).get("median")
+        new = results["stages"].get(stage, {}).get("median")
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        flag = "  REGRESSION" if change > tolerance else ""
+        print(f"{stage:<14}{old:>11.3f}s{new:>11.3f}s{change:>+9.0%}{flag}")
+        if flag:
+            regressions.append(stage)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="HyperCore Data Viewer benchmarks")
+    add_cluster_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage (default 3)")
+    parser.add_argument("--host", help="benchmark an existing server or cluster instead of starting the mock")
+    parser.add_argument("--username", default=os.environ.get("HYPERCORE_USERNAME", "admin"))
+    parser.add_argument("--password", default=os.environ.get("HYPERCORE_PASSWORD", "admin"))
+    parser.add_argument("--out", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier results to compare against; exits 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline (default 0.2)")
+    parser.add_argument("--no-render", action="store_true", help="skip the Tk tree render stage")
+    args = parser.parse_args()
+
+    server = None
+    host = args.host
+    if not host:
+        # The mock runs in a child process so serving doesn't compete with the stages for the GIL
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock_server.py"), "--port", "0",
+                   "--vms", str(args.vms), "--min-blocks", str(args.min_blocks), "--max-blocks", str(args.max_blocks),
+                   "--nodes", str(args.nodes), "--seed", str(args.seed), "--latency-ms", str(args.latency_ms),
+                   "--bandwidth-mbps", str(args.bandwidth_mbps)]
+        command += ["--no-compression"] if args.no_compression else []
+        command += ["--no-validators"] if args.no_validators else []
+        server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        host = server.stdout.readline().strip().rsplit("//", 1)[-1]
+
+    table_root, table, render_error = (None, None, "disabled") if args.no_render else make_table()
+    runs = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="hypercore-bench-") as workdir:
+            for _ in range(args.repeat):
+                times, counts = run_once(host, args.username, args.password, workdir, table_root, table)
+                runs.append(times)
+    finally:
+        if server:
+            server.terminate()
+        if table_root:
+            table_root.destroy()
+
+    results = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("password", "out", "baseline")},
+        "counts": counts,
+        "max_rss_mb": max_rss_mb(),
+        "tree_render": render_error,
+        "stages": summarize(runs),
+    }
+    text = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    elif not args.baseline:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+mock_server.py: A local stand-in for the SC//HyperCore REST API, serving
+                synthetic /Registration, /VirDomain, /Node,
+                /VirDomainStats, /VirDomainSnapshot,
+                /VirDomainReplication and /VirDomainNetDevice data
+                over HTTPS for benchmarks and testing without a
+                real cluster.
+
+    python benchmarks/mock_server.py --vms 5000 --max-blocks 8 --latency-ms 20 --bandwidth-mbps 100
+"""
+
+import argparse
+import gzip
+import hashlib
+import http.server
+import json
+import os
+import random
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+OPERATING_SYSTEMS = ("os_other", "os_windows_server_2019", "os_windows_server_2022", "os_linux")
+MACHINE_TYPES = ("scale-7.2", "scale-8.10", "scale-uefi-9.3", "scale-bios-9.3")
+STATES = ("RUNNING", "RUNNING", "RUNNING", "SHUTOFF", "PAUSED")
+BLOCK_TYPES = ("VIRTIO_DISK", "VIRTIO_DISK", "VIRTIO_DISK", "IDE_DISK", "SCSI_DISK", "IDE_CDROM", "NVRAM", "VTPM")
+
+# Deterministic synthetic cluster; the JSON bodies are encoded (and gzipped) once and served from memory
+class MockCluster:
+    def __init__(self, vms=1000, min_blocks=1, max_blocks=4, nodes=3, seed=1):
+        self.vms = vms
+        self.min_blocks = min_blocks
+        self.max_blocks = max_blocks
+        self.nodes = nodes
+        self.seed = seed
+        self.bodies = {}
+        self.gzipped = {}
+        self.lock = threading.Lock()
+
+    def make_uuid(self, rng):
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    def node_records(self):
+        rng = random.Random(self.seed)
+        return [{
+            "uuid": self.make_uuid(rng),
+            "peerID": peer + 1,
+            "lanIP": f"10.0.0.{peer + 11}",
+            "backplaneIP": f"169.254.1.{peer + 11}",
+            "numCores": 32,
+            "numThreads": 64,
+            "cpuUsage": round(rng.uniform(5, 80), 2),
+            "memSize": 512 * 1024 ** 3,
+            "totalMemUsageBytes": rng.randint(64, 480) * 1024 ** 3,
+            "capacity": 40 * 1024 ** 4,
+            "networkStatus": "ONLINE",
+            "virtualizationOnline": True,
+        } for peer in range(self.nodes)]
+
+    def vm_records(self):
+        nodes = [node["uuid"] for node in self.node_records()]
+        rng = random.Random(self.seed + 1)
+        records = []
+        for i in range(self.vms):
+            vm_uuid = self.make_uuid(rng)
+            blocks = []
+            for slot in range(rng.randint(self.min_blocks, self.max_blocks)):
+                capacity = rng.choice((20, 50, 100, 250, 500, 1000)) * 1024 ** 3
+                blocks.append({
+                    "uuid": self.make_uuid(rng),
+                    "virDomainUUID": vm_uuid,
+                    "type": BLOCK_TYPES[0] if slot == 0 else rng.choice(BLOCK_TYPES),
+                    "cacheMode": "WRITETHROUGH",
+                    "capacity": capacity,
+                    "allocation": int(capacity * rng.random()),
+                    "physical": 0,
+                    "shareUUID": "",
+                    "path": f"scribe/{self.make_uuid(rng)}",
+                    "slot": slot,
+                    "name": f"disk{slot}",
+                    "disableSnapshotting": False,
+                    "tieringPriorityFactor": 8,
+                    "mountPoints": rng.choice(([], ["/"], ["/", "/boot"], ["C:\\"])),
+                    "createdTimestamp": 1700000000 + i,
+                    "readOnly": False,
+                })
+            records.append({
+                "uuid": vm_uuid,
+                "nodeUUID": rng.choice(nodes),
+                "name": f"vm-{i:05d}",
+                "description": rng.choice(("", "", "Production", "Test VM", "Imported from template")),
+                "operatingSystem": rng.choice(OPERATING_SYSTEMS),
+                "state": rng.choice(STATES),
+                "desiredDisposition": "RUNNING",
+                "console": {"type": "VNC", "ip": "10.0.0.11", "port": 5900 + i % 1000, "password": ""},
+                "mem": rng.choice((2, 4, 8, 16, 32, 64)) * 1024 ** 3,
+                "numVCPU": rng.choice((1, 2, 4, 8, 16)),
+                "blockDevs": blocks,
+                "netDevs": [{"uuid": self.make_uuid(rng), "virDomainUUID": vm_uuid, "vlan": 0, "type": "VIRTIO",
+                             "macAddress": "7C:4C:58:%02X:%02X:%02X" % (i >> 16 & 255, i >> 8 & 255, i & 255),
+                             "connected": True, "ipv4Addresses": []}],
+                "stats": [],
+                "created": 1700000000 + i,
+                "modified": 1700000000 + i,
+                "latestTaskTag": {"taskTag": str(i), "progressPercent": 100, "state": "COMPLETE"},
+                "tags": rng.choice(("", "prod", "prod,web", "dev")),
+                "bootDevices": [blocks[0]["uuid"]] if blocks else [],
+                "uiState": "RUNNING",
+                "snapUUIDs": [],
+                "machineType": rng.choice(MACHINE_TYPES),
+                "cpuType": "clusterBaseline-7.3",
+                "snapshotSchedule": "",
+                "replicationUUIDs": [],
+                "sourceVirDomainUUID": "",
+                "snapshotSerialNumber": 0,
+            })
+        return records
+
+    def stats_records(self, vm_records):
+        rng = random.Random(int(time.time()))
+        return [{
+            "uuid": vm["uuid"],
+            "cpuUsage": round(rng.uniform(0, 100), 2) if vm["state"] == "RUNNING" else 0,
+            "rxBitRate": rng.randint(0, 10 ** 8),
+            "txBitRate": rng.randint(0, 10 ** 8),
+            "vsdStats": [{"uuid": block["uuid"], "rates": [{"readKibibytes": rng.randint(0, 50000), "writeKibibytes": rng.randint(0, 50000),
+                                                              "millisecondsRead": 1, "millisecondsWrite": 1}]} for block in vm["blockDevs"]],
+        } for vm in vm_records]
+
+    # 0 to 3 snapshots per VM
+    def snapshot_records(self, vm_records):
+        rng = random.Random(self.seed + 2)
+        records = []
+        for vm in vm_records:
+            for n in range(rng.randint(0, 3)):
+                taken = 1700000000 + rng.randint(0, 10 ** 7)
+                records.append({
+                    "uuid": self.make_uuid(rng),
+                    "domainUUID": vm["uuid"],
+                    "label": f"{vm['name']}-snap{n}",
+                    "type": rng.choice(("USER", "AUTOMATED", "SUPPORT")),
+                    "timestamp": taken,
+                    "automatedTriggerTimestamp": 0,
+                    "localRetainUntilTimestamp": taken + 7 * 86400,
+                    "remoteRetainUntilTimestamp": 0,
+                    "blockCountDiff": rng.randint(0, 10 ** 6),
+                })
+        return records
+
+    # Every tenth VM is replicated
+    def replication_records(self, vm_records):
+        rng = random.Random(self.seed + 3)
+        connection = self.make_uuid(rng)
+        return [{
+            "uuid": self.make_uuid(rng),
+            "sourceDomainUUID": vm["uuid"],
+            "connectionUUID": connection,
+            "label": vm["name"],
+            "enable": rng.random() < 0.9,
+            "progress": {"percentComplete": rng.choice((100, 100, 100, rng.randint(0, 99)))},
+        } for vm in vm_records[::10]]
+
+    def net_device_records(self, vm_records):
+        return [device for vm in vm_records for device in vm["netDevs"]]
+
+    def registration(self):
+        xml = ("<clusterData><clusterName>mock-cluster</clusterName><clusterUUID>{}</clusterUUID>"
+               "<icosVersion>9.4.30.217736</icosVersion><nodeCount>{}</nodeCount><vmCount>{}</vmCount>"
+               "<contactName>Benchmark</contactName></clusterData>").format(self.make_uuid(random.Random(self.seed)), self.nodes, self.vms)
+        return [{"clusterData": xml, "companyName": "Mock", "contact": "", "phone": "", "email": ""}]
+
+    def body(self, endpoint):
+        with self.lock:
+            if endpoint not in self.bodies:
+                if endpoint == "/VirDomain" or (endpoint.startswith("/VirDomain") and not hasattr(self, "records")):
+                    self.records = self.vm_records()
+                    self.by_uuid = {vm["uuid"]: vm for vm in self.records}
+                if endpoint == "/VirDomain":
+                    data = self.records
+                elif endpoint == "/VirDomainSnapshot":
+                    data = self.snapshot_records(self.records)
+                elif endpoint == "/VirDomainReplication":
+                    data = self.replication_records(self.records)
+                elif endpoint == "/VirDomainNetDevice":
+                    data = self.net_device_records(self.records)
+                elif endpoint == "/Node":
+                    data = self.node_records()
+                elif endpoint == "/Registration":
+                    data = self.registration()
+                else:
+                    return None
+                self.bodies[endpoint] = json.dumps(data).encode("utf-8")
+            return self.bodies[endpoint]
+
+    def gzipped_body(self, endpoint):
+        body = self.body(endpoint)
+        with self.lock:
+            if body is not None and endpoint not in self.gzipped:
+                self.gzipped[endpoint] = gzip.compress(body, 6)
+            return self.gzipped.get(endpoint)
+
+    # Strong validator of an endpoint's body
+    def etag(self, endpoint):
+        return '"{}"'.format(hashlib.sha1(self.body(endpoint)).hexdigest()[:20])
+
+    def vm(self, vm_uuid):
+        self.body("/VirDomain")
+        return self.by_uuid.get(vm_uuid)
+
+    def stats(self):
+        self.body("/VirDomain")
+        return json.dumps(self.stats_records(self.records)).encode("utf-8")
+
+class MockHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+    def log_message(self, format, *args):
+        pass
+
+    # gzipped when the client accepts it, unless the server was started with compression off
+    def send_body(self, status, body, gzipped=None, etag=None):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        compress = server.compression and "gzip" in self.headers.get("Accept-Encoding", "") and len(body) > 1024
+        if compress:
+            body = gzipped or gzip.compress(body, 6)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if compress:
+            self.send_header("Content-Encoding", "gzip")
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        # Throttle to the configured bandwidth by pacing 64 KB writes
+        start = time.perf_counter()
+        for offset in range(0, len(body), 65536):
+            self.wfile.write(body[offset:offset + 65536])
+            if server.bandwidth:
+                delay = (offset + 65536) / server.bandwidth - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+
+    def endpoint(self):
+        path = urlsplit(self.path).path
+        return path[len("/rest/v1"):] if path.startswith("/rest/v1") else path
+
+    def authorized(self):
+        cookie = self.headers.get("Cookie", "")
+        return f"sessionID={self.server.session_id}" in cookie or self.headers.get("Authorization", "").startswith("Basic ")
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        endpoint = self.endpoint()
+        if endpoint == "/login":
+            self.server.logins += 1
+            self.send_body(200, json.dumps({"sessionID": self.server.session_id}).encode("utf-8"))
+        elif endpoint == "/logout":
+            self.send_body(200, b"{}")
+        else:
+            self.send_body(404, b"[]")
+
+    def do_GET(self):
+        if not self.authorized():
+            self.send_body(401, b"[]")
+            return
+        cluster = self.server.cluster
+        endpoint = self.endpoint()
+        if endpoint.startswith("/VirDomain/"):
+            vm = cluster.vm(endpoint.rsplit("/", 1)[1])
+            self.send_body(200 if vm else 404, json.dumps([vm] if vm else []).encode("utf-8"))
+        elif endpoint == "/VirDomainStats":
+            self.send_body(200, cluster.stats())
+        else:
+            body = cluster.body(endpoint)
+            etag = cluster.etag(endpoint) if body is not None and self.server.validators else None
+            if body is None:
+                self.send_body(404, b"[]")
+            elif etag and self.headers.get("If-None-Match") == etag:
+                self.server.not_modified += 1
+                self.send_body(304, b"", etag=etag)
+            else:
+                self.send_body(200, body, cluster.gzipped_body(endpoint) if self.server.compression else None, etag)
+
+# Self-signed certificate for localhost, made with the openssl command line tool
+def make_certificate(directory):
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+                    "-days", "30", "-subj", "/CN=localhost"], check=True, capture_output=True)
+    return cert, key
+
+def serve(cluster, host="127.0.0.1", port=0, latency_ms=0, bandwidth_mbps=0, cert=None, key=None, compression=True, validators=True):
+    if not cert:
+        cert, key = make_certificate(tempfile.mkdtemp(prefix="hypercore-mock-"))
+    server = http.server.ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    server.cluster = cluster
+    server.latency = latency_ms / 1000
+    server.bandwidth = bandwidth_mbps * 1e6 / 8  # Bytes per second
+    server.compression = compression
+    server.validators = validators
+    server.not_modified = 0
+    server.session_id = uuid.uuid4().hex
+    server.logins = 0
+    return server
+
+def add_cluster_arguments(parser):
+    parser.add_argument("--vms", type=int, default=1000, help="number of VMs (default 1000)")
+    parser.add_argument("--min-blocks", type=int, default=1, help="fewest block devices per VM (default 1)")
+    parser.add_argument("--max-blocks", type=int, default=4, help="most block devices per VM (default 4)")
+    parser.add_argument("--nodes", type=int, default=3, help="number of nodes (default 3)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the synthetic data")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay added before every response")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0, help="response bandwidth limit in Mbit/s (0 = unlimited)")
+    parser.add_argument("--no-compression", action="store_true", help="never gzip responses, like a server without compression")
+    parser.add_argument("--no-validators", action="store_true", help="send no ETag and never answer 304 Not Modified")
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock SC//HyperCore API server")
+    add_cluster_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8443, help="port to listen on (0 picks a free one)")
+    parser.add_argument("--cert", help="PEM certificate (default: generate a self-signed one)")
+    parser.add_argument("--key", help="PEM private key for --cert")
+    args = parser.parse_args()
+
+    cluster = MockCluster(args.vms, args.min_blocks, args.max_blocks, args.nodes, args.seed)
+    for endpoint in ("/VirDomain", "/Node", "/Registration"):
+        cluster.body(endpoint)  # Encode up front so the first request isn't slower than the rest
+        if not args.no_compression:
+            cluster.gzipped_body(endpoint)
+    server = serve(cluster, args.host, args.port, args.latency_ms, args.bandwidth_mbps, args.cert, args.key,
+                   not args.no_compression, not args.no_validators)
+    print(f"Listening on https://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
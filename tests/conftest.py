@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+sys.path.insert(0, os.path.join(REPO, "benchmarks"))
+
+from mock_server import MockCluster
+
+
+# Projected /VirDomain records of a small synthetic cluster
+@pytest.fixture(scope="session")
+def vm_records():
+    import HyperCoreDataViewer as viewer
+
+    return [viewer.project_vm(record) for record in MockCluster(600, 0, 5, seed=7).vm_records()]
+
+
+# Copy of records with some VMs edited, some removed and a few added
+def edited(records, seed=3):
+    import copy
+    import random
+
+    rng = random.Random(seed)
+    records = copy.deepcopy(records)
+    for vm in rng.sample(records, 8):
+        vm["state"] = rng.choice(("RUNNING", "SHUTOFF", "PAUSED"))
+        vm["name"] = vm["name"] + "-renamed"
+        vm["mem"] = rng.choice((4, 128)) * 1024 ** 3
+    for vm in rng.sample(records, 4):
+        if vm["blockDevs"]:
+            vm["blockDevs"][0]["capacity"] *= 3
+            vm["blockDevs"].append(dict(vm["blockDevs"][0], uuid=vm["uuid"] + "-extra", type="SCSI_DISK"))
+    for vm in rng.sample(records, 5):
+        records.remove(vm)
+    for i in range(3):
+        records.append({"uuid": f"00000000-new-{seed}-{i}", "name": f"fresh-{seed}-{i}", "state": "RUNNING", "numVCPU": 2,
+                        "mem": 8 * 1024 ** 3, "operatingSystem": "os_new", "machineType": "scale-9.9",
+                        "blockDevs": [{"uuid": f"block-new-{seed}-{i}", "name": "disk0", "type": "VIRTIO_DISK",
+                                       "capacity": 40 * 1024 ** 3, "allocation": 0, "mountPoints": ["/data"]}]})
+    return records
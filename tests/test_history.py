@@ -0,0 +1,115 @@
+import copy
+import itertools
+import json
+
+import pytest
+
+import HyperCoreDataViewer as viewer
+from conftest import edited
+
+
+def save(store, cluster, records, taken):
+    recorder = store.recorder(cluster, "/VirDomain")
+    recorder.taken = taken
+    for record in records:
+        recorder.add(record["uuid"], record)
+    return recorder.commit()
+
+
+# The diff worked out from the two full snapshots, in a comparable form
+def brute_force_diff(old, new):
+    return {
+        "added": sorted(json.dumps(new[key], sort_keys=True) for key in new.keys() - old.keys()),
+        "removed": sorted(json.dumps(old[key], sort_keys=True) for key in old.keys() - new.keys()),
+        "changed": sorted((json.dumps(old[key], sort_keys=True), json.dumps(new[key], sort_keys=True))
+                          for key in old.keys() & new.keys() if old[key] != new[key]),
+    }
+
+
+def comparable(diff):
+    return {
+        "added": sorted(json.dumps(record, sort_keys=True) for record in diff["added"]),
+        "removed": sorted(json.dumps(record, sort_keys=True) for record in diff["removed"]),
+        "changed": sorted((json.dumps(old, sort_keys=True), json.dumps(new, sort_keys=True)) for old, new in diff["changed"]),
+    }
+
+
+# Snapshot id -> {uuid: record} for a run of edited snapshots, including an unchanged one and
+# VMs that go back to an earlier version
+@pytest.fixture
+def history(tmp_path, vm_records):
+    store = viewer.HistoryStore(str(tmp_path / "history.sqlite3"))
+    versions = [vm_records[:200]]
+    for seed in range(4):
+        versions.append(edited(versions[-1], seed))
+    versions.append(versions[-1])
+    reverted = copy.deepcopy(versions[-1])
+    for record in reverted[:10]:
+        record.update(next((old for old in versions[0] if old["uuid"] == record["uuid"]), record))
+    versions.append(reverted)
+    states = {}
+    for taken, records in enumerate(versions):
+        states[save(store, "a", records, taken)] = {record["uuid"]: record for record in records}
+    return store, states
+
+
+def test_load_returns_each_snapshot(history):
+    store, states = history
+    for snapshot, records in states.items():
+        assert store.load(snapshot) == records
+
+
+def test_diff_matches_brute_force(history):
+    store, states = history
+    for old, new in itertools.combinations(states, 2):
+        expected = brute_force_diff(states[old], states[new])
+        assert comparable(store.diff(old, new)) == expected
+        assert comparable(store.diff(new, old)) == expected
+    unchanged = list(states)[-2]
+    assert store.snapshots("a")[1][3] == 0  # (snapshot, taken, records, changed), newest first
+    assert store.diff(unchanged - 1, unchanged) == {"added": [], "removed": [], "changed": []}
+
+
+def test_clusters_are_kept_apart(history, vm_records):
+    store, states = history
+    other = save(store, "b", vm_records[300:350], 100)
+    assert store.clusters() == ["a", "b"]
+    assert store.latest() == ("b", other, 100)
+    assert store.latest(cluster="a")[1] == max(states)
+    assert store.load(other) == {record["uuid"]: record for record in vm_records[300:350]}
+    assert store.load(max(states)) == states[max(states)]
+    with pytest.raises(ValueError):
+        store.diff(max(states), other)
+
+
+def test_prune_keeps_what_remaining_snapshots_need(history, vm_records):
+    store, states = history
+    other = save(store, "b", vm_records[300:350], 1)
+    store.prune(3)
+    kept = [snapshot for snapshot, taken in zip(states, range(len(states))) if taken >= 3]
+    assert [row[0] for row in store.snapshots("a")] == sorted(kept, reverse=True)
+    assert [row[0] for row in store.snapshots("b")] == [other]  # A cluster's latest is never pruned
+    for snapshot in kept:
+        assert store.load(snapshot) == states[snapshot]
+    for old, new in itertools.combinations(kept, 2):
+        assert comparable(store.diff(old, new)) == brute_force_diff(states[old], states[new])
+
+    with store.connect() as db:
+        # Every version is still visible from a remaining snapshot, and every record is used
+        assert db.execute("SELECT COUNT(*) FROM versions v WHERE NOT EXISTS (SELECT 1 FROM snapshots s WHERE "
+                          "s.cluster = v.cluster AND s.endpoint = v.endpoint AND s.id >= v.since "
+                          "AND (v.until IS NULL OR s.id < v.until))").fetchone() == (0,)
+        assert db.execute("SELECT COUNT(*) FROM records WHERE hash NOT IN (SELECT hash FROM versions)").fetchone() == (0,)
+
+
+def test_prune_everything_old_keeps_the_latest(history):
+    store, states = history
+    store.prune(1000)
+    latest = max(states)
+    assert [row[0] for row in store.snapshots("a")] == [latest]
+    assert store.load(latest) == states[latest]
+    # The next snapshot is still stored as a delta of the one kept
+    records = edited(list(states[latest].values()), 9)
+    snapshot = save(store, "a", records, 1001)
+    assert store.load(snapshot) == {record["uuid"]: record for record in records}
+    assert comparable(store.diff(latest, snapshot)) == brute_force_diff(states[latest], store.load(snapshot))
@@ -0,0 +1,40 @@
+import gzip
+import zlib
+
+import pytest
+
+import HyperCoreDataViewer as viewer
+
+BODY = b'[{"uuid": "a", "name": "vm-1"}, {"uuid": "b", "name": "vm-2"}]' * 200
+
+
+def raw_deflate(data):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+ENCODED = [("gzip", gzip.compress(BODY)), ("deflate", zlib.compress(BODY)), ("deflate", raw_deflate(BODY))]
+
+
+def inflate(encoding, chunks):
+    inflater = viewer.Inflater(encoding)
+    data = b"".join(inflater.feed(chunk) for chunk in chunks) + inflater.flush()
+    assert inflater.size == len(data)
+    return data
+
+
+@pytest.mark.parametrize("encoding, body", ENCODED)
+@pytest.mark.parametrize("size", [1, 2, 3, 1000, 1 << 20])
+def test_chunk_sizes(encoding, body, size):
+    assert inflate(encoding, [body[i:i + size] for i in range(0, len(body), size)]) == BODY
+
+
+@pytest.mark.parametrize("encoding, body", ENCODED)
+def test_short_first_chunks(encoding, body):
+    assert inflate(encoding, [b"", body[:1], b"", body[1:]]) == BODY
+
+
+def test_empty_bodies():
+    assert inflate("deflate", [zlib.compress(b"")]) == b""
+    assert inflate("deflate", [raw_deflate(b"")]) == b""
+    assert inflate("deflate", []) == b""
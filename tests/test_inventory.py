@@ -0,0 +1,100 @@
+import copy
+
+import pytest
+
+import HyperCoreDataViewer as viewer
+from conftest import edited
+
+
+# VM UUID -> its export rows, which carry every VM and block device field
+def rows_by_vm(inventory):
+    rows = {}
+    for row in inventory.export_rows():
+        rows.setdefault(row[1 + inventory.clustered], []).append(row)
+    return rows
+
+
+def refreshed(old_records, new_records):
+    inventory = viewer.VMInventory.from_records(old_records)
+    fresh = viewer.VMInventory.from_records(new_records)
+    changed, added, removed = inventory.diff(fresh)
+    return inventory, fresh, inventory.with_changes(fresh, changed + added + removed)
+
+
+def assert_same(updated, fresh):
+    assert rows_by_vm(updated) == rows_by_vm(fresh)
+    assert updated.sums == pytest.approx(fresh.sums)
+    assert updated.sums == pytest.approx(updated.vectorized_sums())
+    assert updated.diff(fresh) == ([], [], [])
+    assert sorted(updated.index) == sorted(fresh.index)
+
+
+def test_with_changes_matches_a_rebuild(vm_records):
+    new_records = edited(vm_records)
+    inventory, fresh, updated = refreshed(vm_records, new_records)
+    assert_same(updated, fresh)
+
+    # Unchanged VMs keep their indexes and the old inventory is left alone
+    changed, added, removed = inventory.diff(fresh)
+    touched = set(changed + added + removed)
+    assert all(updated.index[uuid] == v for uuid, v in inventory.index.items() if uuid not in touched)
+    assert rows_by_vm(inventory) == rows_by_vm(viewer.VMInventory.from_records(vm_records))
+
+
+def test_diff_finds_the_edits(vm_records):
+    new_records = edited(vm_records)
+    old = {vm["uuid"]: vm for vm in vm_records}
+    new = {vm["uuid"]: vm for vm in new_records}
+    changed, added, removed = viewer.VMInventory.from_records(vm_records).diff(viewer.VMInventory.from_records(new_records))
+    assert sorted(changed) == sorted(uuid for uuid in new if uuid in old and new[uuid] != old[uuid])
+    assert sorted(added) == sorted(set(new) - set(old))
+    assert sorted(removed) == sorted(set(old) - set(new))
+
+
+def test_repeated_refreshes_match_a_rebuild(vm_records):
+    inventory = viewer.VMInventory.from_records(vm_records)
+    records = vm_records
+    for seed in range(5):
+        records = edited(records, seed)
+        fresh = viewer.VMInventory.from_records(records)
+        changed, added, removed = inventory.diff(fresh)
+        inventory = inventory.with_changes(fresh, changed + added + removed)
+        assert_same(inventory, fresh)
+
+
+def test_block_devices_grow_shrink_and_vanish(vm_records):
+    records = copy.deepcopy(vm_records[:20])
+    new_records = copy.deepcopy(records)
+    block = {"uuid": "block-x", "name": "disk9", "type": "IDE_CDROM", "capacity": 2 * viewer.GIB, "allocation": 0}
+    new_records[0]["blockDevs"] += [dict(block, uuid=f"block-x{i}") for i in range(4)]
+    new_records[1]["blockDevs"] = new_records[1]["blockDevs"][:1]
+    new_records[2]["blockDevs"] = []
+    new_records[3]["mem"] = None
+    _, fresh, updated = refreshed(records, new_records)
+    assert_same(updated, fresh)
+    assert updated.displayed().tolist().count(True) == fresh.displayed().tolist().count(True)
+
+
+def test_everything_removed_then_added_back(vm_records):
+    records = vm_records[:30]
+    _, fresh, empty = refreshed(records, [])
+    assert_same(empty, fresh)
+    assert empty.sums == pytest.approx([0.0, 0.0, 0.0, 0.0], abs=1e-9)
+    changed, added, removed = empty.diff(viewer.VMInventory.from_records(records))
+    assert_same(empty.with_changes(viewer.VMInventory.from_records(records), added), viewer.VMInventory.from_records(records))
+
+
+def test_merged_inventory_keeps_the_cluster(vm_records):
+    parts = {"a": viewer.VMInventory.from_records(vm_records[:50]), "b": viewer.VMInventory.from_records(vm_records[50:100])}
+    new_parts = {"a": viewer.VMInventory.from_records(edited(vm_records[:50])), "b": parts["b"]}
+    inventory = viewer.VMInventory.merge(parts)
+    fresh = viewer.VMInventory.merge(new_parts)
+    changed, added, removed = inventory.diff(fresh)
+    assert_same(inventory.with_changes(fresh, changed + added + removed), fresh)
+
+
+def test_with_no_changes_is_the_same_inventory(vm_records):
+    inventory = viewer.VMInventory.from_records(vm_records)
+    inventory.summary(("State",))
+    assert inventory.with_changes(viewer.VMInventory.from_records(vm_records), []) is inventory
+    assert inventory.diff(viewer.VMInventory.from_records(vm_records)) == ([], [], [])
@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+import HyperCoreDataViewer as viewer
+
+
+def parse(text, size):
+    data = text.encode("utf-8")
+    return list(viewer.stream_json_array(data[i:i + size] for i in range(0, len(data), size)))
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 1 << 16])
+@pytest.mark.parametrize("text", [
+    "[]",
+    " [ ] ",
+    "[1,2,3]",
+    '[{"a": [1, {"b": "]"}]}, "x,y", 12.5e3, true, null]\n',
+    '[\n  {"name": "café"} ,\n  {"name": "b"}\n]',
+])
+def test_valid_arrays_match_json_loads(text, size):
+    assert parse(text, size) == json.loads(text)
+
+
+@pytest.mark.parametrize("size", [1, 3, 1 << 16])
+@pytest.mark.parametrize("text", [
+    "[1,,2]",
+    "[1 2]",
+    "[,1]",
+    "[1,]",
+    "[1,2",
+    '[{"a": 1},',
+    "[1] 2",
+    "",
+    '{"a": 1}',
+])
+def test_malformed_arrays_raise(text, size):
+    with pytest.raises(ValueError):
+        parse(text, size)
+
+
+def test_projection_is_applied_per_record():
+    records = [{"uuid": str(i), "name": f"vm{i}", "extra": list(range(i))} for i in range(50)]
+    body = json.dumps(records).encode("utf-8")
+    projected = list(viewer.stream_json_array([body[i:i + 5] for i in range(0, len(body), 5)], lambda r: r["uuid"]))
+    assert projected == [str(i) for i in range(50)]
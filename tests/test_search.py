@@ -0,0 +1,101 @@
+import pytest
+
+import HyperCoreDataViewer as viewer
+from conftest import edited
+
+QUERIES = [
+    "vm-0001", "vm", "v", "00", "state=running", "state!=running", "os:windows", "os~LINUX", "machine=scale-8.10",
+    "memory>16", "memory > 16 GiB", "memory>16GiB", "memory >= 16 g state=RUNNING", "state=RUNNING memory>16",
+    "vcpus<=2 os~linux", "capacity>=500 type=virtio_disk", "allocation<10", "mount:/boot", "mount=/", "device=disk2",
+    "device!=disk0", 'description="test vm"', "production 16", "name=vm-00003", "name~renamed", "fresh", "x-notfound",
+    "nvram", "type:cdrom memory<=4",
+]
+
+
+@pytest.mark.parametrize("query, terms, filters", [
+    ("memory > 64 GiB", [], [("memory", ">", "64 gib")]),
+    ("memory>64GiB", [], [("memory", ">", "64gib")]),
+    ("memory >= 64 g web", ["web"], [("memory", ">=", "64 g")]),
+    ("state=RUNNING memory>16", [], [("state", "=", "running"), ("memory", ">", "16")]),
+    ("web vcpus=4 gateway", ["web", "gateway"], [("vcpus", "=", "4")]),
+    ('description="test vm" x', ["x"], [("description", "=", "test vm")]),
+    ("name=5 g", ["g"], [("name", "=", "5")]),
+    ("size>4 web", ["size>4", "web"], []),
+])
+def test_parse_query(query, terms, filters):
+    assert viewer.parse_query(query) == (terms, filters)
+
+
+@pytest.mark.parametrize("text, value", [("64", 64.0), ("64 gib", 64.0), ("1.5gb", 1.5), ("-2 g", -2.0)])
+def test_parse_number(text, value):
+    assert viewer.parse_number(text) == value
+
+
+def test_spaced_unit_finds_the_same_vms(vm_records):
+    index = viewer.SearchIndex(viewer.VMInventory.from_records(vm_records))
+    spaced = index.search("memory > 16 GiB")
+    assert spaced.any()
+    assert (spaced == index.search("memory>16GiB")).all()
+    assert (spaced == index.search("memory>16")).all()
+
+
+# The index's answer, worked out with plain loops over the inventory
+def brute_force(inventory, query):
+    terms, filters = viewer.parse_query(query)
+
+    def values(v, field):
+        table, column = viewer.SEARCH_FIELDS[field]
+        if table == "vm":
+            raw = [inventory.vm[column][v]]
+        else:
+            raw = [inventory.block[column][i] for i in inventory.blocks_of(v) if inventory.block["alive"][i]]
+        if column in (inventory.VM_CODES if table == "vm" else inventory.BLOCK_CODES):
+            return [str(inventory.label(column, code)).lower() for code in raw]
+        if table == "vm" and column in inventory.VM_TEXT:
+            return [(value or "").lower() for value in raw]
+        return raw
+
+    def matches(v, field, op, text):
+        found = values(v, field)
+        if field in viewer.NUMBER_FIELDS:
+            number = viewer.parse_number(text)
+            compare = {">": float.__gt__, "<": float.__lt__, ">=": float.__ge__, "<=": float.__le__, "!=": float.__ne__}
+            return any(compare.get(op, float.__eq__)(float(value), number) for value in found)
+        if op == "!=":
+            return text not in found
+        if op == "=":
+            return text in found
+        if field == "uuid" or (field == "name" and len(text) < 3):
+            return any(value.startswith(text) for value in found)
+        return any(text in value for value in found)
+
+    fields = [field for field in viewer.FREE_TEXT_FIELDS if field != "cluster" or inventory.clustered]
+    return [bool(inventory.vm["alive"][v])
+            and all(matches(v, *test) for test in filters)
+            and all(any(matches(v, field, "~", term) for field in fields) for term in terms)
+            for v in range(inventory.vm_count())]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_search_matches_brute_force(vm_records, query):
+    inventory = viewer.VMInventory.from_records(vm_records)
+    assert viewer.SearchIndex(inventory).search(query).tolist() == brute_force(inventory, query)
+
+
+# An index updated for a delta-refreshed inventory answers like the brute force on that inventory
+@pytest.mark.parametrize("query", QUERIES)
+def test_updated_index_matches_brute_force(vm_records, query):
+    inventory = viewer.VMInventory.from_records(vm_records)
+    fresh = viewer.VMInventory.from_records(edited(vm_records))
+    changed, added, removed = inventory.diff(fresh)
+    uuids = changed + added + removed
+    updated = inventory.with_changes(fresh, uuids)
+    index = viewer.SearchIndex(inventory).update(updated, uuids)
+    assert len(index.fresh)  # Few enough changes to take the incremental path
+    assert index.search(query).tolist() == brute_force(updated, query)
+
+
+def test_number_filter_without_a_number_raises(vm_records):
+    index = viewer.SearchIndex(viewer.VMInventory.from_records(vm_records))
+    with pytest.raises(ValueError):
+        index.search("memory>lots")
@@ -0,0 +1,69 @@
+import numpy as np
+
+import HyperCoreDataViewer as viewer
+
+
+def records(uuids, cpu=1.0):
+    return [{"uuid": uuid, "cpuUsage": cpu} for uuid in uuids]
+
+
+def cpu_by_vm(collector):
+    times, values = collector.tiers[0]["CPU"].ordered()
+    return {uuid: values[-1, column] for uuid, column in collector.columns.items()}
+
+
+def test_new_vms_in_one_poll_reuse_separate_stale_columns():
+    collector = viewer.StatsCollector()
+    collector.add(0, records("ab"))
+    t = collector.retention() + 100
+    collector.add(t, records("cd", 2.0))
+    assert collector.columns == {"c": 0, "d": 1}
+    assert collector.uuids == ["c", "d"]
+    assert cpu_by_vm(collector) == {"c": 2.0, "d": 2.0}
+
+    # More new VMs than stale columns: the rest get new columns
+    collector.add(2 * t, records("efg", 3.0))
+    assert sorted(collector.columns.values()) == [0, 1, 2]
+    assert set(collector.columns) == set("efg")
+
+
+def test_columns_are_reused_only_after_the_retention():
+    collector = viewer.StatsCollector()
+    collector.add(0, records("ab"))
+    collector.add(collector.retention() - 1, records("b"))
+    collector.add(collector.retention() + 1, records("cd"))
+    assert collector.columns == {"b": 1, "c": 0, "d": 2}
+
+
+def test_a_vm_back_before_its_column_is_reused_keeps_it():
+    collector = viewer.StatsCollector()
+    collector.add(0, records("abc"))
+    t = collector.retention() + 1
+    collector.add(t, records("x"))  # Finds a, b and c stale and takes a's column
+    collector.add(t + 1, records("b"))
+    collector.add(t + 2, records("yz"))
+    assert collector.columns == {"x": 0, "b": 1, "y": 2, "z": 3}
+    assert not np.isnan(cpu_by_vm(collector)["z"]) and collector.width >= 4
+
+
+# Random polls with VMs coming and going: every VM polled has its own column holding its sample,
+# and no column is reused before its VM has been gone for the retention
+def test_random_polls_keep_one_column_per_vm():
+    rng = np.random.default_rng(5)
+    collector = viewer.StatsCollector()
+    step = collector.retention() / 7
+    last_seen = {}
+    for poll in range(60):
+        t = poll * step
+        uuids = [f"vm{n}" for n in rng.choice(40 + poll, size=12, replace=False)]
+        cpu = rng.random(len(uuids)).round(3)
+        before = dict(collector.columns)
+        collector.add(t, [{"uuid": uuid, "cpuUsage": value} for uuid, value in zip(uuids, cpu)])
+        assert len(set(collector.columns.values())) == len(collector.columns)
+        assert all(collector.uuids[column] == uuid for uuid, column in collector.columns.items())
+        latest = cpu_by_vm(collector)
+        assert all(latest[uuid] == np.float32(value) for uuid, value in zip(uuids, cpu))
+        for uuid, column in before.items():
+            if collector.columns.get(uuid) != column:
+                assert last_seen[uuid] < t - collector.retention()
+        last_seen.update((uuid, t) for uuid in uuids)
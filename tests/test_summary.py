@@ -0,0 +1,88 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import HyperCoreDataViewer as viewer
+from conftest import edited
+
+KEY_SETS = [()] + [keys for n in (1, 2) for keys in itertools.permutations(viewer.SUMMARY_KEYS, n)] + [
+    ("Cluster", "OS", "Machine Type", "State", "Device Type")]
+
+
+# The group-by worked out one block row at a time
+def brute_force(inventory, keys, vm_mask=None):
+    groups = {}
+    vms = {}
+    for v in range(inventory.vm_count()):
+        if not inventory.vm["alive"][v] or (vm_mask is not None and not vm_mask[v]):
+            continue
+        for i in inventory.blocks_of(v):
+            labels = tuple(inventory.label(column, (inventory.vm if table == "vm" else inventory.block)[column][v if table == "vm" else i])
+                           for table, column in (viewer.SUMMARY_KEYS[key] for key in keys))
+            measures = groups.setdefault(labels, [0, 0.0, 0.0, 0, 0.0, 0.0])
+            if v not in vms.setdefault(labels, set()):
+                vms[labels].add(v)
+                measures[0] += 1
+                measures[1] += np.nan_to_num(inventory.vm["vcpus"][v])
+                measures[2] += np.nan_to_num(inventory.vm["memory"][v])
+            measures[3] += 1
+            measures[4] += np.nan_to_num(inventory.block["capacity"][i])
+            measures[5] += np.nan_to_num(inventory.block["allocation"][i])
+    return groups
+
+
+def assert_groups(groups, expected):
+    assert sorted(groups) == sorted(expected)
+    for labels, measures in expected.items():
+        assert groups[labels] == pytest.approx(measures), labels
+
+
+@pytest.fixture(scope="module")
+def inventory(vm_records):
+    records = [dict(vm, blockDevs=[]) if n % 50 == 0 else vm for n, vm in enumerate(vm_records)]
+    records[1] = dict(records[1], mem=None, numVCPU=None)
+    parts = {"a": viewer.VMInventory.from_records(records[:400]), "b": viewer.VMInventory.from_records(records[400:])}
+    return viewer.VMInventory.merge(parts)
+
+
+@pytest.mark.parametrize("keys", KEY_SETS)
+def test_aggregate_matches_brute_force(inventory, keys):
+    assert_groups(inventory.aggregate(keys), brute_force(inventory, keys))
+
+
+@pytest.mark.parametrize("keys", [("State",), ("OS", "Device Type"), ("Device Type",)])
+def test_aggregate_of_a_vm_mask(inventory, keys):
+    mask = viewer.SearchIndex(inventory).search("memory>=16")
+    assert 0 < mask.sum() < inventory.vm_count()
+    assert_groups(inventory.aggregate(keys, mask), brute_force(inventory, keys, mask))
+    assert inventory.aggregate(keys, np.zeros(inventory.vm_count(), dtype=bool)) == {}
+
+
+def test_one_group_adds_up_to_the_total_row(inventory):
+    (measures,) = inventory.aggregate(()).values()
+    assert [measures[1], measures[2], measures[4], measures[5]] == pytest.approx(inventory.sums)
+
+
+# Summaries carried over a delta refresh match a fresh aggregate of the refreshed inventory
+@pytest.mark.parametrize("keys", [("State",), ("OS", "Machine Type"), ("Device Type",), ("State", "Device Type")])
+def test_carried_summary_matches_a_fresh_aggregate(vm_records, keys):
+    inventory = viewer.VMInventory.from_records(vm_records)
+    inventory.summary(keys)
+    records = vm_records
+    for seed in range(3):
+        records = edited(records, seed)
+        fresh = viewer.VMInventory.from_records(records)
+        changed, added, removed = inventory.diff(fresh)
+        inventory = inventory.with_changes(fresh, changed + added + removed)
+        assert keys in inventory._aggregates  # Carried, not recomputed
+        assert_groups(inventory.summary(keys), brute_force(fresh, keys))
+
+
+# Too many possible groups to count them in a dense array, so they are found by sorting
+def test_aggregate_with_many_labels(vm_records):
+    records = [dict(vm, operatingSystem=f"os_{n % 97}", machineType=f"machine-{n % 89}") for n, vm in enumerate(vm_records)]
+    inventory = viewer.VMInventory.from_records(records)
+    keys = ("OS", "Machine Type", "Device Type")
+    assert np.prod([len(inventory.categories[viewer.SUMMARY_KEYS[key][1]].labels) for key in keys]) > 4 * len(inventory) + 1024
+    assert_groups(inventory.aggregate(keys), brute_force(inventory, keys))